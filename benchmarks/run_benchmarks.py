@@ -0,0 +1,343 @@
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import resource
+import tempfile
+import datetime
+import contextlib
+import subprocess
+import tracemalloc
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.synthetic_video import generate_screen_recording, expected_first_seen, DEFAULT_ELEMENTS
+from benchmarks.stub_detector import StubDetector
+from src.video_analyzer import VideoAnalyzer, map_action_to_label
+from src.planning_parser import PlanningLogParser
+from src.deviation_engine import DeviationEngine
+from src.detection_timeline import DetectionTimeline
+from src.report_generator import ReportGenerator
+from src.run_processor import RunProcessor
+from src.detectors import detector_spec
+from src.roi import roi_params
+from src.label_matcher import LabelMatcher
+from src.output_checker import FinalOutputChecker
+
+SCHEMA_VERSION = 1
+PLAN_STEPS = ["Click Login", "Enter Password", "Submit Form"]
+ACTION_IDS = ["click_login", "enter_password", "submit_form"]
+
+def _measure(fn, repeat):
+    """
+    Best-of-`repeat` wall time, then one extra traced run for peak Python heap
+    (NumPy buffers included). Returns (value, seconds, peak_bytes).
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return value, best, peak
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+def bench_video_analyzer(video_path, frame_count, expected, args):
+    variants = {
+        "sequential": {"batch_size": 1, "pipelined": False, "motion_threshold": None},
+        "pipelined_batched": {"batch_size": args.batch_size, "pipelined": True, "motion_threshold": None},
+        "motion_gated": {"batch_size": args.batch_size, "pipelined": True, "motion_threshold": args.motion_threshold},
+        # Learned regions are not persisted here, so every repetition starts from full-frame discovery
+        "roi_auto": {"batch_size": args.batch_size, "pipelined": True, "motion_threshold": None,
+                     "detector": detector_spec("ultralytics", roi=roi_params("auto", tile_size=args.roi_tile_size))}
+    }
+    results = {}
+
+    for name, options in variants.items():
+        detector = StubDetector(simulated_latency_ms=args.call_latency_ms, per_frame_latency_ms=args.frame_latency_ms)
+
+        def run():
+            analyzer = VideoAnalyzer(video_path, model=detector, **options)
+            timeline = analyzer.build_timeline()
+            step_latencies = []
+            found = {}
+            for action_id in ACTION_IDS:
+                start = time.perf_counter()
+                _, timestamp = analyzer.analyze_for_action(action_id)
+                step_latencies.append(time.perf_counter() - start)
+                found[map_action_to_label(action_id)] = timestamp
+            return timeline, found, step_latencies
+
+        (_, found, step_latencies), elapsed, peak = _measure(run, args.repeat)
+        results[name] = {
+            "frames": frame_count,
+            "seconds": round(elapsed, 4),
+            "frames_per_sec": round(frame_count / elapsed, 2),
+            "per_step_latency_ms": round(1000 * sum(step_latencies) / len(step_latencies), 4),
+            "peak_memory_bytes": peak,
+            "max_timestamp_error_sec": _max_error(found, expected)
+        }
+
+    detector = StubDetector(simulated_latency_ms=args.call_latency_ms, per_frame_latency_ms=args.frame_latency_ms)
+
+    def run_coarse():
+        analyzer = VideoAnalyzer(video_path, model=detector, batch_size=args.batch_size)
+        found, latencies, previous = {}, [], None
+        for action_id in ACTION_IDS:
+            start = time.perf_counter()
+            ok, timestamp = analyzer.locate_action(action_id, start_sec=previous, coarse_stride_sec=args.coarse_stride_sec)
+            latencies.append(time.perf_counter() - start)
+            found[map_action_to_label(action_id)] = timestamp
+            previous = timestamp if ok else previous
+        return found, latencies
+
+    (found, latencies), elapsed, peak = _measure(run_coarse, args.repeat)
+    results["coarse_search"] = {
+        "frames": frame_count,
+        "seconds": round(elapsed, 4),
+        "frames_per_sec": round(frame_count / elapsed, 2),
+        "per_step_latency_ms": round(1000 * sum(latencies) / len(latencies), 4),
+        "peak_memory_bytes": peak,
+        "max_timestamp_error_sec": _max_error(found, expected)
+    }
+    return results
+
+def _max_error(found, expected):
+    errors = [abs(found[label] - timestamp) for label, timestamp in expected.items() if found.get(label) is not None]
+    if len(errors) < len(expected):
+        return None
+    return round(max(errors), 4)
+
+def bench_planning_parser(work_dir, args):
+    log_path = os.path.join(work_dir, "large_plan.txt")
+    with open(log_path, "w") as f:
+        for idx in range(args.plan_lines):
+            f.write(PLAN_STEPS[idx % len(PLAN_STEPS)] + "\n")
+
+    steps, elapsed, peak = _measure(lambda: PlanningLogParser(log_path).parse_steps(), args.repeat)
+    return {
+        "lines": args.plan_lines,
+        "seconds": round(elapsed, 4),
+        "steps_per_sec": round(len(steps) / elapsed, 2),
+        "peak_memory_bytes": peak
+    }
+
+def bench_label_matcher(args):
+    # Distinct step texts, so every repetition embeds and scores the whole plan
+    labels = {"login_button": "login signin logon", "password_field": "password passcode passphrase",
+              "submit_button": "submit send form", "settings_menu": "settings preferences"}
+    texts = [f"{PLAN_STEPS[idx % len(PLAN_STEPS)]} (attempt {idx})" for idx in range(args.plan_lines)]
+
+    def run():
+        return LabelMatcher(labels, descriptions=labels).match(texts)
+
+    matches, elapsed, peak = _measure(run, args.repeat)
+    return {
+        "steps": len(texts),
+        "labels": len(labels),
+        "seconds": round(elapsed, 4),
+        "steps_per_sec": round(len(texts) / elapsed, 2),
+        "peak_memory_bytes": peak,
+        "mapped": sum(1 for label, _, _ in matches if label)
+    }
+
+def bench_deviation_engine(args):
+    # Plan of N steps against a timeline where every label occurs N / 3 times
+    timeline = DetectionTimeline(fps=10)
+    steps = []
+    for idx in range(args.align_steps):
+        action_id = ACTION_IDS[idx % len(ACTION_IDS)]
+        steps.append({"description": PLAN_STEPS[idx % len(PLAN_STEPS)], "label": map_action_to_label(action_id)})
+        timeline.add_frame(idx * 2.0, [(map_action_to_label(action_id), 0.9)])
+        timeline.add_frame(idx * 2.0 + 0.1, [])
+
+    results, elapsed, peak = _measure(lambda: DeviationEngine().align_steps(steps, timeline), args.repeat)
+    return {
+        "steps": len(steps),
+        "events": len(steps),
+        "seconds": round(elapsed, 4),
+        "per_step_latency_ms": round(1000 * elapsed / len(steps), 4),
+        "peak_memory_bytes": peak,
+        "observed": sum(1 for res in results if res["result"] == "✅ Observed")
+    }
+
+def bench_report_generator(work_dir, args):
+    results = [{"description": f"Step {idx}", "result": "✅ Observed", "notes": f"At {idx}.0s"} for idx in range(args.align_steps)]
+    reporter = ReportGenerator(os.path.join(work_dir, "reports"))
+
+    def run():
+        return reporter.generate_report("bench", results, token_usage={"total_tokens": 0, "total_cost": 0.0}, duration_sec=0.0, html=True)
+
+    _, elapsed, peak = _measure(run, args.repeat)
+    return {
+        "steps": len(results),
+        "seconds": round(elapsed, 4),
+        "peak_memory_bytes": peak
+    }
+
+def bench_output_checker(work_dir, args):
+    # A long log with the verdict at the very end, and the same log without any marker (full scan)
+    line = b"2024-01-01 12:00:00 INFO agent clicked element #login and waited for the page to respond\n"
+    marked_path = os.path.join(work_dir, "large_output.txt")
+    unmarked_path = os.path.join(work_dir, "large_output_unmarked.txt")
+    block = line * 10000
+    with open(unmarked_path, "wb") as f:
+        for _ in range(max(1, args.output_mb * 1024 * 1024 // len(block))):
+            f.write(block)
+    shutil.copyfile(unmarked_path, marked_path)
+    with open(marked_path, "ab") as f:
+        f.write(b"Test successful\n")
+
+    size = os.path.getsize(unmarked_path)
+    verdict, elapsed, peak = _measure(lambda: FinalOutputChecker(marked_path).validate_output(), args.repeat)
+    unmarked, full_scan, full_scan_peak = _measure(lambda: FinalOutputChecker(unmarked_path).validate_output(), args.repeat)
+    return {
+        "bytes": size,
+        "seconds_verdict_at_end": round(elapsed, 4),
+        "seconds_full_scan": round(full_scan, 4),
+        "full_scan_mb_per_sec": round(size / 1024 / 1024 / full_scan, 2),
+        "peak_memory_bytes": max(peak, full_scan_peak),
+        "verdicts_correct": verdict is True and unmarked is False
+    }
+
+def bench_end_to_end(work_dir, video_path, frame_count, args):
+    log_path = os.path.join(work_dir, "run_plan.txt")
+    output_path = os.path.join(work_dir, "run_output.txt")
+    with open(log_path, "w") as f:
+        f.write("\n".join(PLAN_STEPS) + "\n")
+    with open(output_path, "w") as f:
+        f.write("Test successful\n")
+
+    reporter = ReportGenerator(os.path.join(work_dir, "reports"))
+    # The default pipeline; motion gating is opt-in and measured by the motion_gated variant
+    options = {"batch_size": args.batch_size, "pipelined": True, "motion_threshold": None}
+
+    def run():
+        processor = RunProcessor("stub", options)
+        processor.model = StubDetector(simulated_latency_ms=args.call_latency_ms, per_frame_latency_ms=args.frame_latency_ms)
+        start = time.perf_counter()
+        results = processor.analyze_steps(log_path, video_path)
+        processor.validate_output(output_path)
+        reporter.generate_report("bench_e2e", results, output_path, video_path, duration_sec=time.perf_counter() - start, html=True)
+        return results
+
+    results, elapsed, peak = _measure(run, args.repeat)
+    return {
+        "frames": frame_count,
+        "steps": len(results),
+        "seconds": round(elapsed, 4),
+        "frames_per_sec": round(frame_count / elapsed, 2),
+        "per_step_latency_ms": round(1000 * elapsed / len(results), 4),
+        "peak_memory_bytes": peak,
+        "observed": sum(1 for res in results if res["result"] == "✅ Observed")
+    }
+
+def compare(current, baseline_path):
+    """
+    Prints the relative change of every numeric metric against a previous results file.
+    """
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    print(f"[INFO] Comparing against {baseline_path} (commit {baseline.get('commit')})")
+    for suite, metrics in current["results"].items():
+        for name, value in _flatten(metrics):
+            previous = dict(_flatten(baseline.get("results", {}).get(suite, {}))).get(name)
+            if isinstance(value, (int, float)) and isinstance(previous, (int, float)) and previous:
+                print(f"  {suite}.{name}: {previous} -> {value} ({(value - previous) / previous * 100:+.1f}%)")
+
+def _flatten(metrics, prefix=""):
+    for key, value in metrics.items():
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{prefix}{key}.")
+        else:
+            yield f"{prefix}{key}", value
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark the video analysis pipeline on synthetic recordings")
+    arg_parser.add_argument("--duration", type=float, default=30.0, help="Synthetic video length in seconds")
+    arg_parser.add_argument("--fps", type=int, default=10)
+    arg_parser.add_argument("--width", type=int, default=1280)
+    arg_parser.add_argument("--height", type=int, default=720)
+    arg_parser.add_argument("--elements", help="JSON file with element schedules (see synthetic_video.DEFAULT_ELEMENTS)")
+    arg_parser.add_argument("--batch-size", type=int, default=8)
+    arg_parser.add_argument("--motion-threshold", type=float, default=8.0)
+    arg_parser.add_argument("--coarse-stride-sec", type=float, default=1.0)
+    arg_parser.add_argument("--roi-tile-size", type=int, default=320)
+    arg_parser.add_argument("--call-latency-ms", type=float, default=0.0, help="Simulated fixed cost per detector call")
+    arg_parser.add_argument("--frame-latency-ms", type=float, default=0.0, help="Simulated cost per frame in a detector call")
+    arg_parser.add_argument("--plan-lines", type=int, default=20000)
+    arg_parser.add_argument("--align-steps", type=int, default=1000)
+    arg_parser.add_argument("--output-mb", type=int, default=64, help="Size of the synthetic final output")
+    arg_parser.add_argument("--repeat", type=int, default=3, help="Timed repetitions; the best one is reported")
+    arg_parser.add_argument("--output", help="Write results JSON here instead of stdout")
+    arg_parser.add_argument("--compare", help="Previous results JSON to diff against")
+    args = arg_parser.parse_args()
+
+    elements = DEFAULT_ELEMENTS
+    if args.elements:
+        with open(args.elements) as f:
+            elements = json.load(f)
+
+    work_dir = tempfile.mkdtemp(prefix="hercules_bench_")
+    try:
+        # Keep the pipeline's [INFO] chatter off stdout so the JSON stays machine-readable
+        with contextlib.redirect_stdout(sys.stderr):
+            video_path = os.path.join(work_dir, "synthetic.mp4")
+            frame_count = generate_screen_recording(video_path, args.duration, args.fps, (args.width, args.height), elements)
+            expected = expected_first_seen(args.duration, args.fps, elements)
+
+            results = {
+                "video_analyzer": bench_video_analyzer(video_path, frame_count, expected, args),
+                "planning_parser": bench_planning_parser(work_dir, args),
+                "label_matcher": bench_label_matcher(args),
+                "deviation_engine": bench_deviation_engine(args),
+                "report_generator": bench_report_generator(work_dir, args),
+                "output_checker": bench_output_checker(work_dir, args),
+                "end_to_end": bench_end_to_end(work_dir, video_path, frame_count, args)
+            }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        "schema": SCHEMA_VERSION,
+        "commit": _git_commit(),
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count()
+        },
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "results": results
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"[INFO] Benchmark results written to {args.output}")
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        compare(report, args.compare)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import time
+import numpy as np
+from benchmarks.synthetic_video import ELEMENT_COLORS
+
+class _StubBox:
+    def __init__(self, cls, conf, xyxy):
+        self.cls = cls
+        self.conf = conf
+        self.xyxy = np.array([xyxy], dtype=np.float32)
+
+class _StubResult:
+    def __init__(self, names, boxes):
+        self.names = names
+        self.boxes = boxes
+
+class StubDetector:
+    """
+    Deterministic stand-in for ultralytics.YOLO on CPU-only machines. Finds the
+    solid-colored elements drawn by synthetic_video and returns results with the
+    same shape as YOLO (names, boxes with cls/conf/xyxy), so it can be passed to
+    VideoAnalyzer as `model`. simulated_latency_ms adds a fixed per-call cost plus
+    a per-frame cost to mimic a real network.
+    """
+    def __init__(self, stride=4, tolerance=60, min_pixels=20, simulated_latency_ms=0.0, per_frame_latency_ms=0.0):
+        self.stride = stride
+        self.tolerance = tolerance
+        self.min_pixels = min_pixels
+        self.simulated_latency_ms = simulated_latency_ms
+        self.per_frame_latency_ms = per_frame_latency_ms
+        self.names = {idx: label for idx, label in enumerate(ELEMENT_COLORS)}
+        self.colors = np.array(list(ELEMENT_COLORS.values()), dtype=np.int16)
+        self.calls = 0
+        self.frames = 0
+
+    def __call__(self, frames, **kwargs):
+        if not isinstance(frames, list):
+            frames = [frames]
+        self.calls += 1
+        self.frames += len(frames)
+
+        latency = self.simulated_latency_ms + self.per_frame_latency_ms * len(frames)
+        if latency:
+            time.sleep(latency / 1000)
+
+        return [self._detect(frame) for frame in frames]
+
+    def _detect(self, frame):
+        sample = frame[::self.stride, ::self.stride].astype(np.int16)
+        boxes = []
+        for cls, color in enumerate(self.colors):
+            distance = np.abs(sample - color).sum(axis=-1)
+            ys, xs = np.nonzero(distance < self.tolerance)
+            if len(xs) < self.min_pixels:
+                continue
+            xyxy = (xs.min() * self.stride, ys.min() * self.stride, (xs.max() + 1) * self.stride, (ys.max() + 1) * self.stride)
+            conf = round(1.0 - float(distance[ys, xs].mean()) / (3 * 255), 4)
+            boxes.append(_StubBox(cls, conf, xyxy))
+        return _StubResult(self.names, boxes)
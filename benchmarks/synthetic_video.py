@@ -0,0 +1,59 @@
+import cv2
+import numpy as np
+
+# BGR colors reserved for each synthetic UI element; the stub detector keys on them
+ELEMENT_COLORS = {
+    "login_button": (0, 0, 255),
+    "password_field": (0, 255, 0),
+    "submit_button": (255, 0, 0)
+}
+
+DEFAULT_ELEMENTS = [
+    {"label": "login_button", "start": 0.10, "end": 0.30, "box": (0.40, 0.45, 0.20, 0.08)},
+    {"label": "password_field", "start": 0.35, "end": 0.60, "box": (0.35, 0.55, 0.30, 0.06)},
+    {"label": "submit_button", "start": 0.65, "end": 0.85, "box": (0.42, 0.70, 0.16, 0.08)}
+]
+
+def generate_screen_recording(path, duration_sec=30.0, fps=10, resolution=(1280, 720), elements=None):
+    """
+    Writes a synthetic screen recording: a static desktop-like background with UI
+    elements that appear and disappear on a schedule. Element "start"/"end" are
+    fractions of the duration and "box" is (x, y, w, h) as fractions of the frame.
+    Returns the number of frames written.
+    """
+    width, height = resolution
+    elements = elements or DEFAULT_ELEMENTS
+    frame_count = int(round(duration_sec * fps))
+
+    background = np.full((height, width, 3), 40, dtype=np.uint8)
+    background[:int(height * 0.06)] = (70, 70, 70)
+    cv2.putText(background, "Hercules synthetic run", (10, int(height * 0.045)),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (200, 200, 200), 1)
+
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    try:
+        for frame_idx in range(frame_count):
+            position = frame_idx / frame_count
+            frame = background.copy()
+            for element in elements:
+                if element["start"] <= position < element["end"]:
+                    x, y, w, h = element["box"]
+                    top_left = (int(x * width), int(y * height))
+                    bottom_right = (int((x + w) * width), int((y + h) * height))
+                    cv2.rectangle(frame, top_left, bottom_right, ELEMENT_COLORS[element["label"]], -1)
+            writer.write(frame)
+    finally:
+        writer.release()
+
+    return frame_count
+
+def expected_first_seen(duration_sec, fps, elements=None):
+    """
+    Ground-truth first appearance (seconds) of each label in a generated recording.
+    """
+    frame_count = int(round(duration_sec * fps))
+    first_seen = {}
+    for element in elements or DEFAULT_ELEMENTS:
+        first_frame = int(np.ceil(element["start"] * frame_count))
+        first_seen.setdefault(element["label"], round(first_frame / fps, 2))
+    return first_seen
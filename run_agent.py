@@ -1,36 +1,91 @@
+import time
+
+# Start of the process, for the time-to-first-result metric
+PROCESS_START = time.time()
+
 import os
-from transformers import pipeline, AutoTokenizer
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 from src.input_handler import InputHandler
-from src.planning_parser import PlanningLogParser # Tool: Parses planning steps
 from src.video_analyzer import VideoAnalyzer # Tool: Video analysis for actions
-from src.output_checker import FinalOutputChecker # Tool: Final output validation
-from src.deviation_engine import DeviationEngine
+from src.run_processor import RunProcessor # Tools: planning parser, video analysis, final output validation
 from src.report_generator import ReportGenerator
-import time, datetime
+from src.cli_options import add_analysis_arguments, analyzer_options_from_args, label_matcher_from_args, plan_cache_from_args
+from src.cli_options import output_options_from_args, results_store_from_args, add_prompt_arguments
+from src.tracing import Tracer
+from src.model_registry import MODEL_REGISTRY
+from src.llm_cache import LLMResponseCache
+from src.llm_step_extractor import LLMStepExtractor, build_prompt
+from src.planning_parser import prompt_log_text
+import datetime
 from config.settings import VIDEO_DIR, LOG_DIR, OUTPUT_DIR, REPORT_DIR, LLM_MODEL, COST_PER_1000_TOKENS
-
-# Setup lightweight text generation pipeline
-generator = pipeline("text2text-generation", model=LLM_MODEL)
-tokenizer = AutoTokenizer.from_pretrained(LLM_MODEL)
+from config.settings import MODEL_PATH, COARSE_STRIDE_SEC, ALIGNMENT_MAX_GAP_SEC
+from config.settings import TRACE_JSONL_PATH, PROMETHEUS_TEXTFILE_PATH
+from config.settings import LLM_MAX_NEW_TOKENS, LLM_CACHE_PATH, LLM_CACHE_MAX_MB, LLM_BATCH_SIZE
+
+arg_parser = argparse.ArgumentParser(description="Hercules video analysis agent")
+add_analysis_arguments(arg_parser)
+add_prompt_arguments(arg_parser)
+arg_parser.add_argument("--no-llm-cache", action="store_true", help="Always run the LLM instead of reusing cached responses")
+arg_parser.add_argument("--llm-batch-size", type=int, default=LLM_BATCH_SIZE, help="Prompts per LLM generation batch")
+arg_parser.add_argument("--warm-cache", action="store_true", help="Populate the detection cache for every video and exit")
+arg_parser.add_argument("--list-runs", action="store_true", help="List the discovered runs and their inputs, then exit")
+args = arg_parser.parse_args()
 
 input_handler = InputHandler(VIDEO_DIR, LOG_DIR, OUTPUT_DIR)
-reporter = ReportGenerator(REPORT_DIR)
-
-# Initialize counters
-total_tokens = 0
-
-# Processing Loop
-for log_path in input_handler.get_planning_logs():
-    run_name = os.path.splitext(os.path.basename(log_path))[0]
-    print(f"\n[INFO] Starting analysis for: {run_name}")
-
-    videos = input_handler.get_videos()
-    output_files = input_handler.get_final_outputs()
 
-    if not videos or not output_files:
-        print(f"[WARN] Missing videos or output for {run_name}. Skipping.")
+if args.list_runs:
+    # No model is touched, so this returns well before any heavy import
+    for run in input_handler.get_runs():
+        print(f"{run['run_name']}\tlog={run['log_path']}\tvideo={run['video_path'] or '-'}\toutput={run['output_path'] or '-'}")
+    raise SystemExit(0)
+
+analyzer_options = analyzer_options_from_args(args)
+processor = RunProcessor(MODEL_PATH, analyzer_options, args.search_mode, COARSE_STRIDE_SEC, ALIGNMENT_MAX_GAP_SEC,
+                         label_matcher_from_args(args), plan_cache_from_args(args),
+                         output_options_from_args(args))
+
+if args.warm_cache:
+    detection_cache = analyzer_options["cache"]
+    if detection_cache is None:
+        arg_parser.error("--warm-cache cannot be combined with --no-cache")
+    # Keyed like the runs that will look the entries up: by each video's planned labels
+    run_logs = {run["video_path"]: run["log_path"] for run in input_handler.get_runs() if run["video_path"]}
+    for video_path in input_handler.get_videos():
+        processor.warm_cache(video_path, run_logs.get(video_path))
+    print(f"[INFO] Detection cache warmed: {detection_cache.stats()}")
+    raise SystemExit(0)
+
+# Stage timings aggregated over every run of this invocation
+session_tracer = Tracer("session")
+runs_traced = 0
+
+# Setup lightweight text generation pipeline (loaded on the first LLM cache miss)
+llm_cache = None if args.no_llm_cache else LLMResponseCache(LLM_CACHE_PATH, LLM_CACHE_MAX_MB * 1024 * 1024)
+extractor = LLMStepExtractor(LLM_MODEL, {"max_new_tokens": LLM_MAX_NEW_TOKENS}, cache=llm_cache)
+
+reporter = ReportGenerator(REPORT_DIR, results_store_from_args(args))
+
+pending_runs = []
+for run in input_handler.get_runs():
+    if not run["video_path"] or not run["output_path"]:
+        print(f"[WARN] Missing video or output for {run['run_name']}. Skipping.")
         continue
+    pending_runs.append(run)
+
+# Pre-pass: build every prompt up front so the LLM can work through them in batches,
+# and resolve every plan to detector labels so unmapped steps are reported before any video work
+tracers = [Tracer(run["run_name"]) for run in pending_runs]
+prompts = []
+plans = []
+for run, tracer in zip(pending_runs, tracers):
+    # Actual prompt construction
+    steps = processor.plan_steps(run["log_path"], tracer)
+    plans.append(steps)
+    prompts.append(build_prompt(prompt_log_text(run["log_path"], steps, args.prompt_max_chars)))
 
+def write_llm_logs(run_name, prompt, extraction):
     log_dir = "./log_files"
     os.makedirs(log_dir, exist_ok=True)
     timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -38,111 +93,111 @@ for log_path in input_handler.get_planning_logs():
     thoughts_path = os.path.join(log_dir, f"{run_name}_planner_thoughts_{timestamp}.log")
     chat_path = os.path.join(log_dir, f"{run_name}_chat_messages_{timestamp}.log")
 
-    # Actual prompt construction
-    with open(log_path, "r") as file:
-        planning_log = file.read()
-
-    prompt = (
-    "You are an AI test validation agent.\n"
-    "Your task:\n"
-    "- Read the planning log below\n"
-    "- Think step by step to extract the intended actions\n"
-    "- Clearly state your reasoning as 'Thought:' before listing steps\n"
-    "\nPlanning Log:\n"
-    f"{planning_log}\n"
-    "\nRespond with:\nThought: <reasoning>\nSteps: <step list>"
-    )
-    
-    # Token count for prompt
-    prompt_tokens = tokenizer(prompt, return_tensors="pt").input_ids.shape[1]
-    total_tokens += prompt_tokens
-    
-    response = generator(prompt, max_new_tokens=200)
-    response_text = response[0]["generated_text"]
-
-    thought = "N/A"
-    steps_text = response_text
-
-    if "Thought:" in response_text and "Steps:" in response_text:
-        parts = response_text.split("Steps:")
-        thought_section = parts[0].split("Thought:")[-1].strip()
-        steps_section = parts[1].strip()
-        thought = thought_section
-        steps_text = steps_section
-
     # Log actual prompt and response
     with open(thoughts_path, "w") as f:
         f.write("=== Planner Thoughts Log ===\n")
         f.write(f"Prompt Sent:\n{prompt}\n\n")
-        f.write(f"AI Thought Process:\n{thought}\n")
+        f.write(f"AI Thought Process:\n{extraction['thought']}\n")
 
     with open(chat_path, "w") as f:
         f.write("=== Chat Messages Log ===\n")
         f.write(f"System: Please extract steps with reasoning.\n")
         f.write(f"User Prompt:\n{prompt}\n")
-        f.write(f"LLM Full Response:\n{response_text}\n")
-
-    # Token count for response
-    response_tokens = tokenizer(response_text, return_tensors="pt").input_ids.shape[1]
-    total_tokens += response_tokens
-
-    # print(f"[INFO] LLM Extracted Steps:\n{response}\n")
-    print(f"[INFO] LLM Extracted Steps:\n{response_text}\n")
-    print(f"[INFO] Tokens used - Prompt: {prompt_tokens}, Response: {response_tokens}")
-
-    # Fallback to deterministic parser
-    parser = PlanningLogParser(log_path)
-    start_time = time.time()
-    steps = parser.parse_steps()
-
-    deviation_engine = DeviationEngine()
-
-    for step in steps:
-        action_id = step["action_id"]
-        description = step["description"]
-
-        # TOOL USAGE: VideoAnalyzer (detect action in video)
-        analyzer = VideoAnalyzer(videos[0])
-        found, timestamp = analyzer.analyze_for_action(action_id)
-
-        deviation_engine.record_step(description, found, timestamp)
-
-    results = deviation_engine.get_results()
-
-    # TOOL USAGE: FinalOutputChecker (validate test output)
-    output_checker = FinalOutputChecker(output_files[0])
-    output_valid = output_checker.validate_output()
-    end_time = time.time()
-    duration_sec = end_time - start_time
-
-    # Simulated cost estimate (local LLM, no real charges)
-    total_cost = (total_tokens / 1000) * COST_PER_1000_TOKENS
-
-    token_usage = {
-        "total_tokens": total_tokens,
-        "total_cost": round(total_cost, 5)
-    }
+        f.write(f"LLM Full Response:\n{extraction['response_text']}\n")
 
-    logs = {
+    return {
         "thoughts": thoughts_path,
         "chat": chat_path
     }
 
-    reporter.generate_report(
-        run_name=run_name,
-        results=results,
-        output_file_path=output_files[0],
-        video_path=videos[0],
-        token_usage=token_usage,
-        duration_sec=duration_sec,
-        logs=logs,
-        html=True  # Generates both .txt and .html reports
-    )
-
-    if output_valid:
-        print(f"[INFO] Final output for {run_name} is consistent.")
-    else:
-        print(f"[WARN] Final output for {run_name} shows inconsistencies.")
-
-    # Reset token counter for next test run (optional)
-    total_tokens = 0
+async def process_runs():
+    global runs_traced
+    loop = asyncio.get_running_loop()
+
+    # LLM batches queue on their own thread, so generation for later runs keeps going
+    # while earlier runs are analyzed. Video analysis and output validation share a second pool.
+    llm_executor = ThreadPoolExecutor(max_workers=1)
+    stage_executor = ThreadPoolExecutor(max_workers=2)
+
+    # LLM extraction (served from the response cache when the prompt is unchanged)
+    batch_size = max(1, args.llm_batch_size)
+    extraction_futures = []
+    for start in range(0, len(prompts), batch_size):
+        batch_future = loop.run_in_executor(
+            llm_executor, extractor.extract_batch,
+            prompts[start:start + batch_size], batch_size, tracers[start:start + batch_size]
+        )
+        extraction_futures.extend((batch_future, offset) for offset in range(len(prompts[start:start + batch_size])))
+
+    try:
+        # Processing Loop
+        for run, tracer, prompt, steps, (batch_future, offset) in zip(pending_runs, tracers, prompts, plans, extraction_futures):
+            run_name = run["run_name"]
+            print(f"\n[INFO] Starting analysis for: {run_name}")
+            run_start_time = time.time()
+
+            # LLM reasoning, step validation (deterministic parser) and output check run concurrently
+            extractions, (results, output_valid) = await asyncio.gather(
+                batch_future,
+                processor.validate_run_async(run["log_path"], run["video_path"], run["output_path"], tracer, stage_executor, steps)
+            )
+            extraction = extractions[offset]
+            duration_sec = time.time() - run_start_time
+
+            logs = write_llm_logs(run_name, prompt, extraction)
+            prompt_tokens = extraction["prompt_tokens"]
+            response_tokens = extraction["response_tokens"]
+            total_tokens = prompt_tokens + response_tokens
+
+            print(f"[INFO] LLM Extracted Steps:\n{extraction['response_text']}\n")
+            print(f"[INFO] Tokens used - Prompt: {prompt_tokens}, Response: {response_tokens}"
+                  f"{' (cached response)' if extraction['cached'] else ''}")
+
+            # Simulated cost estimate (local LLM, no real charges)
+            total_cost = (total_tokens / 1000) * COST_PER_1000_TOKENS
+
+            token_usage = {
+                "total_tokens": total_tokens,
+                "total_cost": round(total_cost, 5)
+            }
+
+            tracer.add("run_total", time.time() - run_start_time)
+
+            with tracer.span("report_write"):
+                reporter.generate_report(
+                    run_name=run_name,
+                    results=results,
+                    output_file_path=run["output_path"],
+                    video_path=run["video_path"],
+                    token_usage=token_usage,
+                    duration_sec=duration_sec,
+                    logs=logs,
+                    html=True,  # Generates both .txt and .html reports
+                    timings=tracer.summary(),
+                    cache_stats={
+                        "llm": llm_cache.stats() if llm_cache else None,
+                        "detection": analyzer_options["cache"].stats() if analyzer_options["cache"] else None,
+                        "planning_log": processor.plan_cache.stats() if processor.plan_cache else None
+                    },
+                    output_valid=output_valid
+                )
+
+            tracer.export_jsonl(TRACE_JSONL_PATH)
+            session_tracer.merge(tracer.summary())
+            runs_traced += 1
+            if runs_traced == 1:
+                time_to_first_result = time.time() - PROCESS_START
+                session_tracer.add("time_to_first_result", time_to_first_result)
+                print(f"[INFO] Time to first result: {time_to_first_result:.2f}s")
+            session_tracer.export_prometheus(PROMETHEUS_TEXTFILE_PATH, runs=runs_traced, model_loads=MODEL_REGISTRY.stats())
+
+            if output_valid:
+                print(f"[INFO] Final output for {run_name} is consistent.")
+            else:
+                print(f"[WARN] Final output for {run_name} shows inconsistencies.")
+    finally:
+        llm_executor.shutdown(wait=True)
+        stage_executor.shutdown(wait=True)
+
+asyncio.run(process_runs())
+print(f"[INFO] Model loads: {MODEL_REGISTRY.stats() or 'none (all results cached)'}")
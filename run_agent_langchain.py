@@ -1,22 +1,36 @@
-import os
 import time
+
+# Start of the process, for the time-to-first-result metric
+PROCESS_START = time.time()
+
+import os
+import asyncio
+import argparse
 import datetime
-from langchain.llms import HuggingFacePipeline
-from langchain.agents import initialize_agent, AgentType
-from transformers import pipeline, AutoTokenizer
+from concurrent.futures import ThreadPoolExecutor
 from src.input_handler import InputHandler
-from src.planning_parser import PlanningLogParser
-from src.video_analyzer import VideoAnalyzer
-from src.output_checker import FinalOutputChecker
-from src.deviation_engine import DeviationEngine
+from src.run_processor import RunProcessor
 from src.report_generator import ReportGenerator
+from src.cli_options import add_analysis_arguments, analyzer_options_from_args, label_matcher_from_args, plan_cache_from_args
+from src.cli_options import output_options_from_args, results_store_from_args, add_prompt_arguments
+from src.tracing import Tracer
+from src.planning_parser import prompt_log_text
+from src.model_registry import MODEL_REGISTRY, get_text_pipeline, get_tokenizer
+from config.settings import MODEL_PATH, COARSE_STRIDE_SEC, ALIGNMENT_MAX_GAP_SEC
+from tools.ai_tools import ToolContext
+from config.settings import TRACE_JSONL_PATH, PROMETHEUS_TEXTFILE_PATH
+
+arg_parser = argparse.ArgumentParser(description="Hercules video analysis agent (LangChain)")
+add_analysis_arguments(arg_parser)
+add_prompt_arguments(arg_parser)
+arg_parser.add_argument("--list-runs", action="store_true", help="List the discovered runs and their inputs, then exit")
+args = arg_parser.parse_args()
 
 # === Model Setup ===
 MODEL_NAME = "TinyLlama/TinyLlama-1.1B-Chat-v1.0"
 
-hf_pipeline = pipeline("text-generation", model=MODEL_NAME, max_new_tokens=300)
-llm = HuggingFacePipeline(pipeline=hf_pipeline)
-tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+session_tracer = Tracer("session")
+runs_traced = 0
 
 # === Directories ===
 VIDEO_DIR = "data/videos"
@@ -25,22 +39,45 @@ OUTPUT_DIR = "data/test_outputs"
 REPORT_DIR = "reports"
 LOG_FILE_DIR = "./log_files"
 
-os.makedirs(LOG_FILE_DIR, exist_ok=True)
-
 # === Initialize ===
 input_handler = InputHandler(VIDEO_DIR, LOG_DIR, OUTPUT_DIR)
-reporter = ReportGenerator(REPORT_DIR)
-from tools.ai_tools import parse_planning_log, analyze_video_for_action, validate_final_output
 
-tools = [parse_planning_log, analyze_video_for_action, validate_final_output]
+if args.list_runs:
+    for run in input_handler.get_runs():
+        print(f"{run['run_name']}\tlog={run['log_path']}\tvideo={run['video_path'] or '-'}\toutput={run['output_path'] or '-'}")
+    raise SystemExit(0)
+
+os.makedirs(LOG_FILE_DIR, exist_ok=True)
 
-agent = initialize_agent(
-    tools=tools,
-    llm=llm,
-    agent_type=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
-    handle_parsing_errors=True,
-    verbose=True
-)
+reporter = ReportGenerator(REPORT_DIR, results_store_from_args(args))
+processor = RunProcessor(MODEL_PATH, analyzer_options_from_args(args), args.search_mode, COARSE_STRIDE_SEC, ALIGNMENT_MAX_GAP_SEC,
+                         label_matcher_from_args(args), plan_cache_from_args(args),
+                         output_options_from_args(args))
+# Shared by the agent's tools for the whole session (analyzers, memoized results)
+tool_context = ToolContext(processor)
+
+def get_agent(tracer):
+    """
+    Builds the LangChain agent on first use; TinyLlama and LangChain are only
+    imported and loaded once a run actually needs them. Its tools are bound to
+    the session's tool_context.
+    """
+    def build():
+        from langchain.llms import HuggingFacePipeline
+        from langchain.agents import initialize_agent, AgentType
+        from tools.ai_tools import build_tools
+
+        hf_pipeline = get_text_pipeline("text-generation", MODEL_NAME, tracer, max_new_tokens=300)
+        tools = build_tools(tool_context)
+        return initialize_agent(
+            tools=tools,
+            llm=HuggingFacePipeline(pipeline=hf_pipeline),
+            agent_type=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
+            handle_parsing_errors=True,
+            verbose=True
+        )
+
+    return MODEL_REGISTRY.get(("agent", MODEL_NAME), build, tracer, stage="agent_init")
 
 # prompt_template = (
 #     "You are an AI test validation agent.\n"
@@ -62,95 +99,122 @@ agent = initialize_agent(
 # )
 
 
-# === Main Loop ===
-for log_path in input_handler.get_planning_logs():
-    run_name = os.path.splitext(os.path.basename(log_path))[0]
-    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-
-    print(f"[INFO] Starting analysis for: {run_name}")
-
-    videos = input_handler.get_videos()
-    output_files = input_handler.get_final_outputs()
-
-    if not videos or not output_files:
-        print(f"[WARN] Missing videos or output for {run_name}. Skipping.")
-        continue
-
-    with open(log_path, "r") as file:
-        planning_log = file.read()
-
-    final_prompt = (
-        f"You are an AI validation agent.\n"
-        f"Your task is to extract intended steps from the following planning log.\n"
-        f"Use the available tools to complete the task.\n"
-        f"Planning Log:\n{planning_log}\n"
-        f"The log file is located at {log_path}."
-    )
-
-    start_time = time.time()
+def run_agent_for_prompt(prompt, tracer):
+    agent = get_agent(tracer)
+    tokenizer = get_tokenizer(MODEL_NAME, tracer)
 
-    response_text = agent.run(final_prompt).strip()
+    with tracer.span("llm_generate"):
+        response_text = agent.run(prompt).strip()
 
-    prompt_tokens = tokenizer(final_prompt, return_tensors="pt").input_ids.shape[1]
-    response_tokens = tokenizer(response_text, return_tensors="pt").input_ids.shape[1]
+    with tracer.span("tokenize"):
+        prompt_tokens = tokenizer(prompt, return_tensors="pt").input_ids.shape[1]
+        response_tokens = tokenizer(response_text, return_tensors="pt").input_ids.shape[1]
 
-    total_tokens = prompt_tokens + response_tokens
-    total_cost = (total_tokens / 1000) * 0.002
+    return response_text, prompt_tokens, response_tokens
 
-    thoughts_path = os.path.join(LOG_FILE_DIR, f"{run_name}_planner_thoughts_{timestamp}.log")
-    chat_path = os.path.join(LOG_FILE_DIR, f"{run_name}_chat_messages_{timestamp}.log")
-
-    with open(thoughts_path, "w") as f:
-        f.write(f"Prompt Sent:\n{final_prompt}\n")
-        f.write(f"AI Thought Process:\n{response_text}\n")
-
-    with open(chat_path, "w") as f:
-        f.write(f"Prompt:\n{final_prompt}\n")
-        f.write(f"Response:\n{response_text}\n")
-
-    # === Step Validation with Tools ===
-    parser = PlanningLogParser(log_path)
-    steps = parser.parse_steps()
-
-    deviation_engine = DeviationEngine()
-
-    for step in steps:
-        action_id = step["action_id"]
-        description = step["description"]
-
-        analyzer = VideoAnalyzer(videos[0])
-        found, timestamp_sec = analyzer.analyze_for_action(action_id)
-
-        deviation_engine.record_step(description, found, timestamp_sec)
-
-    results = deviation_engine.get_results()
-    output_checker = FinalOutputChecker(output_files[0])
-    output_valid = output_checker.validate_output()
-
-    duration_sec = time.time() - start_time
-
-    logs = {
-        "thoughts": thoughts_path,
-        "chat": chat_path
-    }
-
-    token_usage = {
-        "total_tokens": total_tokens,
-        "total_cost": round(total_cost, 5)
-    }
-
-    reporter.generate_report(
-        run_name=run_name,
-        results=results,
-        output_file_path=output_files[0],
-        video_path=videos[0],
-        token_usage=token_usage,
-        duration_sec=duration_sec,
-        logs=logs,
-        html=True
-    )
-
-    if output_valid:
-        print(f"[INFO] Final output for {run_name} is consistent.")
-    else:
-        print(f"[WARN] Final output for {run_name} shows inconsistencies.")
+# === Main Loop ===
+async def process_runs():
+    global runs_traced
+    loop = asyncio.get_running_loop()
+    # One thread for the agent, two for video analysis and output validation
+    executor = ThreadPoolExecutor(max_workers=3)
+
+    try:
+        for run in input_handler.get_runs():
+            run_name = run["run_name"]
+            log_path = run["log_path"]
+            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+
+            print(f"[INFO] Starting analysis for: {run_name}")
+
+            if not run["video_path"] or not run["output_path"]:
+                print(f"[WARN] Missing video or output for {run_name}. Skipping.")
+                continue
+
+            start_time = time.time()
+            tracer = Tracer(run_name)
+
+            steps = processor.plan_steps(log_path, tracer)
+            tool_context.begin_run(run_name, tracer, steps)
+            planning_log = prompt_log_text(log_path, steps, args.prompt_max_chars)
+
+            final_prompt = (
+                f"You are an AI validation agent.\n"
+                f"Your task is to extract intended steps from the following planning log.\n"
+                f"Use the available tools to complete the task; give tool inputs as JSON objects.\n"
+                f"Planning Log:\n{planning_log}\n"
+                f"The log file is located at {log_path}."
+            )
+
+            # === Agent reasoning and step validation with tools, overlapped ===
+            (response_text, prompt_tokens, response_tokens), (results, output_valid) = await asyncio.gather(
+                loop.run_in_executor(executor, run_agent_for_prompt, final_prompt, tracer),
+                processor.validate_run_async(log_path, run["video_path"], run["output_path"], tracer, executor, steps)
+            )
+
+            total_tokens = prompt_tokens + response_tokens
+            total_cost = (total_tokens / 1000) * 0.002
+
+            thoughts_path = os.path.join(LOG_FILE_DIR, f"{run_name}_planner_thoughts_{timestamp}.log")
+            chat_path = os.path.join(LOG_FILE_DIR, f"{run_name}_chat_messages_{timestamp}.log")
+
+            with open(thoughts_path, "w") as f:
+                f.write(f"Prompt Sent:\n{final_prompt}\n")
+                f.write(f"AI Thought Process:\n{response_text}\n")
+
+            with open(chat_path, "w") as f:
+                f.write(f"Prompt:\n{final_prompt}\n")
+                f.write(f"Response:\n{response_text}\n")
+
+            duration_sec = time.time() - start_time
+
+            logs = {
+                "thoughts": thoughts_path,
+                "chat": chat_path
+            }
+
+            token_usage = {
+                "total_tokens": total_tokens,
+                "total_cost": round(total_cost, 5)
+            }
+
+            tracer.add("run_total", duration_sec)
+
+            with tracer.span("report_write"):
+                reporter.generate_report(
+                    run_name=run_name,
+                    results=results,
+                    output_file_path=run["output_path"],
+                    video_path=run["video_path"],
+                    token_usage=token_usage,
+                    duration_sec=duration_sec,
+                    logs=logs,
+                    html=True,
+                    timings=tracer.summary(),
+                    cache_stats={"agent_tools": tool_context.cache_stats()},
+                    output_valid=output_valid
+                )
+
+            tool_stats = tool_context.stats()
+            if tool_stats:
+                print(f"[INFO] Tool calls for {run_name}: " + ", ".join(
+                    f"{name}={counts['calls']} ({counts['cache_hits']} cached)" for name, counts in tool_stats.items()))
+
+            tracer.export_jsonl(TRACE_JSONL_PATH)
+            session_tracer.merge(tracer.summary())
+            runs_traced += 1
+            if runs_traced == 1:
+                time_to_first_result = time.time() - PROCESS_START
+                session_tracer.add("time_to_first_result", time_to_first_result)
+                print(f"[INFO] Time to first result: {time_to_first_result:.2f}s")
+            session_tracer.export_prometheus(PROMETHEUS_TEXTFILE_PATH, runs=runs_traced, model_loads=MODEL_REGISTRY.stats())
+
+            if output_valid:
+                print(f"[INFO] Final output for {run_name} is consistent.")
+            else:
+                print(f"[WARN] Final output for {run_name} shows inconsistencies.")
+    finally:
+        executor.shutdown(wait=True)
+
+asyncio.run(process_runs())
+print(f"[INFO] Model loads: {MODEL_REGISTRY.stats() or 'none'}")
@@ -0,0 +1,153 @@
+import os
+import json
+import time
+import argparse
+import datetime
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from src.input_handler import InputHandler
+from src.run_processor import RunProcessor
+from src.report_generator import ReportGenerator
+from src.cli_options import add_analysis_arguments, analyzer_options_from_args, label_matcher_from_args, plan_cache_from_args
+from src.cli_options import output_options_from_args, results_store_from_args
+from src.tracing import Tracer
+from config.settings import VIDEO_DIR, LOG_DIR, OUTPUT_DIR, REPORT_DIR, MODEL_PATH, COARSE_STRIDE_SEC, BATCH_WORKERS
+from config.settings import ALIGNMENT_MAX_GAP_SEC, TRACE_JSONL_PATH, PROMETHEUS_TEXTFILE_PATH
+
+# Per-worker state, created once by _init_worker
+_processor = None
+_reporter = None
+
+def _init_worker(analyzer_options, search_mode, label_matcher, plan_cache, output_options, results_store):
+    """
+    Runs once in every worker process so the YOLO weights are loaded a single
+    time per worker and reused for all the runs it handles.
+    """
+    global _processor, _reporter
+    _processor = RunProcessor(MODEL_PATH, analyzer_options, search_mode, COARSE_STRIDE_SEC, ALIGNMENT_MAX_GAP_SEC, label_matcher,
+                              plan_cache, output_options)
+    _reporter = ReportGenerator(REPORT_DIR, results_store)
+    try:
+        _processor.get_model()
+    except Exception as e:
+        # Surfaced again, per run, by process_run
+        print(f"[WARN] Worker {os.getpid()} could not preload model: {e}")
+
+def process_run(run):
+    """
+    Validates one paired run and writes its report. Failures are returned, not raised,
+    so a broken run never aborts the batch.
+    """
+    start_time = time.time()
+    tracer = Tracer(run["run_name"])
+    try:
+        results = _processor.analyze_steps(run["log_path"], run["video_path"], tracer)
+        output_valid = _processor.validate_output(run["output_path"], tracer)
+        duration_sec = time.time() - start_time
+        tracer.add("run_total", duration_sec)
+
+        with tracer.span("report_write"):
+            report_paths = _reporter.generate_report(
+                run_name=run["run_name"],
+                results=results,
+                output_file_path=run["output_path"],
+                video_path=run["video_path"],
+                duration_sec=duration_sec,
+                html=True,
+                timings=tracer.summary(),
+                output_valid=output_valid
+            )
+
+        passed_steps = sum(1 for res in results if res["result"] == "✅ Observed")
+        return {
+            "run_name": run["run_name"],
+            "status": "ok",
+            "output_valid": output_valid,
+            "steps_passed": passed_steps,
+            "steps_failed": len(results) - passed_steps,
+            "duration_sec": round(duration_sec, 2),
+            "reports": report_paths,
+            "timings": tracer.summary()
+        }
+    except Exception as e:
+        return {
+            "run_name": run["run_name"],
+            "status": "error",
+            "error": str(e),
+            "traceback": traceback.format_exc(),
+            "duration_sec": round(time.time() - start_time, 2),
+            "timings": tracer.summary()
+        }
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Validate every paired test run in a process pool")
+    add_analysis_arguments(arg_parser)
+    arg_parser.add_argument("--workers", type=int, default=BATCH_WORKERS, help="Number of worker processes")
+    arg_parser.add_argument("--runs", nargs="*", help="Only process these run names")
+    args = arg_parser.parse_args()
+
+    input_handler = InputHandler(VIDEO_DIR, LOG_DIR, OUTPUT_DIR)
+    runs = input_handler.get_runs()
+    if args.runs:
+        runs = [run for run in runs if run["run_name"] in args.runs]
+
+    summaries = []
+    pending = []
+    session_tracer = Tracer("session")
+    for run in runs:
+        if not run["video_path"] or not run["output_path"]:
+            print(f"[WARN] Missing video or output for {run['run_name']}. Skipping.")
+            summaries.append({"run_name": run["run_name"], "status": "skipped", "error": "missing video or output"})
+        else:
+            pending.append(run)
+
+    results_store = results_store_from_args(args)
+    print(f"[INFO] Dispatching {len(pending)} runs to {args.workers} workers")
+    batch_start = time.time()
+
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                             initargs=(analyzer_options_from_args(args), args.search_mode, label_matcher_from_args(args),
+                                       plan_cache_from_args(args), output_options_from_args(args), results_store)) as pool:
+        futures = {pool.submit(process_run, run): run for run in pending}
+        for future in as_completed(futures):
+            run = futures[future]
+            try:
+                summary = future.result()
+            except Exception as e:
+                summary = {"run_name": run["run_name"], "status": "error", "error": f"worker failed: {e}"}
+
+            # Exported from the parent process so workers never append to the same file
+            run_tracer = Tracer(summary["run_name"])
+            run_tracer.merge(summary.get("timings", {}))
+            run_tracer.export_jsonl(TRACE_JSONL_PATH)
+            session_tracer.merge(run_tracer.summary())
+
+            if summary["status"] == "ok":
+                print(f"[INFO] {summary['run_name']}: {summary['steps_passed']} passed, {summary['steps_failed']} failed ({summary['duration_sec']}s)")
+            else:
+                print(f"[ERROR] {summary['run_name']}: {summary['error']}")
+            summaries.append(summary)
+
+    session_tracer.export_prometheus(PROMETHEUS_TEXTFILE_PATH, runs=len(pending))
+    if results_store is not None:
+        # Workers refresh it as they go; rebuilt once more so it includes every run of the batch
+        print(f"[INFO] Dashboard: {results_store.write_dashboard(REPORT_DIR)['html']}")
+    summaries.sort(key=lambda summary: summary["run_name"])
+    failed = [summary for summary in summaries if summary["status"] != "ok"]
+
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    summary_path = os.path.join(REPORT_DIR, f"batch_summary_{timestamp}.json")
+    with open(summary_path, "w") as f:
+        json.dump({
+            "total_runs": len(summaries),
+            "failed_runs": len(failed),
+            "wall_clock_sec": round(time.time() - batch_start, 2),
+            "runs": summaries
+        }, f, indent=2)
+
+    print(f"[INFO] Batch finished: {len(summaries) - len(failed)}/{len(summaries)} runs succeeded. Summary: {summary_path}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,73 @@
+import signal
+import argparse
+import threading
+from src.input_handler import InputHandler
+from src.run_processor import RunProcessor
+from src.report_generator import ReportGenerator
+from src.cli_options import add_analysis_arguments, analyzer_options_from_args, label_matcher_from_args, plan_cache_from_args
+from src.cli_options import output_options_from_args, results_store_from_args, add_prompt_arguments
+from src.llm_cache import LLMResponseCache
+from src.llm_step_extractor import LLMStepExtractor
+from src.analysis_service import AnalysisService, make_server
+from config.settings import VIDEO_DIR, LOG_DIR, OUTPUT_DIR, REPORT_DIR, LLM_MODEL, COST_PER_1000_TOKENS
+from config.settings import MODEL_PATH, COARSE_STRIDE_SEC, ALIGNMENT_MAX_GAP_SEC
+from config.settings import LLM_MAX_NEW_TOKENS, LLM_CACHE_PATH, LLM_CACHE_MAX_MB
+from config.settings import SERVICE_HOST, SERVICE_PORT, SERVICE_QUEUE_SIZE, SERVICE_WORKERS, SERVICE_JOB_HISTORY
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Serve test-run validation jobs with warm models")
+    add_analysis_arguments(arg_parser)
+    add_prompt_arguments(arg_parser)
+    arg_parser.add_argument("--host", default=SERVICE_HOST)
+    arg_parser.add_argument("--port", type=int, default=SERVICE_PORT)
+    arg_parser.add_argument("--socket", help="Listen on this Unix socket instead of host:port")
+    arg_parser.add_argument("--workers", type=int, default=SERVICE_WORKERS, help="Jobs processed concurrently")
+    arg_parser.add_argument("--queue-size", type=int, default=SERVICE_QUEUE_SIZE, help="Queued jobs before submissions get HTTP 429")
+    arg_parser.add_argument("--no-llm", action="store_true", help="Skip LLM step extraction (no token usage in reports)")
+    arg_parser.add_argument("--no-llm-cache", action="store_true", help="Always run the LLM instead of reusing cached responses")
+    arg_parser.add_argument("--preload", action="store_true", help="Load the models at startup instead of on the first job")
+    args = arg_parser.parse_args()
+
+    processor = RunProcessor(MODEL_PATH, analyzer_options_from_args(args), args.search_mode, COARSE_STRIDE_SEC, ALIGNMENT_MAX_GAP_SEC,
+                             label_matcher_from_args(args), plan_cache_from_args(args),
+                             output_options_from_args(args))
+    extractor = None
+    if not args.no_llm:
+        llm_cache = None if args.no_llm_cache else LLMResponseCache(LLM_CACHE_PATH, LLM_CACHE_MAX_MB * 1024 * 1024)
+        extractor = LLMStepExtractor(LLM_MODEL, {"max_new_tokens": LLM_MAX_NEW_TOKENS}, cache=llm_cache)
+
+    if args.preload:
+        processor.get_model()
+        processor.get_label_matcher()
+        if extractor is not None:
+            extractor.load()
+
+    service = AnalysisService(
+        processor,
+        ReportGenerator(REPORT_DIR, results_store_from_args(args)),
+        input_handler=InputHandler(VIDEO_DIR, LOG_DIR, OUTPUT_DIR),
+        extractor=extractor,
+        cost_per_1000_tokens=COST_PER_1000_TOKENS,
+        queue_size=args.queue_size,
+        workers=args.workers,
+        job_history=SERVICE_JOB_HISTORY,
+        prompt_max_chars=args.prompt_max_chars
+    )
+    service.start()
+
+    server = make_server(service, args.host, args.port, args.socket)
+    print(f"[INFO] Listening on {args.socket or f'http://{args.host}:{args.port}'}")
+
+    # serve_forever blocks, so SIGTERM stops it from another thread
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print("[INFO] Shutting down; waiting for running jobs")
+        server.server_close()
+        service.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import os
+import sys
+import json
+import time
+import argparse
+from src.planning_parser import PlanningLogParser
+from src.video_analyzer import VideoAnalyzer
+from src.detection_timeline import OccurrenceTimeline
+from src.deviation_engine import DeviationEngine, IncrementalAligner
+from src.output_checker import FinalOutputChecker
+from src.frame_stream import follow_video_file, read_raw_frames
+from src.report_generator import ReportGenerator
+from src.tracing import Tracer
+from src.cli_options import add_detector_arguments, detector_from_args, add_label_arguments, label_matcher_from_args
+from src.cli_options import add_report_arguments, results_store_from_args, add_input_arguments, plan_cache_from_args
+from src.cli_options import output_options_from_args
+from src.label_matcher import get_label_matcher, describe_unmapped
+from config.settings import REPORT_DIR, MODEL_PATH, MOTION_THRESHOLD, ALIGNMENT_MAX_GAP_SEC
+from config.settings import TRACE_JSONL_PATH, STREAM_POLL_INTERVAL_SEC, STREAM_IDLE_TIMEOUT_SEC
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Validate a test run while its recording is still being written")
+    arg_parser.add_argument("--log", required=True, help="Planning log of the run")
+    source = arg_parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--video", help="Growing video file to follow")
+    source.add_argument("--pipe", help="Raw BGR24 frame stream: a FIFO path, or - for stdin")
+    arg_parser.add_argument("--width", type=int, help="Frame width for --pipe")
+    arg_parser.add_argument("--height", type=int, help="Frame height for --pipe")
+    arg_parser.add_argument("--fps", type=float, default=30.0, help="Frame rate for --pipe")
+    arg_parser.add_argument("--output", help="Final test output to validate once the stream ends")
+    arg_parser.add_argument("--run-name", help="Defaults to the planning log name")
+    arg_parser.add_argument("--motion-threshold", type=float, default=MOTION_THRESHOLD, help="Opt-in motion gating threshold (0-255); 0, the default, disables it")
+    arg_parser.add_argument("--batch-size", type=int, default=1, help="Frames per detector call; verdicts wait for a full batch")
+    arg_parser.add_argument("--poll-interval", type=float, default=STREAM_POLL_INTERVAL_SEC)
+    arg_parser.add_argument("--idle-timeout", type=float, default=STREAM_IDLE_TIMEOUT_SEC,
+                            help="End a followed file after this many seconds without new frames")
+    add_input_arguments(arg_parser)
+    add_detector_arguments(arg_parser)
+    add_label_arguments(arg_parser)
+    add_report_arguments(arg_parser)
+    args = arg_parser.parse_args()
+    if args.pipe and not (args.width and args.height):
+        arg_parser.error("--pipe needs --width and --height")
+
+    run_name = args.run_name or os.path.splitext(os.path.basename(args.log))[0]
+    source_name = args.video or args.pipe
+    tracer = Tracer(run_name)
+    start_time = time.time()
+
+    steps = PlanningLogParser(args.log, plan_cache_from_args(args)).parse_steps()
+    unmapped = get_label_matcher(label_matcher_from_args(args), tracer).resolve_steps(steps, tracer)
+    if unmapped:
+        print(f"[WARN] {args.log}: {describe_unmapped(unmapped, len(steps))}")
+
+    if args.video:
+        frames = follow_video_file(args.video, args.poll_interval, args.idle_timeout, tracer)
+        stream = None
+    else:
+        stream = sys.stdin.buffer if args.pipe == "-" else open(args.pipe, "rb")
+        frames = read_raw_frames(stream, args.width, args.height, args.fps, tracer)
+
+    timeline = OccurrenceTimeline(source_name, args.fps if args.pipe else None, ALIGNMENT_MAX_GAP_SEC)
+    aligner = IncrementalAligner(steps)
+    analyzer = VideoAnalyzer(source_name, MODEL_PATH, motion_threshold=args.motion_threshold or None,
+                             batch_size=args.batch_size, tracer=tracer, detector=detector_from_args(args))
+
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    verdicts_path = os.path.join(REPORT_DIR, f"{run_name}_live_verdicts.jsonl")
+    print(f"[INFO] Streaming analysis of {source_name} for {run_name}; verdicts go to {verdicts_path}")
+
+    with open(verdicts_path, "a") as verdicts_file:
+        def emit(verdict, stream_sec):
+            # Stream position when the verdict was settled, and how far behind the action that is
+            verdict = {"run": run_name, "stream_sec": round(stream_sec, 2), **verdict}
+            if verdict["timestamp"] is not None:
+                verdict["lag_sec"] = round(stream_sec - verdict["timestamp"], 2)
+            verdicts_file.write(json.dumps(verdict, ensure_ascii=False) + "\n")
+            verdicts_file.flush()
+            print(f"[INFO] Step {verdict['step_index'] + 1} '{verdict['description']}' at stream {verdict['stream_sec']}s: "
+                  f"{verdict['result']} ({verdict['notes']})")
+
+        stream_sec = 0.0
+        try:
+            for stream_sec, started in analyzer.analyze_stream(frames, timeline, {step["label"] for step in steps if step["label"]} or None):
+                for label, timestamp in started:
+                    for verdict in aligner.observe(label, timestamp):
+                        emit(verdict, stream_sec)
+        finally:
+            if stream is not None and stream is not sys.stdin.buffer:
+                stream.close()
+
+        for verdict in aligner.finish():
+            emit(verdict, stream_sec)
+
+    # Final verdicts: the whole plan aligned against every occurrence seen
+    with tracer.span("step_alignment"):
+        results = DeviationEngine().align_steps(steps, timeline, ALIGNMENT_MAX_GAP_SEC)
+    output_valid = None
+    if args.output:
+        with tracer.span("output_validation"):
+            output_valid = FinalOutputChecker(args.output, **output_options_from_args(args)).validate_output()
+
+    duration_sec = time.time() - start_time
+    tracer.add("run_total", duration_sec)
+    with tracer.span("report_write"):
+        ReportGenerator(REPORT_DIR, results_store_from_args(args)).generate_report(
+            run_name=run_name,
+            results=results,
+            output_file_path=args.output,
+            video_path=source_name,
+            duration_sec=duration_sec,
+            html=True,
+            timings=tracer.summary(),
+            output_valid=output_valid
+        )
+    tracer.export_jsonl(TRACE_JSONL_PATH)
+
+    if output_valid is False:
+        print(f"[WARN] Final output for {run_name} shows inconsistencies.")
+    elif output_valid:
+        print(f"[INFO] Final output for {run_name} is consistent.")
+
+if __name__ == "__main__":
+    main()
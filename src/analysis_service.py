@@ -0,0 +1,284 @@
+import os
+import json
+import time
+import uuid
+import queue
+import threading
+import traceback
+import socketserver
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.tracing import Tracer
+from src.model_registry import MODEL_REGISTRY
+from src.llm_step_extractor import build_prompt
+from src.planning_parser import prompt_log_text
+
+_STOP = object()
+
+class AnalysisService:
+    """
+    Long-lived job runner that keeps the YOLO and LLM models resident between
+    runs. Jobs wait in a bounded queue and are processed by `workers` threads.
+    The detector and the LLM each get a single-thread executor, since neither
+    model is safe to call from several threads at once: one job's LLM
+    extraction can overlap another job's video analysis, and output checks
+    and report writing run fully in parallel.
+    """
+    def __init__(self, processor, reporter, input_handler=None, extractor=None, cost_per_1000_tokens=0.0,
+                 queue_size=32, workers=2, job_history=1000, prompt_max_chars=None):
+        self.processor = processor
+        self.reporter = reporter
+        self.input_handler = input_handler
+        self.extractor = extractor
+        self.cost_per_1000_tokens = cost_per_1000_tokens
+        self.workers = max(1, workers)
+        self.job_history = job_history
+        self.prompt_max_chars = prompt_max_chars
+
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._video_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="video")
+        self._llm_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="llm")
+        self._threads = []
+        self._stopping = threading.Event()
+        self.started_at = time.time()
+
+    def start(self):
+        for idx in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"job-worker-{idx}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        print(f"[INFO] Analysis service started with {self.workers} workers, queue size {self.queue.maxsize}")
+
+    def stop(self):
+        """
+        Lets running jobs finish; queued jobs that were not started stay 'queued'.
+        Workers check the stop event before each job, so the backlog is not drained.
+        """
+        self._stopping.set()
+        # Wakes idle workers; each exiting worker passes it on (see _worker)
+        try:
+            self.queue.put_nowait(_STOP)
+        except queue.Full:
+            pass
+        for thread in self._threads:
+            thread.join()
+        self._video_executor.shutdown(wait=True)
+        self._llm_executor.shutdown(wait=True)
+
+    def submit(self, spec):
+        """
+        Queues a job. `spec` holds either run_name (resolved with the InputHandler)
+        or log_path, video_path and output_path (run_name optional).
+        Raises ValueError for an invalid spec and queue.Full when the queue is full.
+        """
+        job = self._resolve(spec)
+        job.update({
+            "job_id": uuid.uuid4().hex[:12],
+            "status": "queued",
+            "submitted_at": time.time()
+        })
+
+        with self._lock:
+            self.queue.put_nowait(job)
+            self.jobs[job["job_id"]] = job
+            self._trim_history()
+        return dict(job)
+
+    def get(self, job_id):
+        with self._lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def list_jobs(self):
+        with self._lock:
+            return [dict(job) for job in self.jobs.values()]
+
+    def health(self):
+        with self._lock:
+            statuses = [job["status"] for job in self.jobs.values()]
+        return {
+            "status": "ok",
+            "uptime_sec": round(time.time() - self.started_at, 1),
+            "workers": self.workers,
+            "queue_size": self.queue.maxsize,
+            "queued": statuses.count("queued"),
+            "running": statuses.count("running"),
+            "done": statuses.count("done"),
+            "failed": statuses.count("failed"),
+            "models": MODEL_REGISTRY.stats()
+        }
+
+    def _resolve(self, spec):
+        if not isinstance(spec, dict):
+            raise ValueError("job must be a JSON object")
+
+        if "log_path" not in spec:
+            if not spec.get("run_name") or self.input_handler is None:
+                raise ValueError("job needs run_name or log_path, video_path and output_path")
+            runs = {run["run_name"]: run for run in self.input_handler.get_runs()}
+            if spec["run_name"] not in runs:
+                raise ValueError(f"unknown run: {spec['run_name']}")
+            spec = runs[spec["run_name"]]
+
+        job = {}
+        for key in ("log_path", "video_path", "output_path"):
+            path = spec.get(key)
+            if not path or not os.path.isfile(path):
+                raise ValueError(f"{key} missing or not a file: {path}")
+            job[key] = path
+        job["run_name"] = spec.get("run_name") or os.path.splitext(os.path.basename(job["log_path"]))[0]
+        return job
+
+    def _trim_history(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job["status"] in ("done", "failed")]
+        for job_id in finished[:max(0, len(self.jobs) - self.job_history)]:
+            del self.jobs[job_id]
+
+    def _update(self, job, **fields):
+        with self._lock:
+            job.update(fields)
+
+    def _worker(self):
+        while True:
+            job = self.queue.get()
+            if job is _STOP or self._stopping.is_set():
+                # A job taken here stays 'queued'; the queue has room again for the wake-up
+                try:
+                    self.queue.put_nowait(_STOP)
+                except queue.Full:
+                    pass
+                return
+            self._update(job, status="running", started_at=time.time())
+            print(f"[INFO] Job {job['job_id']} started: {job['run_name']}")
+            try:
+                self._update(job, status="done", finished_at=time.time(), **self._process(job))
+                print(f"[INFO] Job {job['job_id']} done: {job['steps_passed']} passed, {job['steps_failed']} failed")
+            except Exception as e:
+                self._update(job, status="failed", finished_at=time.time(), error=str(e), traceback=traceback.format_exc())
+                print(f"[ERROR] Job {job['job_id']} failed: {e}")
+
+    def _process(self, job):
+        start_time = time.time()
+        tracer = Tracer(job["run_name"])
+
+        # Parsed once (or served from the plan cache) for both the prompt and the video analysis
+        steps = self.processor.plan_steps(job["log_path"], tracer)
+        llm_future = None
+        if self.extractor is not None:
+            prompt = build_prompt(prompt_log_text(job["log_path"], steps, self.prompt_max_chars))
+            llm_future = self._llm_executor.submit(self.extractor.extract, prompt, tracer)
+
+        video_future = self._video_executor.submit(self.processor.analyze_steps, job["log_path"], job["video_path"], tracer, steps)
+        output_valid = self.processor.validate_output(job["output_path"], tracer)
+        results = video_future.result()
+
+        token_usage = None
+        llm_steps = None
+        if llm_future is not None:
+            extraction = llm_future.result()
+            total_tokens = extraction["prompt_tokens"] + extraction["response_tokens"]
+            token_usage = {
+                "total_tokens": total_tokens,
+                "total_cost": round((total_tokens / 1000) * self.cost_per_1000_tokens, 5)
+            }
+            llm_steps = extraction["steps_text"]
+
+        duration_sec = time.time() - start_time
+        tracer.add("run_total", duration_sec)
+
+        with tracer.span("report_write"):
+            report_paths = self.reporter.generate_report(
+                run_name=job["run_name"],
+                results=results,
+                output_file_path=job["output_path"],
+                video_path=job["video_path"],
+                token_usage=token_usage,
+                duration_sec=duration_sec,
+                html=True,
+                timings=tracer.summary(),
+                output_valid=output_valid,
+                report_id=job["job_id"]
+            )
+
+        passed_steps = sum(1 for res in results if res["result"] == "✅ Observed")
+        return {
+            "output_valid": output_valid,
+            "steps_passed": passed_steps,
+            "steps_failed": len(results) - passed_steps,
+            "llm_steps": llm_steps,
+            "duration_sec": round(duration_sec, 2),
+            "reports": report_paths,
+            "timings": tracer.summary()
+        }
+
+class ServiceRequestHandler(BaseHTTPRequestHandler):
+    """
+    JSON API:
+      POST /jobs          submit {"run_name": ...} or {"log_path", "video_path", "output_path"}
+      GET  /jobs          all known jobs
+      GET  /jobs/<job_id> one job's status, results and report paths
+      GET  /health        queue depth, worker count and model loads
+    """
+    service = None
+
+    def do_GET(self):
+        path = self.path.rstrip("/")
+        if path == "/health":
+            self._send(200, self.service.health())
+        elif path == "/jobs":
+            self._send(200, {"jobs": self.service.list_jobs()})
+        elif path.startswith("/jobs/"):
+            job = self.service.get(path[len("/jobs/"):])
+            if job is None:
+                self._send(404, {"error": "unknown job"})
+            else:
+                self._send(200, job)
+        else:
+            self._send(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/jobs":
+            self._send(404, {"error": "not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            job = self.service.submit(json.loads(self.rfile.read(length) or b"{}"))
+        except (ValueError, json.JSONDecodeError) as e:
+            self._send(400, {"error": str(e)})
+            return
+        except queue.Full:
+            self._send(429, {"error": "job queue is full, retry later"})
+            return
+        self._send(202, job)
+
+    def _send(self, status, payload):
+        body = json.dumps(payload, indent=2).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self):
+        # Unix-socket peers have no (host, port) address
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format, *args):
+        print(f"[INFO] {self.address_string()} {format % args}")
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def make_server(service, host=None, port=None, socket_path=None):
+    """
+    HTTP server for the service on host:port, or on a Unix socket when socket_path is set.
+    """
+    handler = type("BoundServiceRequestHandler", (ServiceRequestHandler,), {"service": service})
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        return ThreadingUnixHTTPServer(socket_path, handler)
+    return ThreadingHTTPServer((host, port), handler)
@@ -0,0 +1,138 @@
+from config.settings import DETECTION_CACHE_PATH, DETECTION_CACHE_MAX_MB, MOTION_THRESHOLD
+from config.settings import INFERENCE_BATCH_SIZE, DECODE_QUEUE_SIZE, VIDEO_SHARDS
+from config.settings import MODEL_PATH, DETECTOR_BACKEND, ONNX_MODEL_PATH, ONNX_INT8_MODEL_PATH, DETECTOR_IMGSZ, DETECTOR_THREADS
+from src.detection_cache import DetectionCache
+from src.plan_cache import PlanCache
+from src.results_store import ResultsStore
+from config.settings import PLAN_CACHE_PATH, PLAN_CACHE_MAX_MB, OUTPUT_PASS_MARKERS, OUTPUT_FAIL_MARKERS, RESULTS_DB_PATH
+from config.settings import ROI_MODE, ROI_REGIONS, ROI_LEARNED_PATH, ROI_TILE_SIZE, ROI_MARGIN, ROI_GRID, ROI_RESCAN_INTERVAL
+from config.settings import ROI_CHANGE_THRESHOLD
+from config.settings import DETECTOR_LABELS, LABEL_EMBEDDER, LABEL_MATCH_THRESHOLD, EMBEDDING_CACHE_PATH
+from config.settings import LLM_PROMPT_MAX_CHARS
+from src.detectors import detector_spec
+from src.roi import roi_params
+from src.label_matcher import label_matcher_spec
+from src.video_analyzer import ACTION_LABEL_MAP
+
+def add_analysis_arguments(arg_parser):
+    """
+    Registers the video analysis options shared by the entry scripts.
+    """
+    arg_parser.add_argument("--motion-threshold", type=float, default=MOTION_THRESHOLD,
+                            help="Skip inference on frames whose thumbnail changed less than this (0-255); "
+                                 "off by default (0), as it can miss small, brief UI changes")
+    arg_parser.add_argument("--batch-size", type=int, default=INFERENCE_BATCH_SIZE, help="Frames per detector call")
+    arg_parser.add_argument("--no-pipeline", action="store_true", help="Decode frames on the inference thread")
+    arg_parser.add_argument("--shards", type=int, default=VIDEO_SHARDS,
+                            help="Analyze each video as this many frame ranges in parallel processes")
+    arg_parser.add_argument("--search-mode", choices=["timeline", "coarse"], default="timeline",
+                            help="timeline: one full detection pass per video; coarse: sampled search per step, "
+                                 "starting after the previous step's timestamp")
+    add_input_arguments(arg_parser)
+    add_detector_arguments(arg_parser)
+    add_label_arguments(arg_parser)
+    add_report_arguments(arg_parser)
+
+def add_input_arguments(arg_parser):
+    """
+    Registers the cache and final-output options (also used by run_stream.py).
+    """
+    arg_parser.add_argument("--no-cache", action="store_true", help="Bypass the on-disk detection and planning-log caches")
+    arg_parser.add_argument("--output-format", choices=["auto", "text", "json", "jsonl"], default="auto",
+                            help="How final outputs are validated; auto picks by file extension")
+
+def add_detector_arguments(arg_parser):
+    """
+    Registers the detector backend options (also used on their own by run_stream.py).
+    """
+    arg_parser.add_argument("--backend", choices=["ultralytics", "onnx", "onnx-int8"], default=DETECTOR_BACKEND,
+                            help="Detector backend: PyTorch via Ultralytics, or ONNX Runtime with the FP32 or int8 export")
+    arg_parser.add_argument("--imgsz", type=int, default=DETECTOR_IMGSZ, help="Detector input resolution (0 = backend default)")
+    arg_parser.add_argument("--threads", type=int, default=DETECTOR_THREADS, help="ONNX Runtime intra-op threads (0 = default)")
+    arg_parser.add_argument("--roi", choices=["off", "static", "auto"], default=ROI_MODE,
+                            help="Infer only on tiles around configured (static) or configured and learned (auto) regions")
+    arg_parser.add_argument("--roi-tile-size", type=int, default=ROI_TILE_SIZE, help="Longest tile side after downscaling")
+
+def add_label_arguments(arg_parser):
+    """
+    Registers the step-to-label matching options (also used by run_stream.py).
+    """
+    arg_parser.add_argument("--label-embedder", default=LABEL_EMBEDDER,
+                            help="\"hashing\" or a Hugging Face embedding model used to match steps to detector labels")
+    arg_parser.add_argument("--label-threshold", type=float, default=LABEL_MATCH_THRESHOLD,
+                            help="Minimum cosine similarity between a step and a detector label")
+
+def add_prompt_arguments(arg_parser):
+    """
+    Registers the LLM prompt options of the entry scripts that prompt an LLM.
+    """
+    arg_parser.add_argument("--prompt-max-chars", type=int, default=LLM_PROMPT_MAX_CHARS,
+                            help="Send the parsed steps, cut at this many characters, instead of the raw planning log")
+
+def add_report_arguments(arg_parser):
+    """
+    Registers the run history options (also used by run_stream.py).
+    """
+    arg_parser.add_argument("--no-results-store", action="store_true",
+                            help="Do not record runs in the results store or refresh the aggregate dashboard")
+
+def results_store_from_args(args):
+    """
+    The append-only results store, unless --no-results-store was given.
+    """
+    return None if args.no_results_store else ResultsStore(RESULTS_DB_PATH)
+
+def label_matcher_from_args(args):
+    """
+    label_matcher.label_matcher_spec for --label-embedder/--label-threshold.
+    """
+    return label_matcher_spec(DETECTOR_LABELS, args.label_embedder, args.label_threshold, DETECTOR_LABELS,
+                              ACTION_LABEL_MAP, EMBEDDING_CACHE_PATH)
+
+def plan_cache_from_args(args):
+    """
+    The parsed planning-log cache, unless --no-cache was given.
+    """
+    return None if args.no_cache else PlanCache(PLAN_CACHE_PATH, PLAN_CACHE_MAX_MB * 1024 * 1024)
+
+def output_options_from_args(args):
+    """
+    FinalOutputChecker keyword arguments: the configured markers and --output-format.
+    """
+    return {
+        "pass_markers": OUTPUT_PASS_MARKERS,
+        "fail_markers": OUTPUT_FAIL_MARKERS,
+        "mode": args.output_format
+    }
+
+def analyzer_options_from_args(args):
+    """
+    Builds the VideoAnalyzer keyword arguments for the parsed command line.
+    """
+    detection_cache = None if args.no_cache else DetectionCache(DETECTION_CACHE_PATH, DETECTION_CACHE_MAX_MB * 1024 * 1024)
+    return {
+        "cache": detection_cache,
+        "motion_threshold": args.motion_threshold,
+        "batch_size": args.batch_size,
+        "pipelined": not args.no_pipeline,
+        "queue_size": DECODE_QUEUE_SIZE,
+        "shards": args.shards,
+        "detector": detector_from_args(args)
+    }
+
+def detector_from_args(args):
+    """
+    detectors.detector_spec for --backend/--imgsz/--threads/--roi.
+    """
+    roi = None
+    imgsz = args.imgsz or None
+    if args.roi != "off":
+        roi = roi_params(args.roi, ROI_REGIONS, args.roi_tile_size, ROI_MARGIN, ROI_GRID, ROI_RESCAN_INTERVAL, ROI_LEARNED_PATH,
+                         ROI_CHANGE_THRESHOLD)
+        # Small tiles only save compute if the detector does not scale them back up
+        imgsz = imgsz or args.roi_tile_size
+
+    if args.backend == "ultralytics":
+        return detector_spec("ultralytics", MODEL_PATH, imgsz, roi=roi)
+    weights_path = ONNX_INT8_MODEL_PATH if args.backend == "onnx-int8" else ONNX_MODEL_PATH
+    return detector_spec("onnx", weights_path, imgsz, args.threads or None, roi)
@@ -0,0 +1,140 @@
+import os
+import json
+import time
+import hashlib
+from contextlib import closing
+from src.sqlite_store import LruSqliteCache
+
+class DetectionCache(LruSqliteCache):
+    """
+    Persistent per-frame detection cache backed by SQLite.
+    Entries are keyed by a content hash of the video, the model weights and the
+    inference settings, and evicted least-recently-used once the store exceeds max_bytes.
+    """
+    name = "Detection cache"
+    table = "entries"
+    schema = """
+        CREATE TABLE IF NOT EXISTS entries (
+            key TEXT PRIMARY KEY,
+            video_hash TEXT NOT NULL,
+            model_path TEXT NOT NULL,
+            model_hash TEXT NOT NULL,
+            settings TEXT NOT NULL,
+            frame_count INTEGER NOT NULL,
+            size_bytes INTEGER NOT NULL,
+            last_access REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS frames (
+            key TEXT NOT NULL,
+            frame_idx INTEGER NOT NULL,
+            timestamp REAL NOT NULL,
+            detections TEXT NOT NULL,
+            PRIMARY KEY (key, frame_idx)
+        );
+        CREATE TABLE IF NOT EXISTS file_digests (
+            path TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            mtime REAL NOT NULL,
+            digest TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_entries_access ON entries(last_access);
+    """
+
+    def __init__(self, db_path="cache/detections.sqlite", max_bytes=256 * 1024 * 1024):
+        super().__init__(db_path, max_bytes)
+
+    def file_digest(self, path):
+        """
+        SHA-256 of a file's content. Digests are remembered by (path, size, mtime)
+        so unchanged files are only hashed once.
+        """
+        stat = os.stat(path)
+        abs_path = os.path.abspath(path)
+
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute(
+                "SELECT digest FROM file_digests WHERE path = ? AND size = ? AND mtime = ?",
+                (abs_path, stat.st_size, stat.st_mtime)
+            ).fetchone()
+            if row:
+                return row[0]
+
+            sha = hashlib.sha256()
+            with open(path, "rb") as file:
+                for chunk in iter(lambda: file.read(1024 * 1024), b""):
+                    sha.update(chunk)
+            digest = sha.hexdigest()
+
+            conn.execute(
+                "INSERT OR REPLACE INTO file_digests (path, size, mtime, digest) VALUES (?, ?, ?, ?)",
+                (abs_path, stat.st_size, stat.st_mtime, digest)
+            )
+        return digest
+
+    def make_key(self, video_path, model_path, settings):
+        """
+        Returns (key, video_hash, model_hash) for a video/model/settings combination.
+        """
+        video_hash = self.file_digest(video_path)
+        model_hash = self.file_digest(model_path)
+        settings_blob = json.dumps(settings or {}, sort_keys=True)
+        key = hashlib.sha256(f"{video_hash}:{model_hash}:{settings_blob}".encode()).hexdigest()
+        return key, video_hash, model_hash
+
+    def get(self, key):
+        """
+        Returns the cached frames as a list of (frame_idx, timestamp, detections), or None on a miss.
+        """
+        with closing(self._connect()) as conn, conn:
+            entry = conn.execute("SELECT frame_count FROM entries WHERE key = ?", (key,)).fetchone()
+            if entry is None:
+                self.misses += 1
+                return None
+
+            conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+            rows = conn.execute(
+                "SELECT frame_idx, timestamp, detections FROM frames WHERE key = ? ORDER BY frame_idx",
+                (key,)
+            ).fetchall()
+
+        self.hits += 1
+        return [(frame_idx, timestamp, [tuple(det) for det in json.loads(detections)]) for frame_idx, timestamp, detections in rows]
+
+    def put(self, key, video_hash, model_path, model_hash, settings, frames):
+        """
+        Stores per-frame detections, then drops entries made with stale weights and
+        evicts least-recently-used entries until the store fits in max_bytes.
+        """
+        rows = [(key, frame_idx, timestamp, json.dumps(detections)) for frame_idx, timestamp, detections in frames]
+        size_bytes = sum(len(row[3]) + 16 for row in rows)
+
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM frames WHERE key = ?", (key,))
+            conn.executemany("INSERT INTO frames (key, frame_idx, timestamp, detections) VALUES (?, ?, ?, ?)", rows)
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, video_hash, model_path, model_hash, settings, frame_count, size_bytes, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, video_hash, os.path.abspath(model_path), model_hash, json.dumps(settings or {}, sort_keys=True), len(rows), size_bytes, time.time())
+            )
+
+        self.invalidate_model(model_path, model_hash)
+        self.evict()
+
+    def invalidate_model(self, model_path, current_hash):
+        """
+        Removes entries produced by an older version of the weights at model_path.
+        """
+        with closing(self._connect()) as conn, conn:
+            stale = conn.execute(
+                "SELECT key FROM entries WHERE model_path = ? AND model_hash != ?",
+                (os.path.abspath(model_path), current_hash)
+            ).fetchall()
+            self._delete(conn, [row[0] for row in stale])
+
+        if stale:
+            print(f"[INFO] Detection cache: invalidated {len(stale)} entries for updated model {model_path}")
+
+    def _delete(self, conn, keys):
+        for key in keys:
+            conn.execute("DELETE FROM frames WHERE key = ?", (key,))
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
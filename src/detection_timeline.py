@@ -0,0 +1,146 @@
+import bisect
+
+class DetectionTimeline:
+    """
+    Per-label index of detection events collected in a single pass over a video.
+    Events are appended in frame order, so first/last lookups are O(1).
+    """
+    def __init__(self, video_path=None, fps=None, frame_count=0):
+        self.video_path = video_path
+        self.fps = fps
+        self.frame_count = frame_count
+        self.frames_processed = 0
+        self.events = {}
+
+    def add_frame(self, timestamp, detections):
+        """
+        Records one decoded frame. `detections` is an iterable of (label, confidence);
+        only the best confidence per label is kept for the frame.
+        """
+        best = {}
+        for label, confidence in detections:
+            label = label.lower()
+            if confidence > best.get(label, -1.0):
+                best[label] = confidence
+
+        for label, confidence in best.items():
+            self.events.setdefault(label, []).append((round(timestamp, 2), round(confidence, 4)))
+
+        self.frames_processed += 1
+
+    def labels(self):
+        return list(self.events.keys())
+
+    def all(self, label):
+        return self.events.get(label.lower(), [])
+
+    def first(self, label):
+        events = self.all(label)
+        return events[0] if events else None
+
+    def last(self, label):
+        events = self.all(label)
+        return events[-1] if events else None
+
+    def first_between(self, label, start_sec=None, end_sec=None):
+        """
+        First event for label inside [start_sec, end_sec]; either bound may be None.
+        """
+        events = self.all(label)
+        idx = bisect.bisect_left(events, (start_sec, -1.0)) if start_sec is not None else 0
+        if idx < len(events) and (end_sec is None or events[idx][0] <= end_sec):
+            return events[idx]
+        return None
+
+    def occurrences(self, label, max_gap_sec=1.0):
+        """
+        Collapses per-frame events into distinct occurrences: runs of events no more
+        than max_gap_sec apart. Returns a list of (start_sec, end_sec, max_confidence).
+        """
+        runs = []
+        for timestamp, confidence in self.all(label):
+            if runs and timestamp - runs[-1][1] <= max_gap_sec:
+                start, _, best = runs[-1]
+                runs[-1] = (start, timestamp, max(best, confidence))
+            else:
+                runs.append((timestamp, timestamp, confidence))
+        return runs
+
+    def to_dict(self):
+        return {
+            "video_path": self.video_path,
+            "fps": self.fps,
+            "frame_count": self.frame_count,
+            "frames_processed": self.frames_processed,
+            "events": {label: [list(event) for event in events] for label, events in self.events.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        timeline = cls(data.get("video_path"), data.get("fps"), data.get("frame_count", 0))
+        timeline.frames_processed = data.get("frames_processed", 0)
+        timeline.events = {label: [tuple(event) for event in events] for label, events in data.get("events", {}).items()}
+        return timeline
+
+class OccurrenceTimeline:
+    """
+    Constant-memory variant of DetectionTimeline for unbounded streams. Instead of
+    one event per frame it keeps only occurrences per label, i.e. runs of events
+    no more than max_gap_sec apart, so memory grows with the number of distinct
+    appearances rather than with stream length. Provides the subset of the
+    DetectionTimeline interface used by DeviationEngine.align_steps.
+    """
+    def __init__(self, video_path=None, fps=None, max_gap_sec=1.0):
+        self.video_path = video_path
+        self.fps = fps
+        self.max_gap_sec = max_gap_sec
+        self.frames_processed = 0
+        self.runs = {}
+
+    def add_frame(self, timestamp, detections):
+        """
+        Same input as DetectionTimeline.add_frame. Returns the labels for which this
+        frame starts a new occurrence, as a list of (label, timestamp).
+        """
+        timestamp = round(timestamp, 2)
+        best = {}
+        for label, confidence in detections:
+            label = label.lower()
+            if confidence > best.get(label, -1.0):
+                best[label] = confidence
+
+        started = []
+        for label, confidence in best.items():
+            runs = self.runs.setdefault(label, [])
+            if runs and timestamp - runs[-1][1] <= self.max_gap_sec:
+                start, _, best_conf = runs[-1]
+                runs[-1] = (start, timestamp, max(best_conf, round(confidence, 4)))
+            else:
+                runs.append((timestamp, timestamp, round(confidence, 4)))
+                started.append((label, timestamp))
+
+        self.frames_processed += 1
+        return started
+
+    def labels(self):
+        return list(self.runs.keys())
+
+    def first(self, label):
+        runs = self.runs.get(label.lower())
+        return (runs[0][0], runs[0][2]) if runs else None
+
+    def occurrences(self, label, max_gap_sec=None):
+        """
+        Occurrences as (start_sec, end_sec, max_confidence). Runs were merged with the
+        max_gap_sec given at construction; a different value here is ignored.
+        """
+        return list(self.runs.get(label.lower(), []))
+
+    def to_dict(self):
+        return {
+            "video_path": self.video_path,
+            "fps": self.fps,
+            "max_gap_sec": self.max_gap_sec,
+            "frames_processed": self.frames_processed,
+            "occurrences": {label: [list(run) for run in runs] for label, runs in self.runs.items()}
+        }
@@ -0,0 +1,198 @@
+import os
+import ast
+import cv2
+import numpy as np
+from src.tracing import NULL_TRACER
+from src.model_registry import MODEL_REGISTRY, get_yolo
+
+# Ultralytics predict() defaults, reused by the ONNX backend so both filter the same way
+DEFAULT_CONF_THRESHOLD = 0.25
+DEFAULT_IOU_THRESHOLD = 0.7
+
+class DetectorBackend:
+    """
+    Interface of the object detectors VideoAnalyzer can run. detect_boxes takes a
+    list of BGR frames and returns one list of (label, confidence, (x1, y1, x2, y2))
+    per frame, with lower-case labels and boxes in frame pixels; detect_batch is
+    the same without boxes. settings() describes everything that changes the
+    output and is part of the detection cache key. spec is the backend_spec the
+    backend was created from (see create_detector), None for injected models.
+    """
+    name = None
+    spec = None
+
+    def detect_boxes(self, frames):
+        raise NotImplementedError
+
+    def detect_batch(self, frames):
+        return [[(label, confidence) for label, confidence, _ in detections] for detections in self.detect_boxes(frames)]
+
+    def settings(self):
+        return {"detector": self.name}
+
+class UltralyticsBackend(DetectorBackend):
+    """
+    PyTorch inference through ultralytics.YOLO. `model` may be any callable with
+    the YOLO result API (e.g. benchmarks' StubDetector); otherwise the weights at
+    weights_path are loaded through the model registry.
+    """
+    name = "ultralytics"
+
+    def __init__(self, weights_path=None, model=None, imgsz=None, tracer=NULL_TRACER):
+        self.weights_path = weights_path
+        self.imgsz = imgsz
+        self.model = model if model is not None else get_yolo(weights_path, tracer)
+
+    def detect_boxes(self, frames):
+        kwargs = {"imgsz": self.imgsz} if self.imgsz else {}
+        results = self.model(frames, verbose=False, **kwargs)
+        return [
+            [(det.names[int(box.cls)].lower(), float(box.conf), tuple(float(v) for v in box.xyxy[0])) for box in det.boxes]
+            for det in results
+        ]
+
+    def settings(self):
+        settings = super().settings()
+        if self.imgsz:
+            settings["imgsz"] = self.imgsz
+        return settings
+
+class OnnxBackend(DetectorBackend):
+    """
+    CPU inference of a YOLOv8 ONNX export (FP32 or int8-quantized) with ONNX Runtime.
+    Frames are letterboxed to imgsz, and the raw (4 + classes, anchors) output is
+    decoded with the Ultralytics confidence/IoU thresholds and class-aware NMS.
+    Class names come from the export's metadata. threads sets ONNX Runtime's
+    intra-op thread count (None keeps its default).
+    """
+    name = "onnx"
+
+    def __init__(self, weights_path, imgsz=640, threads=None, conf_threshold=DEFAULT_CONF_THRESHOLD,
+                 iou_threshold=DEFAULT_IOU_THRESHOLD):
+        import onnxruntime as ort
+
+        if not os.path.exists(weights_path):
+            raise FileNotFoundError(f"ONNX model not found at {weights_path}; export it with python -m tools.export_detector")
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(weights_path, options, providers=["CPUExecutionProvider"])
+        self.weights_path = weights_path
+        self.imgsz = imgsz or 640
+        self.threads = threads
+        self.conf_threshold = conf_threshold
+        self.iou_threshold = iou_threshold
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        # Static exports only accept their own batch size (usually 1)
+        self.static_batch = model_input.shape[0] if isinstance(model_input.shape[0], int) else None
+        if isinstance(model_input.shape[2], int) and model_input.shape[2] != self.imgsz:
+            raise ValueError(f"{weights_path} was exported for imgsz {model_input.shape[2]}, not {self.imgsz}; "
+                             f"re-export it or export with dynamic shapes")
+
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        self.names = ast.literal_eval(metadata["names"]) if "names" in metadata else {}
+
+    def detect_boxes(self, frames):
+        letterboxed = [self._letterbox(frame) for frame in frames]
+        inputs = np.stack([image for image, _ in letterboxed])
+        if self.static_batch:
+            outputs = [self.session.run(None, {self.input_name: inputs[idx:idx + self.static_batch]})[0]
+                       for idx in range(0, len(inputs), self.static_batch)]
+            output = np.concatenate(outputs)
+        else:
+            output = self.session.run(None, {self.input_name: inputs})[0]
+        return [self._decode(prediction, placement) for prediction, (_, placement) in zip(output, letterboxed)]
+
+    def settings(self):
+        return {"detector": self.name, "imgsz": self.imgsz}
+
+    def _letterbox(self, frame):
+        height, width = frame.shape[:2]
+        scale = min(self.imgsz / height, self.imgsz / width)
+        new_width, new_height = round(width * scale), round(height * scale)
+        resized = cv2.resize(frame, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+
+        canvas = np.full((self.imgsz, self.imgsz, 3), 114, dtype=np.uint8)
+        top, left = (self.imgsz - new_height) // 2, (self.imgsz - new_width) // 2
+        canvas[top:top + new_height, left:left + new_width] = resized
+        # BGR HWC uint8 => RGB CHW float32 in [0, 1], plus what is needed to map boxes back
+        return canvas[:, :, ::-1].transpose(2, 0, 1).astype(np.float32) / 255.0, (scale, left, top, width, height)
+
+    def _decode(self, prediction, placement):
+        """
+        prediction: (4 + classes, anchors) with cx, cy, w, h in letterbox pixels.
+        Boxes are mapped back to the original frame with the letterbox placement
+        and clipped to it, as boxes may extend into the padding; boxes left with
+        no area (entirely in the padding) are dropped.
+        """
+        prediction = prediction.T
+        scores = prediction[:, 4:]
+        class_ids = scores.argmax(axis=1)
+        confidences = scores[np.arange(len(scores)), class_ids]
+        keep = confidences >= self.conf_threshold
+        if not keep.any():
+            return []
+
+        boxes = prediction[keep, :4]
+        class_ids, confidences = class_ids[keep], confidences[keep]
+        xywh = np.column_stack([boxes[:, 0] - boxes[:, 2] / 2, boxes[:, 1] - boxes[:, 3] / 2, boxes[:, 2], boxes[:, 3]])
+        indices = cv2.dnn.NMSBoxesBatched(xywh.tolist(), confidences.tolist(), class_ids.tolist(),
+                                          self.conf_threshold, self.iou_threshold)
+        scale, left, top, width, height = placement
+        detections = []
+        for idx in np.array(indices).flatten():
+            x, y, w, h = xywh[idx]
+            x1, x2 = np.clip([(x - left) / scale, (x + w - left) / scale], 0, width)
+            y1, y2 = np.clip([(y - top) / scale, (y + h - top) / scale], 0, height)
+            if x2 <= x1 or y2 <= y1:
+                continue
+            box = (x1, y1, x2, y2)
+            label = self.names.get(int(class_ids[idx]), str(int(class_ids[idx]))).lower()
+            detections.append((label, float(confidences[idx]), tuple(float(v) for v in box)))
+        return detections
+
+def detector_spec(backend="ultralytics", weights_path=None, imgsz=None, threads=None, roi=None):
+    """
+    Picklable description of a detector, passed to shard workers and used as the
+    registry key. backend is "ultralytics" or "onnx"; roi is an optional
+    roi.roi_params dict, applied per analyzer on top of the shared backend.
+    """
+    return {"backend": backend, "weights_path": weights_path, "imgsz": imgsz, "threads": threads, "roi": roi}
+
+def spec_settings(spec):
+    """
+    What the backend's settings() will return, without loading anything. The
+    ROI part depends on the analyzer's labels (see roi.roi_cache_settings).
+    """
+    if spec["backend"] == "onnx":
+        return {"detector": "onnx", "imgsz": spec["imgsz"] or 640}
+    return {"detector": spec["backend"], **({"imgsz": spec["imgsz"]} if spec["imgsz"] else {})}
+
+def backend_spec(spec):
+    """
+    spec without its ROI part: what create_detector builds, so two specs with
+    equal backend_spec share one loaded backend.
+    """
+    return {**spec, "roi": None}
+
+def create_detector(spec, tracer=NULL_TRACER):
+    """
+    The DetectorBackend for spec, loaded once per process (without its ROI wrapper).
+    """
+    if spec["backend"] == "ultralytics":
+        backend = UltralyticsBackend(spec["weights_path"], imgsz=spec["imgsz"], tracer=tracer)
+    elif spec["backend"] == "onnx":
+        key = ("onnx", f"{spec['weights_path']}@{spec['imgsz']}/{spec['threads'] or 'auto'}")
+        backend = MODEL_REGISTRY.get(key, lambda: OnnxBackend(spec["weights_path"], spec["imgsz"], spec["threads"]), tracer)
+    else:
+        raise ValueError(f"Unknown detector backend: {spec['backend']}")
+    backend.spec = backend_spec(spec)
+    return backend
+
+def as_backend(model):
+    """
+    Wraps a YOLO-compatible callable so it can be used where a DetectorBackend is expected.
+    """
+    return model if isinstance(model, DetectorBackend) else UltralyticsBackend(model=model)
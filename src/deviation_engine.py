@@ -1,14 +1,167 @@
+def unmapped_note(step):
+    """
+    Notes for a step that label_matcher could not resolve to a detector label.
+    """
+    return f"No detector label matches this step (closest: {step['label_candidate']}, similarity {step['label_score']})"
+
 class DeviationEngine:
     def __init__(self):
         self.results = []
 
-    def record_step(self, description, observed, timestamp=None):
+    def record_step(self, description, observed, timestamp=None, notes=None):
         result = {
             "description": description,
             "result": "✅ Observed" if observed else "❌ Deviation",
-            "notes": f"At {timestamp}s" if observed and timestamp else "Action not found in video"
+            "notes": notes or (f"At {timestamp}s" if observed and timestamp else "Action not found in video")
         }
         self.results.append(result)
 
+    def align_steps(self, steps, timeline, max_gap_sec=1.0):
+        """
+        Aligns the whole plan against a detection timeline in one pass.
+        Each step carries a "label" (None when it has no detectable label). Steps are
+        assigned to detection occurrences by dynamic programming in O(steps x events),
+        maximizing matched steps while keeping plan order; ties go to earlier steps,
+        then to earlier occurrences.
+        Unmatched steps are flagged "reordered" when an occurrence of their label was
+        left unassigned (seen, but out of plan order) and "skipped" otherwise, including
+        when every occurrence already belongs to another step with the same label;
+        extra occurrences of a matched label mark it "repeated".
+        """
+        events = []
+        for label in {step.get("label") for step in steps if step.get("label")}:
+            for start, _, _ in timeline.occurrences(label, max_gap_sec):
+                events.append((start, label))
+        events.sort()
+
+        n, m = len(steps), len(events)
+        # score[i][j]: best number of matched steps using steps i.. and events j..
+        score = [[0] * (m + 1) for _ in range(n + 1)]
+        for i in range(n - 1, -1, -1):
+            label = steps[i].get("label")
+            row, next_row = score[i], score[i + 1]
+            for j in range(m - 1, -1, -1):
+                best = max(next_row[j], row[j + 1])
+                if label and events[j][1] == label:
+                    best = max(best, next_row[j + 1] + 1)
+                row[j] = best
+
+        # Walk forward, preferring on ties to match the earliest step, then to its earliest
+        # occurrence, so an in-order assignment wins over one that skips a step in between
+        assignment = [None] * n
+        i, j = 0, 0
+        while i < n and j < m:
+            if steps[i].get("label") and events[j][1] == steps[i].get("label") and score[i][j] == score[i + 1][j + 1] + 1:
+                assignment[i] = j
+                i += 1
+                j += 1
+            elif score[i][j] == score[i][j + 1]:
+                j += 1
+            else:
+                i += 1
+
+        used = set(idx for idx in assignment if idx is not None)
+        repeats = {}
+        unassigned = {}
+        for idx, (timestamp, label) in enumerate(events):
+            if idx in used:
+                continue
+            unassigned.setdefault(label, []).append(timestamp)
+            owner = None
+            for step_idx, event_idx in enumerate(assignment):
+                if event_idx is not None and events[event_idx][1] == label:
+                    if owner is None or events[event_idx][0] <= timestamp:
+                        owner = step_idx
+            if owner is not None:
+                repeats.setdefault(owner, []).append(timestamp)
+
+        for step_idx, step in enumerate(steps):
+            event_idx = assignment[step_idx]
+            label = step.get("label")
+
+            if event_idx is not None:
+                timestamp = events[event_idx][0]
+                if step_idx in repeats:
+                    also = ", ".join(f"{t}s" for t in repeats[step_idx])
+                    self._record(step["description"], True, f"At {timestamp}s; repeated at {also}", "repeated", timestamp)
+                else:
+                    self._record(step["description"], True, f"At {timestamp}s", None, timestamp)
+            elif label in unassigned:
+                seen = ", ".join(f"{timestamp}s" for timestamp in unassigned[label])
+                self._record(step["description"], False, f"Out of planned order: observed at {seen}", "reordered")
+            elif "label_candidate" in step:
+                self._record(step["description"], False, unmapped_note(step), "skipped")
+            else:
+                self._record(step["description"], False, "Action not found in video", "skipped")
+
+        return self.results
+
+    def _record(self, description, observed, notes, deviation_type=None, timestamp=None):
+        self.results.append({
+            "description": description,
+            "result": "✅ Observed" if observed else "❌ Deviation",
+            "notes": notes,
+            "deviation_type": deviation_type,
+            "timestamp": timestamp
+        })
+
     def get_results(self):
         return self.results
+
+class IncrementalAligner:
+    """
+    Live counterpart of DeviationEngine.align_steps for streams. Steps (each with
+    a "label") are matched greedily in plan order as new detection occurrences
+    arrive. A step is observed when its label starts an occurrence. When a later
+    step's label shows up first, the steps in between are emitted as deviations
+    right away, so a skip becomes known as soon as the next planned action is
+    seen. These verdicts are provisional. The final report re-aligns the full
+    occurrence timeline with align_steps.
+    """
+    def __init__(self, steps):
+        self.steps = steps
+        self.next_step = 0
+        # Occurrence starts that no step has claimed, per label
+        self.unclaimed = {}
+        self.engine = DeviationEngine()
+
+    def observe(self, label, timestamp):
+        """
+        Feeds the start of one occurrence. Returns the verdicts it settles, in step order.
+        """
+        target = None
+        for idx in range(self.next_step, len(self.steps)):
+            if self.steps[idx].get("label") == label:
+                target = idx
+                break
+        if target is None:
+            self.unclaimed.setdefault(label, []).append(timestamp)
+            return []
+
+        verdicts = self._settle_until(target, f"Not observed before \"{self.steps[target]['description']}\" at {timestamp}s")
+        verdicts.append(self._verdict(target, True, f"At {timestamp}s", None, timestamp))
+        self.next_step = target + 1
+        return verdicts
+
+    def finish(self):
+        """
+        Settles every remaining step once the stream has ended.
+        """
+        return self._settle_until(len(self.steps), "Action not found in video")
+
+    def _settle_until(self, end, missing_note):
+        verdicts = []
+        for idx in range(self.next_step, end):
+            label = self.steps[idx].get("label")
+            if label and label in self.unclaimed:
+                verdicts.append(self._verdict(idx, False, f"Out of planned order: first observed at {self.unclaimed[label][0]}s", "reordered"))
+            elif "label_candidate" in self.steps[idx]:
+                verdicts.append(self._verdict(idx, False, unmapped_note(self.steps[idx]), "skipped"))
+            else:
+                verdicts.append(self._verdict(idx, False, missing_note, "skipped"))
+        self.next_step = max(self.next_step, end)
+        return verdicts
+
+    def _verdict(self, idx, observed, notes, deviation_type=None, timestamp=None):
+        self.engine._record(self.steps[idx]["description"], observed, notes, deviation_type, timestamp)
+        return {"step_index": idx, **self.engine.results[-1]}
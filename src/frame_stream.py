@@ -0,0 +1,64 @@
+import os
+import time
+import cv2
+import numpy as np
+from src.tracing import NULL_TRACER
+
+def follow_video_file(path, poll_interval=0.5, idle_timeout=10.0, tracer=NULL_TRACER):
+    """
+    Yields (timestamp_sec, frame) from a video that is still being written, like
+    `tail -f`. Whenever the decoder reaches the current end, the file is reopened
+    at the next unread frame after poll_interval. The stream ends once no new
+    frame has arrived for idle_timeout seconds, or as soon as a `<path>.done`
+    marker file exists and everything has been read.
+    The container must be readable while open (MKV, MPEG-TS, fragmented MP4
+    e.g. ffmpeg -movflags frag_keyframe+empty_moov); a plain MP4 only becomes
+    readable when its writer closes it.
+    """
+    frame_idx = 0
+    fps = None
+    last_frame_at = time.time()
+
+    while True:
+        cap = cv2.VideoCapture(path) if os.path.exists(path) else None
+        got_frames = False
+        if cap is not None and cap.isOpened():
+            fps = fps or cap.get(cv2.CAP_PROP_FPS) or 30.0
+            if frame_idx:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
+            while True:
+                decode_start = time.perf_counter()
+                ret, frame = cap.read()
+                tracer.add("frame_decode", time.perf_counter() - decode_start)
+                if not ret:
+                    break
+                got_frames = True
+                yield frame_idx / fps, frame
+                frame_idx += 1
+        if cap is not None:
+            cap.release()
+
+        if got_frames:
+            last_frame_at = time.time()
+        elif os.path.exists(f"{path}.done") or time.time() - last_frame_at > idle_timeout:
+            print(f"[INFO] Stream {path} ended after {frame_idx} frames")
+            return
+        time.sleep(poll_interval)
+
+def read_raw_frames(stream, width, height, fps, tracer=NULL_TRACER):
+    """
+    Yields (timestamp_sec, frame) from raw BGR24 frames on a binary stream, such as
+    a pipe from `ffmpeg -i <source> -f rawvideo -pix_fmt bgr24 -` or a named FIFO.
+    Ends at EOF; a trailing partial frame is dropped.
+    """
+    frame_bytes = width * height * 3
+    frame_idx = 0
+    while True:
+        read_start = time.perf_counter()
+        buffer = stream.read(frame_bytes)
+        tracer.add("frame_decode", time.perf_counter() - read_start)
+        if len(buffer) < frame_bytes:
+            print(f"[INFO] Raw frame stream ended after {frame_idx} frames")
+            return
+        yield frame_idx / fps, np.frombuffer(buffer, dtype=np.uint8).reshape(height, width, 3)
+        frame_idx += 1
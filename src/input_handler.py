@@ -10,7 +10,36 @@ class InputHandler:
         return [os.path.join(self.video_dir, f) for f in os.listdir(self.video_dir) if f.endswith(('.mp4', '.avi'))]
 
     def get_planning_logs(self):
-        return [os.path.join(self.log_dir, f) for f in os.listdir(self.log_dir) if f.endswith(('.txt', '.json'))]
+        return [os.path.join(self.log_dir, f) for f in os.listdir(self.log_dir) if f.endswith(('.txt', '.json', '.jsonl', '.ndjson'))]
 
     def get_final_outputs(self):
         return [os.path.join(self.output_dir, f) for f in os.listdir(self.output_dir) if f.endswith(('.txt', '.json'))]
+
+    def get_runs(self):
+        """
+        Pairs every planning log with the video and final output of the same run.
+        run1.txt => run1.mp4 and run1_output.txt (or run1.txt/run1.json); missing
+        counterparts are returned as None.
+        """
+        videos = {self._stem(path): path for path in self.get_videos()}
+        outputs = {}
+        for path in self.get_final_outputs():
+            stem = self._stem(path)
+            if stem.endswith("_output"):
+                outputs[stem[:-len("_output")]] = path
+            else:
+                outputs.setdefault(stem, path)
+
+        runs = []
+        for log_path in sorted(self.get_planning_logs()):
+            run_name = self._stem(log_path)
+            runs.append({
+                "run_name": run_name,
+                "log_path": log_path,
+                "video_path": videos.get(run_name),
+                "output_path": outputs.get(run_name)
+            })
+        return runs
+
+    def _stem(self, path):
+        return os.path.splitext(os.path.basename(path))[0]
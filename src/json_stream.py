@@ -0,0 +1,208 @@
+import re
+import json
+
+READ_CHUNK_CHARS = 64 * 1024
+
+# What the structural scanner stops at: brackets and quotes outside strings, quotes and escapes inside them
+_STRUCTURE = re.compile(r'["\[\]{}]')
+_STRING_SPECIAL = re.compile(r'["\\]')
+_SCALAR_END = re.compile(r'[\s,:\]}]')
+
+class JsonStream:
+    """
+    Minimal incremental JSON reader over a text file: enough structure to walk a
+    top-level list or object. The end of each value is found by a structural
+    scan (bracket depth, string and escape state) that resumes where the last
+    read stopped, and only then decoded once with json.JSONDecoder.raw_decode,
+    so reading is linear in the input. Skipped values and string pieces are
+    never decoded whole: only the current element and one read are held in memory.
+    """
+    def __init__(self, file, chunk_chars=READ_CHUNK_CHARS):
+        self.file = file
+        self.chunk_chars = chunk_chars
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        # Reads grow with the unconsumed text, so a value spanning many reads is copied O(log n) times
+        chunk = self.file.read(max(self.chunk_chars, len(self.buffer) - self.pos))
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """
+        Next non-whitespace character, without consuming it ("" at end of file).
+        """
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos].isspace():
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ""
+
+    def _expect(self, chars):
+        char = self.peek()
+        if char not in chars:
+            raise ValueError(f"Malformed JSON: expected one of {chars!r}, got {char!r}")
+        self.pos += 1
+        return char
+
+    def _more(self, scan, keep):
+        """
+        Reads on after scan; returns scan's offset in the refilled buffer. Without
+        keep, the text before scan is dropped.
+        """
+        if not keep:
+            self.pos = scan
+        offset = scan - self.pos
+        if not self._fill():
+            raise ValueError("Malformed JSON: unexpected end of input")
+        return self.pos + offset
+
+    def _scalar_end(self):
+        scan = self.pos
+        while True:
+            match = _SCALAR_END.search(self.buffer, scan)
+            if match:
+                return match.start()
+            offset = len(self.buffer) - self.pos
+            if not self._fill():
+                return len(self.buffer)
+            scan = self.pos + offset
+
+    def _value_end(self, keep):
+        """
+        Offset just past the value at pos, found without decoding it. Brackets
+        are not checked against each other; raw_decode validates decoded values.
+        """
+        char = self.peek()
+        if not char:
+            raise ValueError("Malformed JSON: unexpected end of input")
+        if char not in '"[{':
+            return self._scalar_end()
+
+        depth = 0
+        in_string = False
+        scan = self.pos
+        while True:
+            if in_string:
+                match = _STRING_SPECIAL.search(self.buffer, scan)
+                if match is None:
+                    scan = len(self.buffer)
+                elif match.group() == '"':
+                    in_string = False
+                    scan = match.end()
+                    if depth == 0:
+                        return scan
+                    continue
+                elif match.end() < len(self.buffer):
+                    # Skip the escaped character
+                    scan = match.end() + 1
+                    continue
+                else:
+                    scan = match.start()
+            else:
+                match = _STRUCTURE.search(self.buffer, scan)
+                if match is None:
+                    scan = len(self.buffer)
+                else:
+                    scan = match.end()
+                    char = match.group()
+                    if char == '"':
+                        in_string = True
+                    elif char in "[{":
+                        depth += 1
+                    else:
+                        depth -= 1
+                        if depth == 0:
+                            return scan
+                    continue
+            scan = self._more(scan, keep)
+
+    def _decode(self):
+        end = self._value_end(keep=True)
+        value, stop = self.decoder.raw_decode(self.buffer, self.pos)
+        if stop != end:
+            raise ValueError(f"Malformed JSON: unexpected {self.buffer[stop:stop + 1]!r}")
+        self.pos = end
+        return value
+
+    def iter_elements(self):
+        """
+        Yields once per element of an array; the caller consumes the element before resuming.
+        """
+        self._expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield
+            if self._expect(",]") == "]":
+                return
+
+    def iter_array(self):
+        for _ in self.iter_elements():
+            yield self._decode()
+
+    def iter_object_keys(self):
+        """
+        Yields each key of an object; the caller consumes its value before resuming.
+        """
+        self._expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self._decode()
+            self._expect(":")
+            yield key
+            if self._expect(",}") == "}":
+                return
+
+    def read_value(self):
+        """
+        Decodes the next complete value (e.g. an object field's value).
+        """
+        return self._decode()
+
+    def skip_value(self):
+        """
+        Consumes the next value without decoding or holding it.
+        """
+        self.pos = self._value_end(keep=False)
+
+    def iter_string(self):
+        """
+        Yields the next value, a string, in decoded pieces of about one read each,
+        so a huge string is never held whole. Escapes are never split.
+        """
+        if self.peek() != '"':
+            raise ValueError(f"Malformed JSON: expected a string, got {self.peek()!r}")
+        self.pos += 1
+        scan = self.pos
+        while True:
+            match = _STRING_SPECIAL.search(self.buffer, scan)
+            if match and match.group() == '"':
+                yield self._unescape(self.buffer[self.pos:match.start()])
+                self.pos = match.end()
+                return
+            if match:
+                escape_end = match.end() + (5 if self.buffer[match.end():match.end() + 1] == "u" else 1)
+                if escape_end <= len(self.buffer):
+                    scan = escape_end
+                    continue
+            # Everything before an escape that may continue in the next read is complete
+            safe = match.start() if match else len(self.buffer)
+            if safe > self.pos:
+                yield self._unescape(self.buffer[self.pos:safe])
+            scan = self._more(safe, keep=False)
+
+    def _unescape(self, raw):
+        return self.decoder.raw_decode(f'"{raw}"')[0]
@@ -0,0 +1,283 @@
+import re
+import json
+import zlib
+import hashlib
+from contextlib import closing
+import numpy as np
+from src.tracing import NULL_TRACER
+from src.model_registry import MODEL_REGISTRY, get_text_pipeline
+from src.sqlite_store import SqliteStore
+
+# Words that say nothing about which UI element a step refers to
+STOPWORDS = {"a", "an", "the", "on", "in", "into", "to", "of", "and", "or", "for", "with", "then", "is", "it", "at", "by", "from"}
+
+# Texts scored per matrix product, which bounds the (texts x dim) buffer for very long plans
+MATCH_CHUNK = 4096
+
+# Resolved step texts remembered per matcher; the memo is dropped when it grows past this
+MEMO_MAX_ENTRIES = 100000
+
+# UI verbs and element kinds that many labels share; they never count as a label's distinctive term
+GENERIC_TERMS = {"click", "press", "tap", "enter", "type", "select", "open", "check", "fill",
+                 "button", "field", "input", "box", "link", "icon", "menu", "tab", "page", "text"}
+
+# Phrasal verbs written as one word, so "log in" and "log out" stay distinct
+_PHRASAL = re.compile(r"\b(log|sign)[\s_-]+(in|on|out|up)\b", re.IGNORECASE)
+
+# Shortest word that still matches a term it is a prefix of ("password" ~ "passwords")
+TERM_PREFIX_MIN = 5
+
+def _words(text):
+    """
+    Lower-case words of text; snake_case and camelCase identifiers are split.
+    """
+    text = _PHRASAL.sub(r"\1\2", re.sub(r"([a-z])([A-Z])", r"\1 \2", text)).replace("_", " ").lower()
+    return [word for word in re.findall(r"[a-z0-9]+", text) if word not in STOPWORDS]
+
+def _term_matches(word, term):
+    if word == term:
+        return True
+    shorter, longer = sorted((word, term), key=len)
+    return len(shorter) >= TERM_PREFIX_MIN and longer.startswith(shorter)
+
+def distinctive_terms(label_texts):
+    """
+    Words of each label's text that no other label's text contains and that are
+    not GENERIC_TERMS, so words like "button" or "click" never decide a match.
+    A label left without any keeps its non-generic words (or all of them).
+    """
+    words = {label: set(_words(text)) for label, text in label_texts.items()}
+    words = {label: (own - GENERIC_TERMS) or own for label, own in words.items()}
+    terms = {}
+    for label, own in words.items():
+        shared = set().union(*(other for name, other in words.items() if name != label))
+        terms[label] = (own - shared) or own
+    return terms
+
+class HashingEmbedder:
+    """
+    Bag of words plus character trigrams, hashed into a fixed number of
+    dimensions and L2-normalized. Needs no model, so it is fast enough that its
+    vectors are never persisted; trigrams make "passwords" and "password" close.
+    """
+    name = "hashing"
+    cacheable = False
+
+    def __init__(self, dim=1024):
+        self.dim = dim
+
+    def embed(self, texts):
+        rows, cols, weights = [], [], []
+        for row, text in enumerate(texts):
+            for word in _words(text):
+                rows.append(row)
+                cols.append(zlib.crc32(word.encode("utf-8")) % self.dim)
+                weights.append(1.0)
+                padded = f"<{word}>"
+                for idx in range(len(padded) - 2):
+                    rows.append(row)
+                    cols.append(zlib.crc32(padded[idx:idx + 3].encode("utf-8")) % self.dim)
+                    weights.append(0.5)
+
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        np.add.at(vectors, (np.array(rows, dtype=np.intp), np.array(cols, dtype=np.intp)), np.array(weights, dtype=np.float32))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+class TransformerEmbedder:
+    """
+    Mean-pooled token embeddings of a Hugging Face model (e.g. a
+    sentence-transformers checkpoint), loaded once per process through the
+    model registry. Better with synonyms ("sign in" vs "login") than hashing.
+    """
+    cacheable = True
+
+    def __init__(self, model_name, tracer=NULL_TRACER):
+        self.name = model_name
+        self.tracer = tracer
+
+    def embed(self, texts):
+        extractor = get_text_pipeline("feature-extraction", self.name, self.tracer)
+        vectors = np.stack([np.asarray(output[0], dtype=np.float32).mean(axis=0) for output in extractor(list(texts))])
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+class EmbeddingCache(SqliteStore):
+    """
+    Persistent text embeddings backed by SQLite, keyed by a hash of the embedder
+    name and the text, so model-based embeddings are computed once per text.
+    """
+    schema = """
+        CREATE TABLE IF NOT EXISTS embeddings (
+            key TEXT PRIMARY KEY,
+            embedder TEXT NOT NULL,
+            vector BLOB NOT NULL
+        );
+    """
+
+    def __init__(self, db_path="cache/embeddings.sqlite"):
+        self.hits = 0
+        self.misses = 0
+        super().__init__(db_path)
+
+    def make_key(self, embedder_name, text):
+        return hashlib.sha256(f"{embedder_name}\n{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, embedder_name, texts):
+        """
+        Returns {text: vector} for the texts that are cached.
+        """
+        keys = {self.make_key(embedder_name, text): text for text in texts}
+        found = {}
+        key_list = list(keys)
+        with closing(self._connect()) as conn:
+            # Stay below SQLite's bound-parameter limit
+            for start in range(0, len(key_list), 500):
+                chunk = key_list[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                for key, blob in rows:
+                    found[keys[key]] = np.frombuffer(blob, dtype=np.float32)
+
+        self.hits += len(found)
+        self.misses += len(texts) - len(found)
+        return found
+
+    def put_many(self, embedder_name, vectors):
+        with closing(self._connect()) as conn, conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, embedder, vector) VALUES (?, ?, ?)",
+                [(self.make_key(embedder_name, text), embedder_name, np.asarray(vector, dtype=np.float32).tobytes())
+                 for text, vector in vectors.items()]
+            )
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": round(self.hits / total, 4) if total else 0.0}
+
+class LabelMatcher:
+    """
+    Resolves planned steps to detector labels by embedding similarity. Labels
+    (plus an optional description each) are embedded once; step texts are
+    deduplicated, embedded in bulk and scored against every label with a single
+    (steps x labels) matrix product. A step maps to its most similar label among
+    those whose distinctive terms it mentions (see distinctive_terms), when the
+    cosine similarity reaches threshold; "Click the Cancel button" therefore maps
+    to nothing even though it shares "click" and "button" with login_button.
+    overrides maps exact action_ids to labels and takes precedence (the historic
+    ACTION_LABEL_MAP).
+    """
+    def __init__(self, labels, embedder=None, threshold=0.35, descriptions=None, overrides=None, cache=None):
+        self.labels = sorted({label.lower() for label in labels})
+        self.embedder = embedder or HashingEmbedder()
+        self.threshold = threshold
+        self.overrides = {action_id.lower(): label.lower() for action_id, label in (overrides or {}).items()}
+        self.cache = cache if self.embedder.cacheable else None
+        self.memo = {}
+
+        descriptions = {label.lower(): text for label, text in (descriptions or {}).items()}
+        label_texts = [f"{label} {descriptions.get(label, '')}".strip() for label in self.labels]
+        self.label_vectors = self._embed(label_texts)
+        self.terms = distinctive_terms(dict(zip(self.labels, label_texts)))
+
+    def _embed(self, texts):
+        if self.cache is None:
+            return self.embedder.embed(texts)
+
+        cached = self.cache.get_many(self.embedder.name, texts)
+        missing = [text for text in texts if text not in cached]
+        if missing:
+            computed = dict(zip(missing, self.embedder.embed(missing)))
+            self.cache.put_many(self.embedder.name, computed)
+            cached.update(computed)
+        return np.stack([cached[text] for text in texts])
+
+    def match(self, texts):
+        """
+        Returns (label or None, score, best label) per text.
+        """
+        pending = [text for text in dict.fromkeys(texts) if text not in self.memo]
+        if len(self.memo) + len(pending) > MEMO_MAX_ENTRIES:
+            self.memo = {}
+            pending = list(dict.fromkeys(texts))
+        for start in range(0, len(pending), MATCH_CHUNK):
+            chunk = pending[start:start + MATCH_CHUNK]
+            scores = self._embed(chunk) @ self.label_vectors.T
+            eligible = np.array([self._mentioned(text) for text in chunk], dtype=bool).reshape(len(chunk), len(self.labels))
+            best = np.where(eligible, scores, -np.inf).argmax(axis=1)
+            closest = scores.argmax(axis=1)
+            for row, text in enumerate(chunk):
+                if eligible[row, best[row]] and scores[row, best[row]] >= self.threshold:
+                    label_idx = best[row]
+                    self.memo[text] = (self.labels[label_idx], round(float(scores[row, label_idx]), 4), self.labels[label_idx])
+                else:
+                    label_idx = closest[row]
+                    self.memo[text] = (None, round(float(scores[row, label_idx]), 4), self.labels[label_idx])
+        return [self.memo[text] for text in texts]
+
+    def _mentioned(self, text):
+        """
+        Per label, whether text contains one of its distinctive terms.
+        """
+        words = set(_words(text))
+        return [any(_term_matches(word, term) for word in words for term in self.terms[label]) for label in self.labels]
+
+    def resolve_steps(self, steps, tracer=NULL_TRACER):
+        """
+        Sets "label" (None when unmapped) and "label_score" on every step and
+        returns the unmapped steps, each with its closest "label_candidate".
+        """
+        with tracer.span("label_matching"):
+            if not self.labels:
+                matches = [(None, 0.0, None)] * len(steps)
+            else:
+                matches = self.match([step["description"] for step in steps])
+
+            unmapped = []
+            for step, (label, score, candidate) in zip(steps, matches):
+                override = self.overrides.get(step.get("action_id", "").lower())
+                if override:
+                    label, score = override, 1.0
+                step["label"] = label
+                step["label_score"] = score
+                if label is None:
+                    step["label_candidate"] = candidate
+                    unmapped.append(step)
+        return unmapped
+
+def label_matcher_spec(labels, embedder="hashing", threshold=0.35, descriptions=None, overrides=None, cache_path=None):
+    """
+    Picklable description of a LabelMatcher, passed to batch workers and used as
+    the registry key. embedder is "hashing" or a Hugging Face model name.
+    cache_path is the SQLite embedding cache for model-based embedders.
+    """
+    return {
+        "labels": sorted(labels),
+        "embedder": embedder,
+        "threshold": threshold,
+        "descriptions": dict(descriptions or {}),
+        "overrides": dict(overrides or {}),
+        "cache_path": cache_path
+    }
+
+def get_label_matcher(spec, tracer=NULL_TRACER):
+    """
+    The LabelMatcher for spec, built (and its labels embedded) once per process.
+    """
+    def load():
+        embedder = HashingEmbedder() if spec["embedder"] == "hashing" else TransformerEmbedder(spec["embedder"], tracer)
+        cache = EmbeddingCache(spec["cache_path"]) if spec["cache_path"] else None
+        return LabelMatcher(spec["labels"], embedder, spec["threshold"], spec["descriptions"], spec["overrides"], cache)
+
+    config = json.dumps({key: value for key, value in spec.items() if key != "cache_path"}, sort_keys=True)
+    name = f"{spec['embedder']}/{hashlib.sha256(config.encode('utf-8')).hexdigest()[:12]}"
+    return MODEL_REGISTRY.get(("label_matcher", name), load, tracer, stage="label_matcher_load")
+
+def describe_unmapped(unmapped, total):
+    """
+    One-line summary of unmapped steps for warnings.
+    """
+    shown = ", ".join(f"\"{step['description']}\" (closest {step['label_candidate']} {step['label_score']})" for step in unmapped[:5])
+    more = f" and {len(unmapped) - 5} more" if len(unmapped) > 5 else ""
+    return f"{len(unmapped)}/{total} steps have no detector label: {shown}{more}"
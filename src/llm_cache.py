@@ -0,0 +1,55 @@
+import json
+import time
+import hashlib
+from contextlib import closing
+from src.sqlite_store import LruSqliteCache
+
+class LLMResponseCache(LruSqliteCache):
+    """
+    Persistent cache of LLM step-extraction results backed by SQLite.
+    Entries are keyed by a hash of the prompt, the model name and the generation
+    parameters, and evicted least-recently-used once the store exceeds max_bytes.
+    """
+    name = "LLM cache"
+    table = "responses"
+    schema = """
+        CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY,
+            model TEXT NOT NULL,
+            params TEXT NOT NULL,
+            result TEXT NOT NULL,
+            size_bytes INTEGER NOT NULL,
+            last_access REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_responses_access ON responses(last_access);
+    """
+
+    def __init__(self, db_path="cache/llm_responses.sqlite", max_bytes=64 * 1024 * 1024):
+        super().__init__(db_path, max_bytes)
+
+    def make_key(self, prompt, model, params):
+        params_blob = json.dumps(params or {}, sort_keys=True)
+        return hashlib.sha256(f"{model}\n{params_blob}\n{prompt}".encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """
+        Returns the cached result dict (response text, thought/steps split, token counts) or None.
+        """
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute("SELECT result FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+
+        self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key, model, params, result):
+        blob = json.dumps(result)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, params, result, size_bytes, last_access) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, json.dumps(params or {}, sort_keys=True), blob, len(blob), time.time())
+            )
+        self.evict()
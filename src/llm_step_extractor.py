@@ -0,0 +1,127 @@
+import time
+from src.tracing import NULL_TRACER
+from src.model_registry import get_text_pipeline, get_tokenizer
+
+def build_prompt(planning_log):
+    return (
+    "You are an AI test validation agent.\n"
+    "Your task:\n"
+    "- Read the planning log below\n"
+    "- Think step by step to extract the intended actions\n"
+    "- Clearly state your reasoning as 'Thought:' before listing steps\n"
+    "\nPlanning Log:\n"
+    f"{planning_log}\n"
+    "\nRespond with:\nThought: <reasoning>\nSteps: <step list>"
+    )
+
+def split_response(response_text):
+    """
+    Splits an LLM response into (thought, steps_text).
+    """
+    thought = "N/A"
+    steps_text = response_text
+
+    if "Thought:" in response_text and "Steps:" in response_text:
+        parts = response_text.split("Steps:")
+        thought = parts[0].split("Thought:")[-1].strip()
+        steps_text = parts[1].strip()
+
+    return thought, steps_text
+
+class LLMStepExtractor:
+    """
+    Extracts Thought/Steps from a planning-log prompt with the text2text-generation
+    pipeline. Results are served from an optional LLMResponseCache; the model and
+    tokenizer (and transformers itself) are only loaded, through the model
+    registry, on the first cache miss.
+    """
+    def __init__(self, model_name, generation_params=None, cache=None):
+        self.model_name = model_name
+        self.generation_params = generation_params or {"max_new_tokens": 200}
+        self.cache = cache
+        self.generator = None
+        self.tokenizer = None
+
+    def load(self, tracer=NULL_TRACER):
+        """
+        Loads the model and tokenizer if they are not loaded yet.
+        """
+        if self.generator is None:
+            self.generator = get_text_pipeline("text2text-generation", self.model_name, tracer)
+            self.tokenizer = get_tokenizer(self.model_name, tracer)
+            # Batched generation pads prompts to a common length
+            pipeline_tokenizer = getattr(self.generator, "tokenizer", None)
+            if pipeline_tokenizer is not None and pipeline_tokenizer.pad_token is None:
+                pipeline_tokenizer.pad_token = pipeline_tokenizer.eos_token
+
+    def count_tokens(self, text, tracer=NULL_TRACER):
+        with tracer.span("tokenize"):
+            return self.tokenizer(text, return_tensors="pt").input_ids.shape[1]
+
+    def extract(self, prompt, tracer=NULL_TRACER):
+        """
+        Returns a dict with response_text, thought, steps_text, prompt_tokens,
+        response_tokens and cached (whether it came from the cache).
+        """
+        return self.extract_batch([prompt], 1, [tracer])[0]
+
+    def extract_batch(self, prompts, batch_size=1, tracers=None):
+        """
+        Same as extract for many prompts at once. Cache hits are resolved first and
+        the remaining distinct prompts go through the pipeline in padded batches of batch_size.
+        Token counts are still taken per prompt, unpadded, so accounting matches
+        extract. `tracers` is an optional per-prompt list; each one is charged its
+        own tokenization and an equal share of its batch's generation time.
+        """
+        tracers = tracers or [NULL_TRACER] * len(prompts)
+        results = [None] * len(prompts)
+        keys = [None] * len(prompts)
+
+        # Identical prompts are generated once: prompt => indexes waiting for it
+        misses = {}
+        for idx, prompt in enumerate(prompts):
+            if self.cache is not None:
+                keys[idx] = self.cache.make_key(prompt, self.model_name, self.generation_params)
+                cached = self.cache.get(keys[idx])
+                if cached is not None:
+                    results[idx] = {**cached, "cached": True}
+                    continue
+            misses.setdefault(prompt, []).append(idx)
+
+        if not misses:
+            return results
+
+        unique_prompts = list(misses.keys())
+        self.load(tracers[misses[unique_prompts[0]][0]])
+        batch_size = max(1, batch_size)
+        print(f"[INFO] Generating {len(unique_prompts)} LLM responses in batches of {batch_size} "
+              f"({len(prompts) - sum(len(idxs) for idxs in misses.values())} cached)")
+
+        for start in range(0, len(unique_prompts), batch_size):
+            batch = unique_prompts[start:start + batch_size]
+            generate_start = time.perf_counter()
+            responses = self.generator(batch, batch_size=batch_size, **self.generation_params)
+            waiting = sum(len(misses[prompt]) for prompt in batch)
+            share = (time.perf_counter() - generate_start) / waiting
+
+            for prompt, response in zip(batch, responses):
+                response = response[0] if isinstance(response, list) else response
+                response_text = response["generated_text"]
+                thought, steps_text = split_response(response_text)
+
+                first_idx = misses[prompt][0]
+                result = {
+                    "response_text": response_text,
+                    "thought": thought,
+                    "steps_text": steps_text,
+                    "prompt_tokens": self.count_tokens(prompt, tracers[first_idx]),
+                    "response_tokens": self.count_tokens(response_text, tracers[first_idx])
+                }
+
+                if keys[first_idx] is not None:
+                    self.cache.put(keys[first_idx], self.model_name, self.generation_params, result)
+                for idx in misses[prompt]:
+                    tracers[idx].add("llm_generate", share)
+                    results[idx] = {**result, "cached": False}
+
+        return results
@@ -0,0 +1,91 @@
+import os
+import time
+import threading
+from src.tracing import NULL_TRACER
+
+class ModelRegistry:
+    """
+    Process-wide cache of loaded models. Each model is loaded lazily on first
+    request and only once, even when several threads ask for it at the same
+    time. Heavy libraries (torch, transformers, ultralytics) are imported by
+    the loaders, so importing this module is cheap.
+    """
+    def __init__(self):
+        self.models = {}
+        self.load_counts = {}
+        self.load_seconds = {}
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    def get(self, key, loader, tracer=NULL_TRACER, stage="model_load"):
+        """
+        Returns the model registered under key, calling loader() to create it on
+        the first request. The load time is recorded on tracer under `stage`.
+        """
+        if key in self.models:
+            return self.models[key]
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            if key not in self.models:
+                start = time.perf_counter()
+                model = loader()
+                elapsed = time.perf_counter() - start
+                tracer.add(stage, elapsed)
+                with self._lock:
+                    self.models[key] = model
+                    self.load_counts[key] = self.load_counts.get(key, 0) + 1
+                    self.load_seconds[key] = self.load_seconds.get(key, 0.0) + elapsed
+                print(f"[INFO] Loaded {key[0]} model {key[1]} in {elapsed:.2f}s")
+            return self.models[key]
+
+    def is_loaded(self, key):
+        return key in self.models
+
+    def stats(self):
+        """
+        Load count and total load seconds per model, keyed as "<kind>:<name>".
+        """
+        with self._lock:
+            return {
+                f"{kind}:{name}": {"loads": count, "load_sec": round(self.load_seconds[(kind, name)], 4)}
+                for (kind, name), count in self.load_counts.items()
+            }
+
+MODEL_REGISTRY = ModelRegistry()
+
+def get_yolo(model_path, tracer=NULL_TRACER):
+    """
+    YOLO weights at model_path, loaded once per process.
+    """
+    def load():
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"YOLOv8 model not found at {model_path}")
+        from ultralytics import YOLO
+        return YOLO(model_path)
+
+    return MODEL_REGISTRY.get(("yolo", model_path), load, tracer)
+
+def get_text_pipeline(task, model_name, tracer=NULL_TRACER, **kwargs):
+    """
+    Hugging Face pipeline for task/model_name, loaded once per process.
+    Pipelines created with different kwargs are registered separately.
+    """
+    def load():
+        from transformers import pipeline
+        return pipeline(task, model=model_name, **kwargs)
+
+    name = model_name if not kwargs else f"{model_name}{sorted(kwargs.items())}"
+    return MODEL_REGISTRY.get((task, name), load, tracer, stage="llm_model_load")
+
+def get_tokenizer(model_name, tracer=NULL_TRACER):
+    """
+    Hugging Face tokenizer for model_name, loaded once per process.
+    """
+    def load():
+        from transformers import AutoTokenizer
+        return AutoTokenizer.from_pretrained(model_name)
+
+    return MODEL_REGISTRY.get(("tokenizer", model_name), load, tracer, stage="llm_model_load")
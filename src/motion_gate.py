@@ -0,0 +1,41 @@
+import cv2
+import numpy as np
+
+class MotionGate:
+    """
+    Cheap change detector placed ahead of inference for screen recordings.
+    Each frame is reduced to a small grayscale thumbnail and compared with the
+    thumbnail of the last frame that was sent to the detector. If no thumbnail
+    pixel moved by more than `threshold` (0-255 scale), the frame is considered
+    unchanged and the caller reuses the previous detections.
+    Higher thresholds skip more frames at the cost of recall.
+    """
+    def __init__(self, threshold=8.0, thumbnail_size=(160, 90)):
+        self.threshold = threshold
+        self.thumbnail_size = thumbnail_size
+        self.reset()
+
+    def reset(self):
+        self.reference = None
+        self.frames_seen = 0
+        self.frames_skipped = 0
+
+    def is_changed(self, frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        thumbnail = cv2.resize(gray, self.thumbnail_size, interpolation=cv2.INTER_AREA).astype(np.int16)
+        self.frames_seen += 1
+
+        if self.reference is not None and np.abs(thumbnail - self.reference).max() <= self.threshold:
+            self.frames_skipped += 1
+            return False
+
+        self.reference = thumbnail
+        return True
+
+    def stats(self):
+        return {
+            "threshold": self.threshold,
+            "frames_seen": self.frames_seen,
+            "frames_skipped": self.frames_skipped,
+            "frames_inferred": self.frames_seen - self.frames_skipped
+        }
@@ -1,13 +1,304 @@
+import os
+import re
+import json
+import mmap
+import functools
+from src.json_stream import JsonStream
+
+# Whole-word, case-insensitive markers of a passed and a failed test run
+DEFAULT_PASS_MARKERS = ("test successful", "success", "successful", "passed", "pass")
+DEFAULT_FAIL_MARKERS = ("test failed", "failed", "failure", "fail", "unsuccessful")
+
+# Bytes per mmap window when searching the text backwards for the last marker
+SCAN_WINDOW_BYTES = 4 * 1024 * 1024
+
+# A zero count right before a marker cancels it ("10 passed, 0 failed", "no failure")
+_ZERO_COUNT = re.compile(rb"\b(?:0|no|zero)\s+$")
+ZERO_COUNT_CONTEXT_BYTES = 16
+
+# Fields that carry a structured verdict in JSON outputs
+BOOLEAN_VERDICT_KEYS = ("success", "passed", "ok")
+STATUS_VERDICT_KEYS = ("status", "result", "outcome", "verdict", "conclusion")
+
+def _trie_pattern(words):
+    """
+    Regex alternation built from a trie of words, so alternatives sharing a
+    prefix are matched once (e.g. "fail(?:ed|ure)?") and the engine never
+    backtracks through the whole marker list. Spaces match any whitespace run.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node):
+        end = "" in node
+        branches = [
+            (rb"\s+" if char == " " else re.escape(char.encode("utf-8"))) + build(child)
+            for char, child in sorted(node.items()) if char
+        ]
+        if not branches:
+            return b""
+        body = branches[0] if len(branches) == 1 else b"(?:" + b"|".join(branches) + b")"
+        if end:
+            body = (b"(?:" + body + b")?") if len(branches) == 1 else body + b"?"
+        return body
+
+    return build(trie)
+
+class MarkerMatcher:
+    """
+    Precompiled whole-word, case-insensitive matcher for pass and fail markers.
+    Every marker contains one of a few literal anchors ("fail", "success", ...);
+    a window of text is only handed to the regex if an anchor occurs in it, so
+    the bulk of a long log is skipped at substring-search speed. A marker listed
+    as both pass and fail counts as fail; a marker after a zero count is ignored.
+    """
+    def __init__(self, pass_markers, fail_markers):
+        self.kinds = {self._normalize(marker): True for marker in pass_markers}
+        self.kinds.update({self._normalize(marker): False for marker in fail_markers})
+        self.max_length = max((len(marker.encode("utf-8")) for marker in self.kinds), default=0)
+        self.regex = re.compile(rb"\b" + _trie_pattern(sorted(self.kinds)) + rb"\b") if self.kinds else None
+
+        # Longest word of each marker, minus words containing another anchor
+        words = {max(marker.split(), key=len).encode("utf-8") for marker in self.kinds}
+        self.anchors = [word for word in words if not any(other != word and other in word for other in words)]
+
+    def _normalize(self, marker):
+        return " ".join(marker.lower().split())
+
+    def _counted_zero(self, buffer, offset):
+        context = bytes(buffer[max(0, offset - ZERO_COUNT_CONTEXT_BYTES):offset]).lower()
+        return _ZERO_COUNT.search(context) is not None
+
+    def kind(self, marker):
+        """
+        True for a pass marker, False for a fail marker.
+        """
+        return self.kinds[self._normalize(marker)]
+
+    def classify(self, text):
+        """
+        Verdict of a short string (e.g. a JSON "status" value): the kind of its
+        last marker, or None when it has none.
+        """
+        found = self.last_match(text.encode("utf-8"))
+        return self.kind(found[1]) if found else None
+
+    def classify_pieces(self, pieces):
+        """
+        classify for a string given as successive pieces (e.g. a huge JSON string
+        read with JsonStream.iter_string), holding one piece at a time. A match
+        touching the end of a piece is only taken once the text after it is
+        seen. The search resumes where a search of the whole text would, and the
+        tail kept from the previous piece also holds the context before it.
+        """
+        if self.regex is None:
+            return None
+        verdict = None
+        tail = b""
+        start = 0
+        for piece in pieces:
+            text = tail + piece.encode("utf-8", "replace").lower()
+            resume = max(start, len(text) - self.max_length)
+            for match in self.regex.finditer(text, start):
+                if match.end() >= len(text):
+                    break
+                if not self._counted_zero(text, match.start()):
+                    verdict = self.kind(match.group().decode("utf-8", "replace"))
+                resume = max(match.end(), len(text) - self.max_length)
+            cut = max(0, resume - ZERO_COUNT_CONTEXT_BYTES - 1)
+            tail, start = text[cut:], resume - cut
+        for match in self.regex.finditer(tail, start):
+            if not self._counted_zero(tail, match.start()):
+                verdict = self.kind(match.group().decode("utf-8", "replace"))
+        return verdict
+
+    def last_match(self, buffer, window=SCAN_WINDOW_BYTES):
+        """
+        (offset, marker) of the last marker in buffer (bytes or an mmap), or None.
+        Windows are scanned from the end towards the start, so a verdict near
+        the end of a huge log is found without reading the rest. Each window is
+        copied and lower-cased on its own, which keeps memory constant; windows
+        overlap by the longest marker on both sides, so markers across a
+        boundary are seen whole (and not by a later word of theirs) and word
+        boundaries stay exact.
+        """
+        if self.regex is None:
+            return None
+        size = len(buffer)
+        overlap = self.max_length + 1
+        end = size
+        while end > 0:
+            start = max(0, end - window)
+            base = max(0, start - overlap)
+            text = bytes(buffer[base:min(size, end + overlap)]).lower()
+            if any(anchor in text for anchor in self.anchors):
+                last = None
+                for match in self.regex.finditer(text, max(0, start - self.max_length) - base):
+                    if base + match.start() >= end:
+                        break
+                    # Markers starting before the window belong to the next one
+                    if base + match.start() >= start and not self._counted_zero(buffer, base + match.start()):
+                        last = match
+                if last is not None:
+                    return base + last.start(), last.group().decode("utf-8", "replace")
+            end = start
+        return None
+
+@functools.lru_cache(maxsize=16)
+def get_matcher(pass_markers, fail_markers):
+    """
+    MarkerMatcher for the given marker tuples, compiled once per process.
+    """
+    return MarkerMatcher(pass_markers, fail_markers)
+
 class FinalOutputChecker:
-    def __init__(self, output_path):
+    """
+    Decides whether a test run's final output reports success.
+
+    Text outputs are memory-mapped and searched for whole-word pass and fail
+    markers; the last marker in the file decides, so "retrying after failure ...
+    test successful" passes, "unsuccessful" never counts as "success" and
+    "10 passed, 0 failed" passes (a marker after a zero count is ignored).
+    JSON and JSON-lines outputs are stream-parsed for structured verdicts
+    ("success"/"passed"/"ok" booleans, "status"/"result"/"outcome" strings): a
+    top-level verdict decides, otherwise every per-record verdict must pass.
+    JSON without such fields falls back to the text scan. Memory use does not
+    grow with the output size: JSON fields other than verdicts are skipped
+    undecoded and long status strings are scanned piece by piece. evidence
+    describes what decided the last call.
+    """
+    def __init__(self, output_path, pass_markers=DEFAULT_PASS_MARKERS, fail_markers=DEFAULT_FAIL_MARKERS, mode="auto"):
         self.output_path = output_path
+        self.matcher = get_matcher(tuple(pass_markers), tuple(fail_markers))
+        self.mode = mode
+        self.evidence = None
 
     def validate_output(self):
+        mode = self.mode if self.mode != "auto" else self._detect_mode()
+        if mode in ("json", "jsonl"):
+            verdict = self._validate_json(mode)
+            if verdict is not None:
+                return verdict
+        return self._validate_text()
+
+    def _detect_mode(self):
+        extension = os.path.splitext(self.output_path)[1].lower()
+        if extension in (".jsonl", ".ndjson"):
+            return "jsonl"
+        if extension == ".json":
+            return "json"
+        return "text"
+
+    def _validate_text(self):
+        if os.path.getsize(self.output_path) == 0:
+            self.evidence = {"mode": "text", "marker": None}
+            return False
+
+        with open(self.output_path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            found = self.matcher.last_match(mapped)
+        if found is None:
+            self.evidence = {"mode": "text", "marker": None}
+            return False
+        self.evidence = {"mode": "text", "marker": found[1], "offset": found[0]}
+        return self.matcher.kind(found[1])
+
+    def _record_verdict(self, record):
+        if not isinstance(record, dict):
+            return None
+        for key in BOOLEAN_VERDICT_KEYS:
+            if isinstance(record.get(key), bool):
+                return record[key]
+        for key in STATUS_VERDICT_KEYS:
+            if isinstance(record.get(key), str):
+                return self.matcher.classify(record[key])
+        return None
+
+    def _validate_json(self, mode):
         """
-        Basic validation: adjust based on real output structure.
+        Structured verdict, or None when the output carries none (or is not valid JSON).
         """
-        with open(self.output_path, 'r') as file:
-            content = file.read().lower()
-        
-        # Example: look for success indicator
-        return "test successful" in content or "success" in content
+        passed = failed = 0
+        top_level = None
+        try:
+            with open(self.output_path, "r", encoding="utf-8-sig", errors="replace") as file:
+                if mode == "jsonl":
+                    verdicts = ((None, self._record_verdict(json.loads(line))) for line in file if line.strip())
+                else:
+                    verdicts = self._iter_json_verdicts(file)
+                for key, verdict in verdicts:
+                    if key is None:
+                        passed += verdict is True
+                        failed += verdict is False
+                    elif verdict is not None:
+                        # A top-level verdict of the output document decides on its own
+                        top_level = verdict
+                        break
+        except ValueError as e:
+            print(f"[WARN] {self.output_path} is not valid {mode.upper()} ({e}); checking it as text")
+            return None
+
+        if top_level is not None:
+            self.evidence = {"mode": mode, "top_level": top_level}
+            return top_level
+        if passed or failed:
+            self.evidence = {"mode": mode, "records_passed": passed, "records_failed": failed}
+            return failed == 0
+        return None
+
+    def _iter_json_verdicts(self, file):
+        """
+        Yields (key, verdict) for verdict fields of a top-level JSON object and
+        (None, verdict) for every element of a top-level list or of any list or
+        object value one level down, one record at a time.
+        """
+        reader = JsonStream(file)
+        first = reader.peek()
+        if first == "[":
+            yield from self._iter_list_verdicts(reader)
+        elif first == "{":
+            for key in reader.iter_object_keys():
+                char = reader.peek()
+                if char == "[":
+                    yield from self._iter_list_verdicts(reader)
+                elif char == "{":
+                    yield None, self._object_verdict(reader)
+                elif self._is_verdict_field(key, char):
+                    yield key, self._read_verdict(reader, key)
+                else:
+                    reader.skip_value()
+        else:
+            raise ValueError("not a JSON list or object")
+
+    def _iter_list_verdicts(self, reader):
+        for _ in reader.iter_elements():
+            if reader.peek() == "{":
+                yield None, self._object_verdict(reader)
+            else:
+                reader.skip_value()
+
+    def _object_verdict(self, reader):
+        """
+        _record_verdict of the object at the reader, reading only its verdict fields.
+        """
+        verdicts = {}
+        for key in reader.iter_object_keys():
+            if self._is_verdict_field(key, reader.peek()):
+                verdicts[key] = self._read_verdict(reader, key)
+            else:
+                reader.skip_value()
+        for key in BOOLEAN_VERDICT_KEYS + STATUS_VERDICT_KEYS:
+            if key in verdicts:
+                return verdicts[key]
+        return None
+
+    def _is_verdict_field(self, key, first_char):
+        return (key in BOOLEAN_VERDICT_KEYS and first_char in ("t", "f")) or (key in STATUS_VERDICT_KEYS and first_char == '"')
+
+    def _read_verdict(self, reader, key):
+        if key in BOOLEAN_VERDICT_KEYS:
+            return reader.read_value()
+        return self.matcher.classify_pieces(reader.iter_string())
@@ -0,0 +1,61 @@
+import os
+import json
+import time
+from contextlib import closing
+from src.planning_parser import PARSER_VERSION
+from src.sqlite_store import LruSqliteCache
+
+class PlanCache(LruSqliteCache):
+    """
+    Persistent cache of parsed planning logs backed by SQLite. Entries are keyed
+    by the log's absolute path and only served while its size and mtime are
+    unchanged (and the parser version matches), so an unchanged log is never
+    parsed twice. Least-recently-used entries are evicted beyond max_bytes.
+    """
+    table = "plans"
+    key_column = "path"
+    schema = """
+        CREATE TABLE IF NOT EXISTS plans (
+            path TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            parser_version INTEGER NOT NULL,
+            steps TEXT NOT NULL,
+            size_bytes INTEGER NOT NULL,
+            last_access REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_plans_access ON plans(last_access);
+    """
+
+    def __init__(self, db_path="cache/plans.sqlite", max_bytes=32 * 1024 * 1024):
+        super().__init__(db_path, max_bytes)
+
+    def get(self, log_path):
+        """
+        Returns the cached steps of log_path, or None if it changed or was never parsed.
+        """
+        stat = os.stat(log_path)
+        abs_path = os.path.abspath(log_path)
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute(
+                "SELECT steps FROM plans WHERE path = ? AND size = ? AND mtime_ns = ? AND parser_version = ?",
+                (abs_path, stat.st_size, stat.st_mtime_ns, PARSER_VERSION)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE plans SET last_access = ? WHERE path = ?", (time.time(), abs_path))
+
+        self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, log_path, steps):
+        stat = os.stat(log_path)
+        blob = json.dumps(steps)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO plans (path, size, mtime_ns, parser_version, steps, size_bytes, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (os.path.abspath(log_path), stat.st_size, stat.st_mtime_ns, PARSER_VERSION, blob, len(blob), time.time())
+            )
+        self.evict()
@@ -1,18 +1,264 @@
+import os
+import re
+import json
+import datetime
+from src.json_stream import JsonStream
+
+# Bumped whenever the step format changes, so cached parse results are not reused
+PARSER_VERSION = 3
+
+# Text-log lines that are agent narration rather than planned actions
+_NARRATION = re.compile(r"^(?:(?:thought|observation|reasoning|reflection|plan|final answer|result|action input)\s*:|#|//)",
+                        re.IGNORECASE)
+
+# JSON/JSONL records of these types are skipped; keys that may hold a log's step list
+NARRATION_TYPES = {"thought", "observation", "reasoning", "reflection", "message", "log", "result"}
+STEP_LIST_KEYS = {"steps", "plan", "actions", "events"}
+
+READ_CHUNK_CHARS = 64 * 1024
+
+_STEP_PREFIX = re.compile(r"^(?:step\s*(\d+)\s*[:.)-]\s*|(\d+)\s*[.)]\s+|[-*•]\s+|action\s*:\s*)", re.IGNORECASE)
+_TIMESTAMP_PREFIX = re.compile(r"^\[?\s*(\d{4}-\d{2}-\d{2}[T ][\d:.]+(?:Z|[+-]\d{2}:?\d{2})?|\d+:\d{2}(?::\d{2})?(?:\.\d+)?|\d+(?:\.\d+)?s)\s*\]?\s*[-|:]?\s*")
+_CALL = re.compile(r"^([A-Za-z_]\w*)\((.*)\)$")
+_ARTICLES = {"a", "an", "the", "on", "in", "into", "to"}
+
+def parse_timestamp(value):
+    """
+    Seconds from a number, "12.5s", "[m]m:ss(.f)", "h:mm:ss(.f)" or an ISO 8601
+    date-time (epoch seconds); None when value is not a timestamp.
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    value = str(value).strip()
+    if re.fullmatch(r"\d+(?:\.\d+)?s?", value):
+        return float(value.rstrip("s"))
+    if re.fullmatch(r"\d+:\d{2}(?::\d{2})?(?:\.\d+)?", value):
+        seconds = 0.0
+        for part in value.split(":"):
+            seconds = seconds * 60 + float(part)
+        return seconds
+    try:
+        return datetime.datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+def split_action(text):
+    """
+    (action, target) of a step phrase: "Click the login button" => ("click",
+    "login button"), "click(login_button)" => ("click", "login_button").
+    """
+    call = _CALL.match(text.strip())
+    if call:
+        return call.group(1).lower(), call.group(2).strip().strip("'\"") or None
+    words = text.replace('"', "").replace("'", "").split()
+    if not words:
+        return None, None
+    target = [word for word in words[1:] if word.lower() not in _ARTICLES]
+    return words[0].lower(), " ".join(target).lower() or None
+
+def steps_to_text(steps, max_chars=None):
+    """
+    The planned steps as one description per line, e.g. for an LLM prompt.
+    Stops before max_chars so prompts stay bounded however long the log is.
+    """
+    lines = []
+    size = 0
+    for step in steps:
+        line = step["description"]
+        if max_chars is not None and size + len(line) + 1 > max_chars:
+            lines.append(f"... ({len(steps) - len(lines)} more steps)")
+            break
+        lines.append(line)
+        size += len(line) + 1
+    return "\n".join(lines) + "\n"
+
+def prompt_log_text(log_path, steps, max_chars=None):
+    """
+    The planning log as given to the LLM: the raw log, or with max_chars, the
+    parsed steps up to max_chars (see steps_to_text), warning when steps are cut.
+    """
+    if max_chars is None:
+        with open(log_path, "r") as file:
+            return file.read()
+
+    if sum(len(step["description"]) + 1 for step in steps) > max_chars:
+        print(f"[WARN] {log_path}: LLM prompt lists only the steps that fit in {max_chars} characters")
+    return steps_to_text(steps, max_chars)
+
 class PlanningLogParser:
-    def __init__(self, log_path):
+    """
+    Streams the planned steps out of a planning log: plain text (one action per
+    line, agent narration such as "Thought:" lines skipped), a JSON document (a
+    list of steps, or an object holding one under "steps"/"plan"/"actions"/"events")
+    or JSON lines (one record per line). Files are read incrementally and other
+    JSON fields are skipped undecoded, so memory stays bounded by the largest
+    single step record. Each step is a dict with
+    step_number, description, action, target, timestamp (seconds or None) and
+    action_id. With a PlanCache, parse_steps reuses results for unchanged files.
+    """
+    def __init__(self, log_path, cache=None):
         self.log_path = log_path
+        self.cache = cache
 
     def parse_steps(self):
-        steps = []
-        with open(self.log_path, 'r') as file:
-            for line in file:
-                line = line.strip()
-                if line:
-                    steps.append({
-                        "description": line,
-                        "action_id": self._generate_action_id(line)
-                    })
+        if self.cache is not None:
+            cached = self.cache.get(self.log_path)
+            if cached is not None:
+                return cached
+
+        steps = list(self.iter_steps())
+        if self.cache is not None:
+            self.cache.put(self.log_path, steps)
         return steps
 
+    def iter_steps(self):
+        """
+        Yields the steps in log order without holding the whole log in memory.
+        """
+        with open(self.log_path, "r", encoding="utf-8-sig", errors="replace") as file:
+            log_format = self._detect_format(file)
+            if log_format == "json":
+                records = self._iter_json(file)
+            elif log_format == "jsonl":
+                records = self._iter_jsonl(file)
+            else:
+                records = self._iter_text(file)
+
+            number = 0
+            for record in records:
+                step = self._to_step(record, number + 1)
+                if step is not None:
+                    number = step["step_number"]
+                    yield step
+
+    def _detect_format(self, file):
+        extension = os.path.splitext(self.log_path)[1].lower()
+        if extension in (".jsonl", ".ndjson"):
+            return "jsonl"
+
+        head = file.read(READ_CHUNK_CHARS)
+        file.seek(0)
+        lines = [line.strip() for line in head.splitlines() if line.strip()]
+        # JSON lines: a complete object on each of the first lines, whatever the extension
+        if len(lines) > 1 and lines[0].startswith("{") and lines[1].startswith("{") and self._is_json(lines[0]):
+            return "jsonl"
+        return "json" if extension == ".json" else "text"
+
+    def _is_json(self, text):
+        try:
+            json.loads(text)
+            return True
+        except ValueError:
+            return False
+
+    def _iter_text(self, file):
+        for line in file:
+            line = line.strip()
+            if line:
+                yield line
+
+    def _iter_jsonl(self, file):
+        for line_number, line in enumerate(file, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                print(f"[WARN] Skipping malformed JSON line {line_number} in {self.log_path}")
+
+    def _iter_json(self, file):
+        """
+        Streams the elements of the top-level step list, decoding one element
+        at a time from a sliding buffer; sibling fields (e.g. a long "messages"
+        array) are scanned past without being decoded.
+        """
+        reader = JsonStream(file)
+        first = reader.peek()
+        if first == "[":
+            yield from reader.iter_array()
+        elif first == "{":
+            for key in reader.iter_object_keys():
+                if key.lower() in STEP_LIST_KEYS and reader.peek() == "[":
+                    yield from reader.iter_array()
+                else:
+                    reader.skip_value()
+        else:
+            raise ValueError(f"{self.log_path} is not a JSON list or object")
+
+    def _to_step(self, record, default_number):
+        """
+        Normalizes a text line, a JSON string or a JSON object into a step, or
+        None when the record is narration.
+        """
+        if isinstance(record, str):
+            return self._text_step(record, default_number)
+        if not isinstance(record, dict):
+            return None
+
+        kind = str(record.get("type") or record.get("kind") or record.get("role") or "").lower()
+        if kind in NARRATION_TYPES:
+            return None
+
+        action = record.get("action")
+        if isinstance(action, dict):
+            record = {**record, **action}
+            action = record.get("action") if isinstance(record.get("action"), str) else record.get("name")
+        target = record.get("target") or record.get("element") or record.get("selector")
+        description = record.get("description") or record.get("text")
+        if not isinstance(description, str) and isinstance(record.get("step"), str):
+            description = record["step"]
+        if not isinstance(description, str):
+            if not isinstance(action, str):
+                return None
+            description = f"{action} {target}" if target else action
+
+        parsed_action, parsed_target = split_action(description)
+        number = record.get("step_number") or record.get("number")
+        if number is None and isinstance(record.get("step"), int):
+            number = record["step"]
+        timestamp = next((record[key] for key in ("timestamp", "time", "ts") if key in record), None)
+        return self._step(
+            int(number) if isinstance(number, (int, float)) or str(number).isdigit() else default_number,
+            description.strip(),
+            action.lower() if isinstance(action, str) else parsed_action,
+            str(target).lower() if target else parsed_target,
+            parse_timestamp(timestamp)
+        )
+
+    def _text_step(self, line, default_number):
+        timestamp = None
+        match = _TIMESTAMP_PREFIX.match(line)
+        if match and match.end() < len(line):
+            timestamp = parse_timestamp(match.group(1))
+            line = line[match.end():]
+
+        if _NARRATION.match(line):
+            return None
+
+        number = default_number
+        match = _STEP_PREFIX.match(line)
+        if match:
+            if match.group(1) or match.group(2):
+                number = int(match.group(1) or match.group(2))
+            line = line[match.end():].strip()
+        if not line:
+            return None
+
+        action, target = split_action(line)
+        return self._step(number, line, action, target, timestamp)
+
+    def _step(self, number, description, action, target, timestamp):
+        return {
+            "step_number": number,
+            "description": description,
+            "action": action,
+            "target": target,
+            "timestamp": timestamp,
+            "action_id": self._generate_action_id(description)
+        }
+
     def _generate_action_id(self, description):
         return description.lower().replace(" ", "_").replace('"', '')
@@ -2,16 +2,25 @@ import os
 import datetime
 
 class ReportGenerator:
-    def __init__(self, output_dir="reports"):
+    """
+    Writes per-run reports. With a ResultsStore, every run is also appended to
+    the store and the aggregate dashboard in output_dir is refreshed.
+    """
+    def __init__(self, output_dir="reports", results_store=None):
         self.output_dir = output_dir
+        self.results_store = results_store
         os.makedirs(self.output_dir, exist_ok=True)
 
-    def generate_report(self, run_name, results, output_file_path=None, video_path=None, token_usage=None, duration_sec=None, logs=None, html=False):
+    def generate_report(self, run_name, results, output_file_path=None, video_path=None, token_usage=None, duration_sec=None, logs=None, html=False, timings=None, cache_stats=None, output_valid=None, report_id=None):
         """
         Generates both .txt and optional .html reports with technical details.
+        report_id (e.g. a service job id) is added to the file names, so runs
+        with the same name written in the same second do not overwrite each other.
+        Returns the paths of the written reports.
         """
         timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        txt_report_path = os.path.join(self.output_dir, f"{run_name}_detailed_report_{timestamp}.txt")
+        report_name = f"{run_name}_detailed_report_{timestamp}" + (f"_{report_id}" if report_id else "")
+        txt_report_path = os.path.join(self.output_dir, f"{report_name}.txt")
 
         # Shared content builder
         report_content = []
@@ -19,14 +28,36 @@ class ReportGenerator:
         report_content.append("=" * 50)
         report_content.append(f"Total Duration: {duration_sec:.2f} sec")
         report_content.append(f"Total Token Used: {token_usage.get('total_tokens', 0) if token_usage else 'N/A'}")
-        report_content.append(f"Total Cost Estimate: {token_usage.get('total_cost', 'N/A')} USD\n")
+        report_content.append(f"Total Cost Estimate: {token_usage.get('total_cost', 'N/A') if token_usage else 'N/A'} USD\n")
 
         report_content.append("Test Result Summary")
         report_content.append("-" * 50)
         passed_steps = sum(1 for res in results if res['result'] == "✅ Observed")
         failed_steps = len(results) - passed_steps
         report_content.append(f"Steps Passed: {passed_steps}")
-        report_content.append(f"Steps Failed: {failed_steps}\n")
+        report_content.append(f"Steps Failed: {failed_steps}")
+        deviation_types = [res.get("deviation_type") for res in results if res.get("deviation_type")]
+        if deviation_types:
+            counts = ", ".join(f"{kind}={deviation_types.count(kind)}" for kind in ("skipped", "reordered", "repeated"))
+            report_content.append(f"Deviation Types: {counts}")
+        report_content.append("")
+
+        if timings:
+            report_content.append("Stage Timings:")
+            report_content.append("-" * 50)
+            for stage, stats in sorted(timings.items(), key=lambda item: -item[1]["total_sec"]):
+                report_content.append(f"  {stage}: {stats['total_sec']:.3f} sec over {stats['count']} calls (max {stats['max_sec']:.3f} sec)")
+            report_content.append("")
+
+        if cache_stats:
+            report_content.append("Cache Statistics:")
+            report_content.append("-" * 50)
+            for name, stats in cache_stats.items():
+                if stats is None:
+                    report_content.append(f"  {name}: disabled")
+                else:
+                    report_content.append(f"  {name}: {stats['hits']} hits, {stats['misses']} misses, {stats['entries']} entries")
+            report_content.append("")
 
         report_content.append("Detailed Steps:")
         report_content.append("-" * 50)
@@ -48,12 +79,22 @@ class ReportGenerator:
             report_file.write("\n".join(report_content))
         
         print(f"[INFO] Text report generated: {txt_report_path}")
+        report_paths = {"txt": txt_report_path}
 
         # Optional HTML report
         if html:
-            html_report_path = os.path.join(self.output_dir, f"{run_name}_detailed_report_{timestamp}.html")
+            html_report_path = os.path.join(self.output_dir, f"{report_name}.html")
             self._generate_html_report(html_report_path, report_content)
             print(f"[INFO] HTML report generated: {html_report_path}")
+            report_paths["html"] = html_report_path
+
+        if self.results_store is not None:
+            self.results_store.record_run(run_name, results, duration_sec, token_usage, video_path, output_file_path,
+                                          output_valid, txt_report_path)
+            dashboard_paths = self.results_store.write_dashboard(self.output_dir)
+            report_paths["dashboard"] = dashboard_paths["html"]
+
+        return report_paths
 
     def _generate_html_report(self, path, lines):
         """
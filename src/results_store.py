@@ -0,0 +1,239 @@
+import os
+import json
+import html
+import time
+import sqlite3
+from contextlib import closing
+from src.sqlite_store import SqliteStore
+
+OBSERVED = "✅ Observed"
+DEVIATION_TYPES = ("skipped", "reordered", "repeated")
+
+class ResultsStore(SqliteStore):
+    """
+    Append-only history of validated runs backed by SQLite. Every run adds one
+    row of metadata (duration, tokens, video, output verdict, deviation counts)
+    and one compact row per step (step texts are stored once and referenced by
+    id). Per-suite and per-step aggregates (pass counts, verdict flips between
+    consecutive runs) are updated in the same transaction, so the dashboard is
+    built from the aggregates and the latest runs without rescanning history.
+    A suite is a run name; a run passes when every step was observed and the
+    final output did not fail.
+    """
+    schema = """
+        CREATE TABLE IF NOT EXISTS runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            run_name TEXT NOT NULL,
+            recorded_at REAL NOT NULL,
+            duration_sec REAL,
+            total_tokens INTEGER,
+            total_cost REAL,
+            video_path TEXT,
+            output_path TEXT,
+            output_valid INTEGER,
+            steps_total INTEGER NOT NULL,
+            steps_passed INTEGER NOT NULL,
+            skipped INTEGER NOT NULL,
+            reordered INTEGER NOT NULL,
+            repeated INTEGER NOT NULL,
+            passed INTEGER NOT NULL,
+            report_path TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_runs_name ON runs(run_name, id);
+        CREATE TABLE IF NOT EXISTS step_texts (
+            id INTEGER PRIMARY KEY,
+            text TEXT NOT NULL UNIQUE
+        );
+        CREATE TABLE IF NOT EXISTS steps (
+            run_id INTEGER NOT NULL,
+            step_index INTEGER NOT NULL,
+            text_id INTEGER NOT NULL,
+            observed INTEGER NOT NULL,
+            deviation_type TEXT,
+            notes TEXT,
+            PRIMARY KEY (run_id, step_index)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_steps_text ON steps(text_id, run_id);
+        CREATE TABLE IF NOT EXISTS suite_stats (
+            run_name TEXT PRIMARY KEY,
+            runs INTEGER NOT NULL,
+            passed_runs INTEGER NOT NULL,
+            steps_total INTEGER NOT NULL,
+            steps_passed INTEGER NOT NULL,
+            duration_sec_total REAL NOT NULL,
+            tokens_total INTEGER NOT NULL,
+            last_run_id INTEGER NOT NULL,
+            last_passed INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS step_stats (
+            run_name TEXT NOT NULL,
+            text_id INTEGER NOT NULL,
+            runs INTEGER NOT NULL,
+            observed INTEGER NOT NULL,
+            flips INTEGER NOT NULL,
+            last_observed INTEGER NOT NULL,
+            last_run_id INTEGER NOT NULL,
+            PRIMARY KEY (run_name, text_id)
+        );
+        CREATE INDEX IF NOT EXISTS idx_step_stats_flips ON step_stats(flips);
+    """
+
+    def __init__(self, db_path="reports/results.sqlite"):
+        super().__init__(db_path)
+
+    def record_run(self, run_name, results, duration_sec=None, token_usage=None, video_path=None, output_path=None,
+                   output_valid=None, report_path=None):
+        """
+        Appends a run and its DeviationEngine results; returns the run id.
+        """
+        observed = [res["result"] == OBSERVED for res in results]
+        deviation_types = [res.get("deviation_type") for res in results]
+        steps_passed = sum(observed)
+        passed = steps_passed == len(results) and output_valid is not False
+        total_tokens = token_usage.get("total_tokens") if token_usage else None
+
+        # A step listed twice in one run counts once, observed only if every occurrence was
+        per_text = {}
+        for res, seen in zip(results, observed):
+            per_text[res["description"]] = per_text.get(res["description"], True) and seen
+
+        with closing(self._connect()) as conn, conn:
+            # Takes the write lock up front, so aggregates of concurrent writers never interleave
+            conn.execute("BEGIN IMMEDIATE")
+            run_id = conn.execute(
+                "INSERT INTO runs (run_name, recorded_at, duration_sec, total_tokens, total_cost, video_path, output_path, "
+                "output_valid, steps_total, steps_passed, skipped, reordered, repeated, passed, report_path) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (run_name, time.time(), duration_sec, total_tokens, token_usage.get("total_cost") if token_usage else None,
+                 video_path, output_path, None if output_valid is None else int(bool(output_valid)), len(results),
+                 steps_passed, *(deviation_types.count(kind) for kind in DEVIATION_TYPES), int(passed), report_path)
+            ).lastrowid
+
+            conn.executemany("INSERT OR IGNORE INTO step_texts (text) VALUES (?)", [(text,) for text in per_text])
+            text_ids = dict(self._select_in(conn, "SELECT text, id FROM step_texts WHERE text IN ({})", list(per_text)))
+            conn.executemany(
+                "INSERT INTO steps (run_id, step_index, text_id, observed, deviation_type, notes) VALUES (?, ?, ?, ?, ?, ?)",
+                [(run_id, idx, text_ids[res["description"]], int(seen), res.get("deviation_type"), res.get("notes"))
+                 for idx, (res, seen) in enumerate(zip(results, observed))]
+            )
+
+            conn.execute("""
+                INSERT INTO suite_stats (run_name, runs, passed_runs, steps_total, steps_passed, duration_sec_total,
+                                         tokens_total, last_run_id, last_passed)
+                VALUES (?, 1, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(run_name) DO UPDATE SET
+                    runs = runs + 1,
+                    passed_runs = passed_runs + excluded.passed_runs,
+                    steps_total = steps_total + excluded.steps_total,
+                    steps_passed = steps_passed + excluded.steps_passed,
+                    duration_sec_total = duration_sec_total + excluded.duration_sec_total,
+                    tokens_total = tokens_total + excluded.tokens_total,
+                    last_run_id = excluded.last_run_id,
+                    last_passed = excluded.last_passed
+            """, (run_name, int(passed), len(results), steps_passed, duration_sec or 0.0, total_tokens or 0, run_id, int(passed)))
+
+            conn.executemany("""
+                INSERT INTO step_stats (run_name, text_id, runs, observed, flips, last_observed, last_run_id)
+                VALUES (?, ?, 1, ?, 0, ?, ?)
+                ON CONFLICT(run_name, text_id) DO UPDATE SET
+                    runs = runs + 1,
+                    observed = observed + excluded.observed,
+                    flips = flips + (last_observed != excluded.last_observed),
+                    last_observed = excluded.last_observed,
+                    last_run_id = excluded.last_run_id
+            """, [(run_name, text_ids[text], int(seen), int(seen), run_id) for text, seen in per_text.items()])
+        return run_id
+
+    def _select_in(self, conn, query, values):
+        # Stay below SQLite's bound-parameter limit
+        rows = []
+        for start in range(0, len(values), 500):
+            chunk = values[start:start + 500]
+            rows.extend(conn.execute(query.format(",".join("?" * len(chunk))), chunk).fetchall())
+        return rows
+
+    def dashboard(self, recent_runs=20, top_steps=20):
+        """
+        Suite-level pass rates, the flakiest and most often deviating steps, and
+        the latest runs. Reads the aggregate tables and an index range only.
+        """
+        with closing(self._connect()) as conn:
+            conn.row_factory = sqlite3.Row
+            suites = [dict(row) for row in conn.execute("SELECT * FROM suite_stats ORDER BY run_name")]
+            step_columns = ("SELECT s.run_name, t.text AS description, s.runs, s.observed, s.flips, s.last_observed "
+                            "FROM step_stats s JOIN step_texts t ON t.id = s.text_id ")
+            flaky = [dict(row) for row in conn.execute(
+                step_columns + "WHERE s.flips > 0 ORDER BY s.flips DESC, s.runs DESC LIMIT ?", (top_steps,))]
+            deviating = [dict(row) for row in conn.execute(
+                step_columns + "WHERE s.observed < s.runs ORDER BY s.runs - s.observed DESC, s.runs DESC LIMIT ?", (top_steps,))]
+            recent = [dict(row) for row in conn.execute(
+                "SELECT id, run_name, recorded_at, duration_sec, total_tokens, output_valid, steps_total, steps_passed, "
+                "skipped, reordered, repeated, passed, report_path FROM runs ORDER BY id DESC LIMIT ?", (recent_runs,))]
+
+        for suite in suites:
+            suite["pass_rate"] = round(suite["passed_runs"] / suite["runs"], 4)
+            suite["step_pass_rate"] = round(suite["steps_passed"] / suite["steps_total"], 4) if suite["steps_total"] else None
+        for step in flaky:
+            step["flip_rate"] = round(step["flips"] / max(1, step["runs"] - 1), 4)
+        for step in deviating:
+            step["deviation_rate"] = round(1 - step["observed"] / step["runs"], 4)
+
+        runs = sum(suite["runs"] for suite in suites)
+        passed_runs = sum(suite["passed_runs"] for suite in suites)
+        return {
+            "generated_at": time.time(),
+            "totals": {
+                "suites": len(suites),
+                "runs": runs,
+                "passed_runs": passed_runs,
+                "pass_rate": round(passed_runs / runs, 4) if runs else None,
+                "duration_sec": round(sum(suite["duration_sec_total"] for suite in suites), 2),
+                "total_tokens": sum(suite["tokens_total"] for suite in suites)
+            },
+            "suites": suites,
+            "flaky_steps": flaky,
+            "deviating_steps": deviating,
+            "recent_runs": recent
+        }
+
+    def write_dashboard(self, output_dir, recent_runs=20, top_steps=20):
+        """
+        Writes dashboard.json and dashboard.html to output_dir, each replaced
+        atomically so readers never see a partial file. Returns their paths.
+        """
+        data = self.dashboard(recent_runs, top_steps)
+        os.makedirs(output_dir, exist_ok=True)
+        paths = {"json": os.path.join(output_dir, "dashboard.json"), "html": os.path.join(output_dir, "dashboard.html")}
+        self._replace(paths["json"], json.dumps(data, indent=2, ensure_ascii=False))
+        self._replace(paths["html"], self._render_html(data))
+        return paths
+
+    def _replace(self, path, content):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def _render_html(self, data):
+        def table(title, rows, columns):
+            cells = "".join(f"<th>{html.escape(column)}</th>" for column in columns)
+            body = "".join(
+                "<tr>" + "".join(f"<td>{html.escape('' if row[column] is None else str(row[column]))}</td>" for column in columns) + "</tr>"
+                for row in rows
+            )
+            return f"<h3>{html.escape(title)}</h3><table border='1' cellpadding='4'><tr>{cells}</tr>{body}</table>"
+
+        totals = data["totals"]
+        pass_rate = f"{totals['pass_rate'] * 100:.1f}%" if totals["pass_rate"] is not None else "N/A"
+        return "".join([
+            "<html><head><meta charset='utf-8'><title>Test Dashboard</title></head><body>",
+            "<h2>Test Dashboard</h2>",
+            f"<p>{totals['runs']} runs of {totals['suites']} suites, {totals['passed_runs']} passed ({pass_rate}); "
+            f"{totals['duration_sec']} sec, {totals['total_tokens']} tokens in total</p>",
+            table("Suites", data["suites"], ("run_name", "runs", "passed_runs", "pass_rate", "step_pass_rate", "last_passed")),
+            table("Flaky steps", data["flaky_steps"], ("run_name", "description", "runs", "flips", "flip_rate", "last_observed")),
+            table("Deviating steps", data["deviating_steps"], ("run_name", "description", "runs", "observed", "deviation_rate")),
+            table("Recent runs", data["recent_runs"], ("id", "run_name", "passed", "steps_passed", "steps_total", "skipped",
+                                                       "reordered", "repeated", "output_valid", "duration_sec", "report_path")),
+            "</body></html>"
+        ])
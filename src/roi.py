@@ -0,0 +1,289 @@
+import os
+import json
+import math
+import hashlib
+import cv2
+import numpy as np
+from src.detectors import DetectorBackend
+
+# Grayscale thumbnail on which changes outside the known regions are looked for
+CHANGE_THUMBNAIL_SIZE = (160, 90)
+
+def _union(a, b):
+    return [min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])]
+
+def _overlaps(a, b):
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+def merge_regions(regions):
+    """
+    Merges overlapping (x1, y1, x2, y2) boxes until none overlap, so shared
+    screen areas are only cropped once.
+    """
+    merged = [list(region) for region in regions]
+    changed = True
+    while changed:
+        changed = False
+        for i in range(len(merged)):
+            for j in range(i + 1, len(merged)):
+                if _overlaps(merged[i], merged[j]):
+                    merged[i] = _union(merged[i], merged.pop(j))
+                    changed = True
+                    break
+            if changed:
+                break
+    return merged
+
+class RegionStore:
+    """
+    Active regions per label, learned from earlier runs, as relative
+    (x1, y1, x2, y2) boxes in a JSON file. Saving merges with what is on disk
+    and replaces the file atomically, so concurrent runs only ever grow it.
+    """
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[WARN] Ignoring unreadable ROI file {self.path}: {e}")
+            return {}
+
+    def save(self, regions):
+        merged = self.load()
+        for label, box in regions.items():
+            merged[label] = _union(merged[label], box) if label in merged else list(box)
+
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({label: [round(v, 4) for v in box] for label, box in merged.items()}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+class RoiDetector(DetectorBackend):
+    """
+    Runs a detector only on cropped, downscaled tiles around the screen regions
+    where the labels of interest appear, and maps boxes back to full-frame
+    coordinates.
+
+    Regions are relative (x1, y1, x2, y2) boxes per label. "static" mode uses only
+    the configured ones. "auto" mode also uses regions learned from the store and
+    from this run's detections. A frame is scanned in full, as a grid x grid set
+    of overlapping tiles, while some label has no known region, and every
+    rescan_interval inferred frames, so elements that move are still found. Known
+    regions are padded by margin (a fraction of the frame) and merged. Each tile
+    is downscaled so its longer side is at most tile_size.
+
+    In "auto" mode a frame is also scanned in full when, compared with the
+    previous inferred frame, some thumbnail pixel outside the known regions
+    changed by more than change_threshold (0-255; 0 disables). Inferred frames
+    can be seconds apart with motion gating, so this catches an element that
+    appears somewhere new without waiting for the next periodic rescan.
+    """
+    name = "roi"
+
+    def __init__(self, base, labels, params, store=None):
+        self.base = base
+        self.labels = {label.lower() for label in labels}
+        self.params = params
+        self.mode = params["mode"]
+        self.regions = params["regions"]
+        self.tile_size = params["tile_size"]
+        self.margin = params["margin"]
+        self.grid = max(1, params["grid"])
+        self.rescan_interval = params["rescan_interval"]
+        self.change_threshold = params.get("change_threshold", 0)
+        self.store = store
+        self.thumbnail = None
+
+        self.learned = {}
+        self.seeds = store.load() if (store is not None and self.mode == "auto") else {}
+        self.frames_inferred = 0
+        self.full_scans = 0
+        self.change_scans = 0
+        self.tiles_inferred = 0
+        self.pixels_inferred = 0
+        self.pixels_total = 0
+
+    def settings(self):
+        return {**self.base.settings(), "roi": roi_cache_settings(self.params, self.labels, self.seeds)}
+
+    def known_regions(self):
+        known = {}
+        sources = [self.regions] if self.mode == "static" else [self.regions, self.seeds, self.learned]
+        for source in sources:
+            for label, box in source.items():
+                known[label] = _union(known[label], box) if label in known else list(box)
+        return known
+
+    def detect_boxes(self, frames):
+        tiles, owners = [], []
+        for frame_idx, frame in enumerate(frames):
+            height, width = frame.shape[:2]
+            for x1, y1, x2, y2 in self._plan(frame):
+                crop = frame[y1:y2, x1:x2]
+                scale = min(1.0, self.tile_size / max(x2 - x1, y2 - y1))
+                if scale < 1.0:
+                    crop = cv2.resize(crop, (max(1, round((x2 - x1) * scale)), max(1, round((y2 - y1) * scale))),
+                                      interpolation=cv2.INTER_AREA)
+                tiles.append(crop)
+                owners.append((frame_idx, x1, y1, scale))
+                self.pixels_inferred += crop.shape[0] * crop.shape[1]
+            self.pixels_total += width * height
+            self.frames_inferred += 1
+
+        self.tiles_inferred += len(tiles)
+        results = [[] for _ in frames]
+        for (frame_idx, x0, y0, scale), detections in zip(owners, self.base.detect_boxes(tiles) if tiles else []):
+            height, width = frames[frame_idx].shape[:2]
+            for label, confidence, (bx1, by1, bx2, by2) in detections:
+                box = (bx1 / scale + x0, by1 / scale + y0, bx2 / scale + x0, by2 / scale + y0)
+                results[frame_idx].append((label, confidence, box))
+                if label in self.labels and self.mode == "auto":
+                    relative = [box[0] / width, box[1] / height, box[2] / width, box[3] / height]
+                    self.learned[label] = _union(self.learned[label], relative) if label in self.learned else relative
+        return results
+
+    def _plan(self, frame):
+        """
+        Pixel boxes to crop from frame.
+        """
+        height, width = frame.shape[:2]
+        known = self.known_regions()
+        if self.mode == "static":
+            # Labels without a configured region are still searched in the whole frame
+            full = any(label not in known for label in self.labels)
+        else:
+            changed = self._changed_outside(frame, known.values())
+            full = (any(label not in known for label in self.labels)
+                    or (self.rescan_interval and self.frames_inferred % self.rescan_interval == 0))
+            if changed and not full:
+                self.change_scans += 1
+                full = True
+
+        if full:
+            self.full_scans += 1
+            return self._grid(width, height)
+        return self._to_pixels(known.values(), width, height)
+
+    def _grid(self, width, height):
+        # Frames that already fit in a tile are not split
+        grid = min(self.grid, math.ceil(max(width, height) / self.tile_size))
+        if grid <= 1:
+            return [(0, 0, width, height)]
+        tile_width, tile_height = math.ceil(width / grid), math.ceil(height / grid)
+        overlap_x, overlap_y = int(width * self.margin), int(height * self.margin)
+        return [
+            (max(0, col * tile_width - overlap_x), max(0, row * tile_height - overlap_y),
+             min(width, (col + 1) * tile_width + overlap_x), min(height, (row + 1) * tile_height + overlap_y))
+            for row in range(grid) for col in range(grid)
+        ]
+
+    def _changed_outside(self, frame, regions):
+        """
+        Whether frame differs from the previous inferred frame outside the padded regions.
+        """
+        if not self.change_threshold:
+            return False
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        thumbnail = cv2.resize(gray, CHANGE_THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA).astype(np.int16)
+        previous, self.thumbnail = self.thumbnail, thumbnail
+        if previous is None:
+            return False
+
+        changed = np.abs(thumbnail - previous) > self.change_threshold
+        thumb_width, thumb_height = CHANGE_THUMBNAIL_SIZE
+        for x1, y1, x2, y2 in regions:
+            changed[max(0, int((y1 - self.margin) * thumb_height)):math.ceil((y2 + self.margin) * thumb_height),
+                    max(0, int((x1 - self.margin) * thumb_width)):math.ceil((x2 + self.margin) * thumb_width)] = False
+        return bool(changed.any())
+
+    def _to_pixels(self, regions, width, height):
+        padded = [
+            (max(0.0, x1 - self.margin), max(0.0, y1 - self.margin), min(1.0, x2 + self.margin), min(1.0, y2 + self.margin))
+            for x1, y1, x2, y2 in regions
+        ]
+        boxes = [
+            (int(x1 * width), int(y1 * height), math.ceil(x2 * width), math.ceil(y2 * height))
+            for x1, y1, x2, y2 in merge_regions(padded)
+        ]
+        return [box for box in boxes if box[2] > box[0] and box[3] > box[1]]
+
+    def stats(self):
+        return {
+            "mode": self.mode,
+            "frames_inferred": self.frames_inferred,
+            "full_scans": self.full_scans,
+            "change_scans": self.change_scans,
+            "tiles_inferred": self.tiles_inferred,
+            "pixel_ratio": round(self.pixels_inferred / self.pixels_total, 4) if self.pixels_total else None
+        }
+
+    def finish(self):
+        """
+        Prints the tiling statistics and adds this run's learned regions to the store.
+        """
+        stats = self.stats()
+        if stats["frames_inferred"]:
+            print(f"[INFO] ROI ({self.mode}) inferred {stats['pixel_ratio'] * 100:.1f}% of frame pixels in "
+                  f"{stats['tiles_inferred']} tiles ({stats['full_scans']}/{stats['frames_inferred']} full-frame scans, "
+                  f"{stats['change_scans']} for changes outside the known regions)")
+        if self.store is not None and self.learned:
+            self.store.save(self.learned)
+
+def roi_params(mode, regions=None, tile_size=320, margin=0.05, grid=2, rescan_interval=10, store_path=None, change_threshold=16):
+    """
+    Picklable ROI configuration carried in the detector spec ("roi" key).
+    store_path is where "auto" mode keeps learned regions between runs.
+    """
+    return {
+        "mode": mode,
+        "regions": {label.lower(): list(box) for label, box in (regions or {}).items()},
+        "tile_size": tile_size,
+        "margin": margin,
+        "grid": grid,
+        "rescan_interval": rescan_interval,
+        "change_threshold": change_threshold,
+        "store_path": store_path
+    }
+
+def roi_settings(params):
+    """
+    The part of the ROI configuration that changes detections (for the cache key).
+    """
+    return {key: value for key, value in params.items() if key != "store_path"}
+
+def load_seeds(params):
+    """
+    The learned regions an "auto" mode RoiDetector built now would start from.
+    """
+    if params["mode"] != "auto" or not params["store_path"]:
+        return {}
+    return RegionStore(params["store_path"]).load()
+
+def roi_cache_settings(params, labels, seeds):
+    """
+    Everything about ROI tiling that changes detections, for the detection cache
+    key: the configuration, the labels of interest (they decide when a frame is
+    scanned in full) and, in "auto" mode, a digest of the learned regions.
+    """
+    settings = {**roi_settings(params), "labels": sorted(labels)}
+    if params["mode"] == "auto":
+        learned = json.dumps(seeds, sort_keys=True).encode("utf-8")
+        settings["learned"] = hashlib.sha256(learned).hexdigest()[:16]
+    return settings
+
+def with_roi(backend, params, labels):
+    """
+    Wraps backend in a RoiDetector according to params, or returns it unchanged
+    when ROI is off (params None or mode "off").
+    """
+    if not params or params["mode"] == "off" or isinstance(backend, RoiDetector):
+        return backend
+    store = RegionStore(params["store_path"]) if (params["store_path"] and params["mode"] == "auto") else None
+    return RoiDetector(backend, labels, params, store)
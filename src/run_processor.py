@@ -0,0 +1,142 @@
+import os
+import asyncio
+import threading
+from src.planning_parser import PlanningLogParser
+from src.video_analyzer import VideoAnalyzer, ACTION_LABEL_MAP
+from src.output_checker import FinalOutputChecker
+from src.deviation_engine import DeviationEngine, unmapped_note
+from src.label_matcher import label_matcher_spec, get_label_matcher, describe_unmapped
+from src.tracing import NULL_TRACER
+from src.detectors import detector_spec, create_detector
+
+class RunProcessor:
+    """
+    Deterministic validation of a single test run: planned steps against the
+    video, plus the final output check. The detector backend comes from the
+    process-wide model registry, loaded on first use and shared by every analyzer.
+    Steps are resolved to detector labels (label_matcher spec) before any video
+    work; parsed logs are reused from plan_cache (a PlanCache) when given.
+    The last video's analyzer and timeline are kept for the agent tools (see video_timeline).
+    """
+    def __init__(self, model_path, analyzer_options=None, search_mode="timeline", coarse_stride_sec=1.0, max_gap_sec=1.0,
+                 label_matcher=None, plan_cache=None, output_options=None):
+        self.model_path = model_path
+        self.analyzer_options = analyzer_options or {}
+        self.search_mode = search_mode
+        self.coarse_stride_sec = coarse_stride_sec
+        self.max_gap_sec = max_gap_sec
+        self.label_matcher = label_matcher or label_matcher_spec(ACTION_LABEL_MAP.values(), overrides=ACTION_LABEL_MAP)
+        self.plan_cache = plan_cache
+        # FinalOutputChecker keyword arguments (markers, mode)
+        self.output_options = output_options or {}
+        self.model = None
+        # Held while the shared detector runs, so agent tools and step analysis never infer concurrently
+        self.video_lock = threading.Lock()
+        # (video key, VideoAnalyzer) of the last timeline built
+        self._video = None
+
+    def get_model(self, tracer=NULL_TRACER):
+        if self.model is None:
+            spec = self.analyzer_options.get("detector") or detector_spec("ultralytics", self.model_path)
+            self.model = create_detector(spec, tracer)
+        return self.model
+
+    def get_label_matcher(self, tracer=NULL_TRACER):
+        return get_label_matcher(self.label_matcher, tracer)
+
+    def plan_steps(self, log_path, tracer=NULL_TRACER):
+        """
+        Parses the planning log and resolves every step to a detector label
+        ("label", None when unmapped). Unmapped steps are reported right away.
+        """
+        with tracer.span("planning_parse"):
+            steps = PlanningLogParser(log_path, self.plan_cache).parse_steps()
+        unmapped = self.get_label_matcher(tracer).resolve_steps(steps, tracer)
+        if unmapped:
+            print(f"[WARN] {log_path}: {describe_unmapped(unmapped, len(steps))}")
+        return steps
+
+    def video_timeline(self, video_path, labels=None, tracer=NULL_TRACER):
+        """
+        The detection timeline of video_path for labels (defaults to all labels in
+        the action map). Step analysis and the agent tools share the last video's
+        analyzer, so a video is decoded once per run; a label the timeline lacks
+        rebuilds it for the union. Callers hold video_lock.
+        """
+        stat = os.stat(video_path)
+        key = (os.path.normcase(os.path.abspath(video_path)), stat.st_size, stat.st_mtime_ns)
+        wanted = {label.lower() for label in (labels or ACTION_LABEL_MAP.values())}
+        if self._video is None or self._video[0] != key:
+            # The weights are only loaded if the detection cache misses
+            analyzer = VideoAnalyzer(video_path, self.model_path, model=self.model, tracer=tracer, labels=wanted, **self.analyzer_options)
+            self._video = (key, analyzer)
+
+        analyzer = self._video[1]
+        analyzer.tracer = tracer
+        if analyzer.timeline is None or not wanted <= analyzer.labels:
+            analyzer.build_timeline(analyzer.labels | wanted)
+        return analyzer.timeline
+
+    def warm_cache(self, video_path, log_path=None, tracer=NULL_TRACER):
+        """
+        Builds the timeline a timeline-mode analyze_steps of log_path would (same
+        labels, detector loaded only on a cache miss), so the detection cache
+        entry it stores is the one the next run looks up.
+        """
+        steps = self.plan_steps(log_path, tracer) if log_path else []
+        labels = {step["label"] for step in steps if step["label"]} or None
+        with self.video_lock:
+            self.video_timeline(video_path, labels, tracer)
+
+    def analyze_steps(self, log_path, video_path, tracer=NULL_TRACER, steps=None):
+        """
+        Returns the DeviationEngine results for every step of the planning log.
+        steps may be passed when plan_steps already ran for log_path.
+        """
+        if steps is None:
+            steps = self.plan_steps(log_path, tracer)
+        deviation_engine = DeviationEngine()
+
+        # TOOL USAGE: VideoAnalyzer (one detection pass per video, or a sampled search per step)
+        labels = {step["label"] for step in steps if step["label"]} or None
+        if self.search_mode == "timeline":
+            # One timeline pass serves the whole plan, aligned in planned order
+            with self.video_lock, tracer.span("video_analysis"):
+                timeline = self.video_timeline(video_path, labels, tracer)
+            with tracer.span("step_alignment"):
+                return deviation_engine.align_steps(steps, timeline, self.max_gap_sec)
+
+        # The weights are only loaded if the detection cache misses
+        analyzer = VideoAnalyzer(video_path, self.model_path, model=self.model, tracer=tracer, labels=labels, **self.analyzer_options)
+        previous_timestamp = None
+        with self.video_lock, tracer.span("video_analysis"):
+            for step in steps:
+                description = step["description"]
+                if not step["label"]:
+                    deviation_engine.record_step(description, False, notes=unmapped_note(step))
+                    continue
+
+                found, timestamp = analyzer.locate_label(step["label"], start_sec=previous_timestamp, coarse_stride_sec=self.coarse_stride_sec)
+                if found:
+                    previous_timestamp = timestamp
+
+                deviation_engine.record_step(description, found, timestamp)
+
+        return deviation_engine.get_results()
+
+    async def validate_run_async(self, log_path, video_path, output_path, tracer=NULL_TRACER, executor=None, steps=None):
+        """
+        Runs step analysis and the final output check concurrently in executor
+        threads so callers can also overlap LLM work with them.
+        Returns (results, output_valid).
+        """
+        loop = asyncio.get_running_loop()
+        return await asyncio.gather(
+            loop.run_in_executor(executor, self.analyze_steps, log_path, video_path, tracer, steps),
+            loop.run_in_executor(executor, self.validate_output, output_path, tracer)
+        )
+
+    def validate_output(self, output_path, tracer=NULL_TRACER):
+        # TOOL USAGE: FinalOutputChecker (validate test output)
+        with tracer.span("output_validation"):
+            return FinalOutputChecker(output_path, **self.output_options).validate_output()
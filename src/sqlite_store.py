@@ -0,0 +1,65 @@
+import os
+import sqlite3
+from contextlib import closing
+
+class SqliteStore:
+    """
+    Base for the SQLite-backed caches and stores: creates the directory of
+    db_path and the subclass's schema, and opens WAL connections so readers in
+    other processes never block a writer.
+    """
+    schema = ""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+
+        if os.path.dirname(self.db_path):
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+
+        with closing(self._connect()) as conn, conn:
+            conn.executescript(self.schema)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+class LruSqliteCache(SqliteStore):
+    """
+    SqliteStore whose `table` rows (keyed by `key_column`, with size_bytes and
+    last_access columns) are evicted least-recently-used once they exceed
+    max_bytes; the most recent entry is always kept. Subclasses count hits and
+    misses in get.
+    """
+    name = None
+    table = None
+    key_column = "key"
+
+    def __init__(self, db_path, max_bytes):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        super().__init__(db_path)
+
+    def evict(self):
+        with closing(self._connect()) as conn, conn:
+            entries = conn.execute(f"SELECT {self.key_column}, size_bytes FROM {self.table} ORDER BY last_access ASC").fetchall()
+            total = sum(size for _, size in entries)
+            evicted = []
+            for key, size in entries[:-1]:
+                if total <= self.max_bytes:
+                    break
+                evicted.append(key)
+                total -= size
+            self._delete(conn, evicted)
+
+        if evicted and self.name:
+            print(f"[INFO] {self.name}: evicted {len(evicted)} least recently used entries")
+
+    def _delete(self, conn, keys):
+        conn.executemany(f"DELETE FROM {self.table} WHERE {self.key_column} = ?", [(key,) for key in keys])
+
+    def stats(self):
+        with closing(self._connect()) as conn:
+            entries, size = conn.execute(f"SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM {self.table}").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "size_bytes": size}
@@ -0,0 +1,120 @@
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+class Tracer:
+    """
+    Lightweight per-run stage timer. Spans are aggregated per stage name
+    (count, total and max seconds) rather than stored individually, so hot
+    stages such as per-frame decode cost a dict update. Thread-safe, since
+    frames are decoded on a background thread.
+    """
+    def __init__(self, run_name=None):
+        self.run_name = run_name
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start)
+
+    def add(self, stage, duration_sec, count=1):
+        with self._lock:
+            stats = self.stages.get(stage)
+            if stats is None:
+                self.stages[stage] = {"count": count, "total_sec": duration_sec, "max_sec": duration_sec}
+            else:
+                stats["count"] += count
+                stats["total_sec"] += duration_sec
+                stats["max_sec"] = max(stats["max_sec"], duration_sec)
+
+    def merge(self, summary):
+        """
+        Folds another tracer's summary() into this one (e.g. from a worker process).
+        """
+        for stage, stats in summary.items():
+            with self._lock:
+                current = self.stages.setdefault(stage, {"count": 0, "total_sec": 0.0, "max_sec": 0.0})
+                current["count"] += stats["count"]
+                current["total_sec"] += stats["total_sec"]
+                current["max_sec"] = max(current["max_sec"], stats["max_sec"])
+
+    def summary(self):
+        with self._lock:
+            return {
+                stage: {"count": stats["count"], "total_sec": round(stats["total_sec"], 6), "max_sec": round(stats["max_sec"], 6)}
+                for stage, stats in self.stages.items()
+            }
+
+    def export_jsonl(self, path):
+        """
+        Appends one JSON line per stage for this run.
+        """
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        recorded_at = time.time()
+        with open(path, "a") as f:
+            for stage, stats in self.summary().items():
+                f.write(json.dumps({"run": self.run_name, "stage": stage, "recorded_at": recorded_at, **stats}) + "\n")
+
+    def export_prometheus(self, path, runs=None, model_loads=None):
+        """
+        Writes the aggregated stages in Prometheus textfile-collector format.
+        The file is replaced atomically so a scraper never reads a partial file.
+        `model_loads` is an optional ModelRegistry.stats() dict.
+        """
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        lines = [
+            "# HELP hercules_stage_duration_seconds Time spent per pipeline stage.",
+            "# TYPE hercules_stage_duration_seconds summary"
+        ]
+        for stage, stats in sorted(self.summary().items()):
+            lines.append(f'hercules_stage_duration_seconds_sum{{stage="{stage}"}} {stats["total_sec"]}')
+            lines.append(f'hercules_stage_duration_seconds_count{{stage="{stage}"}} {stats["count"]}')
+        lines.append("# HELP hercules_stage_duration_seconds_max Longest single span per stage.")
+        lines.append("# TYPE hercules_stage_duration_seconds_max gauge")
+        for stage, stats in sorted(self.summary().items()):
+            lines.append(f'hercules_stage_duration_seconds_max{{stage="{stage}"}} {stats["max_sec"]}')
+        if runs is not None:
+            lines.append("# HELP hercules_runs_total Runs traced by this process.")
+            lines.append("# TYPE hercules_runs_total counter")
+            lines.append(f"hercules_runs_total {runs}")
+        if model_loads:
+            lines.append("# HELP hercules_model_loads_total Models loaded by this process.")
+            lines.append("# TYPE hercules_model_loads_total counter")
+            for model, stats in sorted(model_loads.items()):
+                lines.append(f'hercules_model_loads_total{{model="{model}"}} {stats["loads"]}')
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, path)
+
+class NullTracer:
+    """
+    Drop-in Tracer that records nothing; used when no tracer is supplied.
+    """
+    run_name = None
+
+    @contextmanager
+    def span(self, stage):
+        yield
+
+    def add(self, stage, duration_sec, count=1):
+        pass
+
+    def merge(self, summary):
+        pass
+
+    def summary(self):
+        return {}
+
+NULL_TRACER = NullTracer()
@@ -1,16 +1,246 @@
-import cv2
-from ultralytics import YOLO
 import os
+import cv2
+import math
+import time
+import queue
+import threading
+import multiprocessing.util
+from concurrent.futures import ProcessPoolExecutor
+from src.detection_timeline import DetectionTimeline
+from src.motion_gate import MotionGate
+from src.tracing import Tracer, NULL_TRACER
+from src.detectors import detector_spec, spec_settings, create_detector, as_backend, backend_spec
+from src.roi import RoiDetector, with_roi, roi_cache_settings, load_seeds
+
+# Abstract action_id => detectable UI label in the YOLO model.
+ACTION_LABEL_MAP = {
+    "click_login": "login_button",
+    "enter_password": "password_field",
+    "submit_form": "submit_button"
+}
+
+_END_OF_STREAM = object()
+
+# (key, ProcessPoolExecutor) shared by shard analyses of every video, see _shard_pool
+_SHARD_POOL = None
+_SHARD_POOL_LOCK = threading.Lock()
+# multiprocessing.util.Finalize shutting the pool down at exit, registered once per process
+_SHARD_POOL_FINALIZER = None
+
+# In shard worker processes: the detector loaded by _init_shard_worker (or why it failed), and its load timings
+_WORKER_DETECTOR = None
+_WORKER_LOAD_TIMINGS = None
+
+def map_action_to_label(action_id):
+    """
+    Maps abstract action_id to detectable UI label in the YOLO model, or None.
+    """
+    return ACTION_LABEL_MAP.get(action_id.lower())
+
+def _init_shard_worker(spec):
+    """
+    Shard pool initializer: loads the detector once per worker process; it then
+    serves every shard the worker analyzes, for every video.
+    """
+    global _WORKER_DETECTOR, _WORKER_LOAD_TIMINGS
+    tracer = Tracer()
+    try:
+        _WORKER_DETECTOR = create_detector(spec, tracer)
+    except Exception as e:
+        # Raised by the shards, instead of breaking the pool
+        _WORKER_DETECTOR = e
+    _WORKER_LOAD_TIMINGS = tracer.summary()
+
+def _shard_pool(workers, spec):
+    """
+    The process pool shards run on, kept across videos so workers and their
+    detector are reused; a different size or detector replaces it. Callers hold
+    _SHARD_POOL_LOCK while submitting.
+    """
+    global _SHARD_POOL, _SHARD_POOL_FINALIZER
+    # A forked child (e.g. a run_batch.py worker) inherits a copy of its parent's pool it cannot use
+    key = (os.getpid(), workers, tuple(sorted(spec.items())))
+    if _SHARD_POOL is None or _SHARD_POOL[0] != key:
+        if _SHARD_POOL is not None and _SHARD_POOL[0][0] == key[0]:
+            # Already submitted shards still complete
+            _SHARD_POOL[1].shutdown(wait=False)
+        _SHARD_POOL = (key, ProcessPoolExecutor(max_workers=workers, initializer=_init_shard_worker, initargs=(spec,)))
+    if _SHARD_POOL_FINALIZER is None or not _SHARD_POOL_FINALIZER.still_active():
+        # Also when this process is itself a pool worker, which waits for its children at exit; ahead of
+        # the pool queues' own finalizers (priority 10), which stop their feeder threads. It holds no
+        # reference to the pool: forked children drop inherited finalizers, which must not collect it.
+        _SHARD_POOL_FINALIZER = multiprocessing.util.Finalize(None, shutdown_shard_pool, exitpriority=100)
+    return _SHARD_POOL[1]
+
+def shutdown_shard_pool():
+    """
+    Stops the shared shard workers (also done when the process exits).
+    """
+    global _SHARD_POOL
+    with _SHARD_POOL_LOCK:
+        if _SHARD_POOL is not None and _SHARD_POOL[0][0] == os.getpid():
+            _SHARD_POOL[1].shutdown(wait=True, cancel_futures=True)
+        _SHARD_POOL = None
+
+def _analyze_shard(video_path, model_path, options, start_frame, end_frame):
+    """
+    Process-pool entry point: runs detection on frames [start_frame, end_frame)
+    of one video with the worker's detector (see _init_shard_worker).
+    Returns the per-frame detections, the motion gate counters and the stage timings.
+    """
+    global _WORKER_LOAD_TIMINGS
+    if isinstance(_WORKER_DETECTOR, Exception):
+        # Retried, e.g. once the weights exist
+        _init_shard_worker(backend_spec(options["detector"]))
+        if isinstance(_WORKER_DETECTOR, Exception):
+            raise _WORKER_DETECTOR
+    tracer = Tracer()
+    if _WORKER_LOAD_TIMINGS:
+        # The load is reported once, with the worker's first shard
+        tracer.merge(_WORKER_LOAD_TIMINGS)
+        _WORKER_LOAD_TIMINGS = None
+    analyzer = VideoAnalyzer(video_path, model_path, model=_WORKER_DETECTOR, tracer=tracer, **options)
+    frames = list(analyzer._infer_frames(start_frame, end_frame))
+    analyzer._finish_roi()
+    gate_stats = analyzer.motion_gate.stats() if analyzer.motion_gate else None
+    analyzer.cap.release()
+    return frames, gate_stats, tracer.summary()
 
 class VideoAnalyzer:
-    def __init__(self, video_path, model_path="models/yolov8s.pt"):
+    def __init__(self, video_path, model_path="models/yolov8s.pt", cache=None, motion_threshold=None,
+                 batch_size=1, pipelined=False, queue_size=32, model=None, shards=1, tracer=None, detector=None, labels=None):
         self.video_path = video_path
-        self.cap = cv2.VideoCapture(video_path)
-        
-        if not os.path.exists(model_path):
-            raise FileNotFoundError(f"YOLOv8 model not found at {model_path}")
+        self.model_path = model_path
+        # Backend to build when no model is injected (see detectors.detector_spec)
+        self.detector = detector or detector_spec("ultralytics", model_path)
+        self.cache = cache
+        self.motion_gate = MotionGate(motion_threshold) if motion_threshold else None
+        self.batch_size = max(1, batch_size)
+        self.pipelined = pipelined
+        self.queue_size = queue_size
+        self.shards = max(1, shards)
+        self.tracer = tracer or NULL_TRACER
+        self._cap = None
+        # Labels of interest: ROI tiling learns and searches regions for these
+        self.labels = {label.lower() for label in (labels or ACTION_LABEL_MAP.values())}
+
+        # An injected model (a DetectorBackend, or any callable with the YOLO result
+        # API) is used as is; otherwise the backend is created through the model
+        # registry on the first inference, so detection cache hits never load it.
+        # Either way it is wrapped per analyzer when the spec enables ROI tiling.
+        backend = as_backend(model) if model is not None else None
+        # Shard workers rebuild the detector from the spec, which an injected model (e.g. a stub) may not match
+        self._shardable = backend is None or backend.spec == backend_spec(self.detector)
+        self._model = self._with_roi(backend) if backend is not None else None
+        self.timeline = None
+
+    @property
+    def cap(self):
+        # Opened on first use, so stream analysis never opens video_path itself
+        if self._cap is None:
+            self._cap = cv2.VideoCapture(self.video_path)
+        return self._cap
+
+    @property
+    def model(self):
+        if self._model is None:
+            self._model = self._with_roi(create_detector(self.detector, self.tracer))
+        return self._model
+
+    def _with_roi(self, backend):
+        return with_roi(backend, self.detector.get("roi"), self.labels)
+
+    def _set_labels(self, labels):
+        self.labels = {label.lower() for label in labels}
+        if isinstance(self._model, RoiDetector):
+            self._model.labels = set(self.labels)
+
+    def _finish_roi(self):
+        # Only if inference ran; never loads the model
+        if isinstance(self._model, RoiDetector):
+            self._model.finish()
+
+    @property
+    def inference_settings(self):
+        """
+        Everything besides the video and the weights that changes detection output.
+        Part of the detection cache key.
+        """
+        if self._model is not None:
+            backend = self._model.settings()
+        else:
+            backend = spec_settings(self.detector)
+            roi = self.detector.get("roi")
+            if roi and roi["mode"] != "off":
+                backend["roi"] = roi_cache_settings(roi, self.labels, load_seeds(roi))
+        return {
+            **backend,
+            "motion_threshold": self.motion_gate.threshold if self.motion_gate else None
+        }
+
+    @property
+    def weights_path(self):
+        """
+        File whose content identifies the detector weights in the detection cache key.
+        """
+        return self.detector["weights_path"] or self.model_path
+
+    def build_timeline(self, labels=None):
+        """
+        Decodes the video once and runs detection once per frame for every label
+        of interest (defaults to all labels in the action map). Subsequent
+        analyze_for_action calls are answered from the resulting index.
+        """
+        wanted = {label.lower() for label in (labels or self.labels)}
+        self._set_labels(wanted)
+        print(f"[INFO] Building detection timeline for {len(wanted)} labels in video {self.video_path}")
+
+        timeline = DetectionTimeline(
+            self.video_path,
+            self.cap.get(cv2.CAP_PROP_FPS),
+            int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        )
+
+        for _, timestamp, detections in self._iter_detections():
+            timeline.add_frame(timestamp, [(label, conf) for label, conf in detections if label in wanted])
 
-        self.model = YOLO(model_path)
+        self.timeline = timeline
+        return timeline
+
+    def _iter_detections(self):
+        """
+        Yields (frame_idx, timestamp_sec, detections) for every frame, served from the
+        detection cache when available and stored to it after a complete pass.
+        """
+        key = None
+        if self.cache is not None:
+            with self.tracer.span("detection_cache_lookup"):
+                key, video_hash, model_hash = self.cache.make_key(self.video_path, self.weights_path, self.inference_settings)
+                cached = self.cache.get(key)
+            if cached is not None:
+                print(f"[INFO] Detection cache hit for {self.video_path} ({len(cached)} frames)")
+                yield from cached
+                return
+
+        if self.motion_gate is not None:
+            self.motion_gate.reset()
+
+        recorded = []
+        if self.shards > 1 and not self._shardable:
+            print(f"[WARN] The injected detector cannot be rebuilt in shard workers; analyzing {self.video_path} in process")
+        frames = self._infer_sharded() if self.shards > 1 and self._shardable else self._infer_frames()
+        for frame_idx, timestamp, detections in frames:
+            recorded.append((frame_idx, timestamp, detections))
+            yield frame_idx, timestamp, detections
+
+        if self.motion_gate is not None:
+            stats = self.motion_gate.stats()
+            print(f"[INFO] Motion gate skipped {stats['frames_skipped']}/{stats['frames_seen']} frames (threshold {stats['threshold']})")
+        self._finish_roi()
+
+        if key is not None:
+            with self.tracer.span("detection_cache_store"):
+                self.cache.put(key, video_hash, self.weights_path, model_hash, self.inference_settings, recorded)
 
     def analyze_for_action(self, action_id):
         """
@@ -23,32 +253,288 @@ class VideoAnalyzer:
             print(f"[WARN] No label mapping found for action: {action_id}")
             return False, None
 
+        if self.timeline is not None:
+            event = self.timeline.first(label_to_detect)
+            if event is None:
+                return False, None
+            return True, event[0]
+
+        for _, timestamp, detections in self._iter_detections():
+            for cls_name, _ in detections:
+                if cls_name == label_to_detect.lower():
+                    return True, round(timestamp, 2)
+
+        return False, None
+
+    def locate_action(self, action_id, start_sec=None, end_sec=None, coarse_stride_sec=1.0):
+        """
+        Finds the first occurrence of an action without a full linear scan.
+        Frames are sampled every coarse_stride_sec inside the optional [start_sec, end_sec]
+        window; after the first coarse hit the gap since the previous sample is decoded
+        frame by frame to refine the timestamp to frame accuracy. When no sample hits,
+        the window is scanned frame by frame, so labels visible for less than the
+        stride are still found; an earlier such occurrence is only missed when a
+        later sample hits.
+        """
+        print(f"[INFO] Locating action: {action_id} in video {self.video_path} (window {start_sec}-{end_sec}s)")
+
+        label_to_detect = self._map_action_to_label(action_id)
+        if not label_to_detect:
+            print(f"[WARN] No label mapping found for action: {action_id}")
+            return False, None
+        return self.locate_label(label_to_detect, start_sec, end_sec, coarse_stride_sec)
+
+    def locate_label(self, label_to_detect, start_sec=None, end_sec=None, coarse_stride_sec=1.0):
+        """
+        locate_action for an already resolved detector label (see label_matcher).
+        """
+        if self.timeline is not None:
+            event = self.timeline.first_between(label_to_detect, start_sec, end_sec)
+            return (True, event[0]) if event else (False, None)
+
+        fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
         frame_count = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        start_frame = max(0, math.ceil(start_sec * fps - 1e-6)) if start_sec is not None else 0
+        end_frame = min(frame_count, math.floor(end_sec * fps + 1e-6) + 1) if end_sec is not None else frame_count
+        stride = max(1, int(round(coarse_stride_sec * fps)))
+
+        previous_sample = start_frame - 1
+        for frame_idx in range(start_frame, end_frame, stride):
+            hit = self._scan_range(label_to_detect, frame_idx, frame_idx + 1)
+            if hit is None:
+                previous_sample = frame_idx
+                continue
+
+            refined = self._scan_range(label_to_detect, previous_sample + 1, frame_idx)
+            return True, round(refined if refined is not None else hit, 2)
+
+        # Tail frames after the last coarse sample
+        tail = self._scan_range(label_to_detect, previous_sample + 1, end_frame)
+        if tail is not None:
+            return True, round(tail, 2)
+
+        if stride > 1:
+            # The label may only have been visible between samples: a miss is confirmed frame by frame
+            dense = self._scan_range(label_to_detect, start_frame, end_frame)
+            if dense is not None:
+                return True, round(dense, 2)
+
+        return False, None
 
-        for _ in range(frame_count):
+    def _scan_range(self, label, start_frame, end_frame):
+        """
+        Decodes frames [start_frame, end_frame) and returns the timestamp of the first
+        one containing label, or None. Seeks only when the target is not reachable by
+        decoding forward a few frames.
+        """
+        if start_frame >= end_frame:
+            return None
+
+        position = int(self.cap.get(cv2.CAP_PROP_POS_FRAMES))
+        if start_frame < position or start_frame - position > self.queue_size:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+        else:
+            for _ in range(start_frame - position):
+                self.cap.grab()
+
+        batch = []
+        for _ in range(start_frame, end_frame):
+            decode_start = time.perf_counter()
             ret, frame = self.cap.read()
+            self.tracer.add("frame_decode", time.perf_counter() - decode_start)
             if not ret:
                 break
+            batch.append((self.cap.get(cv2.CAP_PROP_POS_MSEC) / 1000, frame))
 
-            detections = self.model(frame)
+            if len(batch) >= self.batch_size:
+                hit = self._first_hit(label, batch)
+                if hit is not None:
+                    return hit
+                batch = []
 
-            for det in detections:
-                for box in det.boxes:
-                    cls_name = det.names[int(box.cls)]
-                    if cls_name.lower() == label_to_detect.lower():
-                        timestamp = self.cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
-                        return True, round(timestamp, 2)
+        return self._first_hit(label, batch) if batch else None
 
-        return False, None
+    def _first_hit(self, label, batch):
+        results = self._detect_batch([frame for _, frame in batch])
+        for (timestamp, _), detections in zip(batch, results):
+            if any(cls_name == label for cls_name, _ in detections):
+                return timestamp
+        return None
+
+    def _infer_sharded(self):
+        """
+        Splits the video into `shards` contiguous frame ranges, analyzes them in
+        parallel processes (each seeking to its own start) and yields the merged
+        detections in frame order, so first occurrences across shard boundaries are
+        exact. Shard workers build the same detector backend once and are reused
+        across videos (see _shard_pool). With motion gating enabled, the first
+        frame of every shard is always inferred.
+        """
+        frame_count = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        bounds = [frame_count * i // self.shards for i in range(self.shards + 1)]
+        options = {
+            "motion_threshold": self.motion_gate.threshold if self.motion_gate else None,
+            "batch_size": self.batch_size,
+            "pipelined": self.pipelined,
+            "queue_size": self.queue_size,
+            "detector": self.detector,
+            "labels": sorted(self.labels)
+        }
+        print(f"[INFO] Analyzing {frame_count} frames of {self.video_path} in {self.shards} shards")
+
+        with _SHARD_POOL_LOCK:
+            pool = _shard_pool(self.shards, backend_spec(self.detector))
+            futures = [
+                pool.submit(_analyze_shard, self.video_path, self.model_path, options, start, end)
+                for start, end in zip(bounds, bounds[1:]) if end > start
+            ]
+        try:
+            for future in futures:
+                frames, gate_stats, timings = future.result()
+                self.tracer.merge(timings)
+                if gate_stats and self.motion_gate is not None:
+                    self.motion_gate.frames_seen += gate_stats["frames_seen"]
+                    self.motion_gate.frames_skipped += gate_stats["frames_skipped"]
+                yield from frames
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def _infer_frames(self, start_frame=0, end_frame=None):
+        """
+        Runs inference over the decoded frames in batches of batch_size and yields
+        (frame_idx, timestamp_sec, detections) in frame order. Frames rejected by the
+        motion gate reuse the detections of the last inferred frame before them.
+        """
+        if self.pipelined:
+            frames = self._iter_frames_threaded(start_frame, end_frame)
+        else:
+            frames = self._iter_frames(start_frame, end_frame)
+        return self._infer_iter(frames, start_frame)
+
+    def _infer_iter(self, frames, start_frame=0):
+        """
+        Batched, motion-gated inference over any iterable of (timestamp_sec, frame).
+        """
+        pending = []
+        batch = []
+        last = []
+
+        for frame_idx, (timestamp, frame) in enumerate(frames, start_frame):
+            if self.motion_gate is None or self.motion_gate.is_changed(frame):
+                pending.append((frame_idx, timestamp, len(batch)))
+                batch.append(frame)
+            elif not batch:
+                yield frame_idx, timestamp, last
+                continue
+            else:
+                pending.append((frame_idx, timestamp, None))
+
+            if len(batch) >= self.batch_size:
+                last = yield from self._flush_batch(pending, batch, last)
+                pending, batch = [], []
+
+        if pending:
+            yield from self._flush_batch(pending, batch, last)
+
+    def analyze_stream(self, frames, timeline, labels=None):
+        """
+        Runs detection over a live frame source, an iterable of (timestamp_sec, frame)
+        such as frame_stream.follow_video_file, and feeds a timeline as frames arrive.
+        Yields (timestamp_sec, started) per frame, where started is what
+        timeline.add_frame returned. Nothing is kept per frame and the detection cache
+        is bypassed, so memory stays flat however long the stream runs. Use a small
+        batch_size to keep the verdict delay short.
+        """
+        wanted = {label.lower() for label in (labels or self.labels)}
+        self._set_labels(wanted)
+        if self.motion_gate is not None:
+            self.motion_gate.reset()
+
+        for _, timestamp, detections in self._infer_iter(frames):
+            started = timeline.add_frame(timestamp, [(label, conf) for label, conf in detections if label in wanted])
+            yield timestamp, started
+        self._finish_roi()
+
+    def _flush_batch(self, pending, batch, last):
+        results = self._detect_batch(batch) if batch else []
+        for frame_idx, timestamp, slot in pending:
+            if slot is not None:
+                last = results[slot]
+            yield frame_idx, timestamp, last
+        return last
+
+    def _iter_frames_threaded(self, start_frame=0, end_frame=None):
+        """
+        Same frames as _iter_frames, decoded ahead by a background thread into a
+        bounded queue so decoding overlaps with inference.
+        """
+        frames = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+
+        def put(item):
+            while not stop.is_set():
+                try:
+                    frames.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def produce():
+            end = _END_OF_STREAM
+            try:
+                for item in self._iter_frames(start_frame, end_frame):
+                    if not put(item):
+                        return
+            except Exception as e:
+                end = e
+            put(end)
+
+        producer = threading.Thread(target=produce, name="frame-decoder", daemon=True)
+        producer.start()
+        try:
+            while True:
+                item = frames.get()
+                if item is _END_OF_STREAM:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+            producer.join()
+
+    def _iter_frames(self, start_frame=0, end_frame=None):
+        """
+        Yields (timestamp_sec, frame) for frames [start_frame, end_frame), by default
+        the whole video.
+        """
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+        if end_frame is None:
+            end_frame = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+        for _ in range(start_frame, end_frame):
+            decode_start = time.perf_counter()
+            ret, frame = self.cap.read()
+            self.tracer.add("frame_decode", time.perf_counter() - decode_start)
+            if not ret:
+                break
+            yield self.cap.get(cv2.CAP_PROP_POS_MSEC) / 1000, frame
+
+    def _detect_batch(self, frames):
+        """
+        Runs the detector backend on a list of frames and returns one list of
+        (label, confidence) per frame.
+        """
+        inference_start = time.perf_counter()
+        batch_detections = self.model.detect_batch(frames)
+        self.tracer.add("detector_inference", time.perf_counter() - inference_start, count=len(frames))
+        return batch_detections
 
     def _map_action_to_label(self, action_id):
         """
         Maps abstract action_id to detectable UI label in the YOLO model.
         Example: "click_login" => "login_button"
         """
-        mappings = {
-            "click_login": "login_button",
-            "enter_password": "password_field",
-            "submit_form": "submit_button"
-        }
-        return mappings.get(action_id.lower())
+        return map_action_to_label(action_id)
@@ -0,0 +1,10 @@
+import pytest
+from benchmarks.synthetic_video import generate_screen_recording
+
+@pytest.fixture(scope="session")
+def synthetic_video(tmp_path_factory):
+    """
+    A 4 s, 10 fps synthetic recording (path, frame count) with the default element schedule.
+    """
+    path = str(tmp_path_factory.mktemp("video") / "synthetic.mp4")
+    return path, generate_screen_recording(path, duration_sec=4.0, fps=10, resolution=(320, 180))
@@ -0,0 +1,48 @@
+import pytest
+import src.video_analyzer as video_analyzer
+from benchmarks.stub_detector import StubDetector
+from src.run_processor import RunProcessor
+from src.detectors import as_backend
+from tools.ai_tools import ToolContext
+
+@pytest.fixture
+def builds(monkeypatch):
+    """
+    Label sets of every timeline built, with the stub standing in for the detector.
+    """
+    built = []
+    build_timeline = video_analyzer.VideoAnalyzer.build_timeline
+
+    def counting_build_timeline(analyzer, labels=None):
+        built.append(set(labels or analyzer.labels))
+        return build_timeline(analyzer, labels)
+    monkeypatch.setattr(video_analyzer, "create_detector", lambda spec, tracer=None: as_backend(StubDetector()))
+    monkeypatch.setattr(video_analyzer.VideoAnalyzer, "build_timeline", counting_build_timeline)
+    return built
+
+def test_tool_results_are_memoized(synthetic_video, builds):
+    path, _ = synthetic_video
+    context = ToolContext(RunProcessor("models/yolov8s.pt"))
+    context.begin_run("run1", steps=[{"label": "login_button"}, {"label": "password_field"}])
+
+    first = context.call("analyze_video_for_action", {"video_path": path, "action_id": "click_login"})
+    again = context.call("analyze_video_for_action", f"video_path={path}; action_id=CLICK_LOGIN")
+    assert first == again and first["found"] and first["label"] == "login_button"
+    assert context.stats() == {"analyze_video_for_action": {"calls": 2, "cache_hits": 1}}
+    assert builds == [{"login_button", "password_field"}]
+
+def test_timeline_is_rebuilt_only_for_labels_outside_it(synthetic_video, builds):
+    path, _ = synthetic_video
+    processor = RunProcessor("models/yolov8s.pt")
+    context = ToolContext(processor)
+    steps = [{"label": "login_button"}, {"label": "password_field"}]
+    context.begin_run("run1", steps=steps)
+
+    context.analyze_video_for_action(path, "enter_password")
+    # The run's own step analysis shares the timeline the tool built
+    with processor.video_lock:
+        processor.video_timeline(path, {"login_button"})
+    assert builds == [{"login_button", "password_field"}]
+
+    assert context.analyze_video_for_action(path, "submit_form")["found"]
+    assert builds == [{"login_button", "password_field"}, {"login_button", "password_field", "submit_button"}]
@@ -0,0 +1,127 @@
+import json
+import time
+import threading
+import http.client
+import pytest
+from src.analysis_service import AnalysisService, make_server
+from src.report_generator import ReportGenerator
+
+class StubProcessor:
+    """
+    RunProcessor stand-in: one observed step per job; analyze_steps waits for `release`.
+    """
+    def __init__(self):
+        self.release = threading.Event()
+        self.release.set()
+
+    def plan_steps(self, log_path, tracer):
+        return [{"description": "Click login", "label": "login_button"}]
+
+    def analyze_steps(self, log_path, video_path, tracer, steps):
+        self.release.wait(10)
+        return [{"description": step["description"], "result": "✅ Observed", "notes": "at 1.0s"} for step in steps]
+
+    def validate_output(self, output_path, tracer):
+        return True
+
+@pytest.fixture
+def job_spec(tmp_path):
+    spec = {"run_name": "run1"}
+    for key in ("log_path", "video_path", "output_path"):
+        spec[key] = str(tmp_path / key)
+        open(spec[key], "w").close()
+    return spec
+
+@pytest.fixture
+def serve(tmp_path):
+    """
+    Starts a service on an ephemeral port; returns (service, processor, request).
+    """
+    started = []
+
+    def start(**options):
+        processor = StubProcessor()
+        service = AnalysisService(processor, ReportGenerator(str(tmp_path / "reports")), **options)
+        service.start()
+        server = make_server(service, "127.0.0.1", 0)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        started.append((server, thread, service))
+
+        def request(method, path, payload=None):
+            connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=10)
+            connection.request(method, path, body=None if payload is None else json.dumps(payload))
+            response = connection.getresponse()
+            result = response.status, json.loads(response.read())
+            connection.close()
+            return result
+        return service, processor, request
+
+    yield start
+    for server, thread, service in started:
+        server.shutdown()
+        server.server_close()
+        service.stop()
+        thread.join(5)
+
+def wait_for(request, job_id, *statuses):
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        status, job = request("GET", f"/jobs/{job_id}")
+        if job["status"] in statuses:
+            return status, job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} never reached {statuses}")
+
+def test_submitted_job_completes_with_its_reports(serve, job_spec):
+    _, _, request = serve()
+    status, job = request("POST", "/jobs", job_spec)
+    assert (status, job["status"]) == (202, "queued")
+
+    status, job = wait_for(request, job["job_id"], "done", "failed")
+    assert (status, job["status"], job["steps_passed"], job["steps_failed"]) == (200, "done", 1, 0)
+    assert job["job_id"] in job["reports"]["txt"]
+
+def test_bad_payloads_are_rejected(serve, job_spec):
+    _, _, request = serve()
+    assert request("POST", "/jobs", ["not", "an", "object"])[0] == 400
+    assert request("POST", "/jobs", {**job_spec, "video_path": job_spec["video_path"] + ".missing"})[0] == 400
+    assert request("POST", "/jobs", {"run_name": "run1"})[0] == 400
+    assert request("GET", "/jobs/unknown")[0] == 404
+
+def test_full_queue_answers_429(serve, job_spec):
+    _, processor, request = serve(queue_size=1, workers=1)
+    processor.release.clear()
+    first = request("POST", "/jobs", job_spec)[1]
+    wait_for(request, first["job_id"], "running")
+    second = request("POST", "/jobs", job_spec)[1]
+
+    assert request("POST", "/jobs", job_spec)[0] == 429
+    processor.release.set()
+    for job in (first, second):
+        assert wait_for(request, job["job_id"], "done", "failed")[1]["status"] == "done"
+
+def test_concurrent_jobs_for_one_run_keep_their_own_reports(serve, job_spec):
+    _, _, request = serve(workers=2)
+    jobs = [request("POST", "/jobs", job_spec)[1] for _ in range(2)]
+    reports = [wait_for(request, job["job_id"], "done", "failed")[1]["reports"] for job in jobs]
+
+    assert reports[0]["txt"] != reports[1]["txt"] and reports[0]["html"] != reports[1]["html"]
+    for job, paths in zip(jobs, reports):
+        with open(paths["txt"]) as report:
+            assert "Test Suite: run1" in report.read()
+        assert paths["txt"].endswith(f"_{job['job_id']}.txt")
+
+def test_stop_lets_running_jobs_finish(serve, job_spec):
+    service, processor, request = serve(workers=1)
+    processor.release.clear()
+    job = request("POST", "/jobs", job_spec)[1]
+    wait_for(request, job["job_id"], "running")
+
+    stopper = threading.Thread(target=service.stop)
+    stopper.start()
+    processor.release.set()
+    stopper.join(10)
+    assert not stopper.is_alive()
+    assert service.get(job["job_id"])["status"] == "done"
+    assert not any(thread.is_alive() for thread in service._threads)
@@ -0,0 +1,36 @@
+import numpy as np
+from src.detectors import OnnxBackend
+
+def onnx_backend():
+    # Decoding only; no ONNX Runtime session needed
+    backend = OnnxBackend.__new__(OnnxBackend)
+    backend.imgsz = 640
+    backend.conf_threshold = 0.25
+    backend.iou_threshold = 0.7
+    backend.names = {0: "Login_Button", 1: "password_field"}
+    return backend
+
+def prediction(*anchors):
+    """
+    Raw (4 + classes, anchors) output from (cx, cy, w, h, class_id, confidence) anchors.
+    """
+    output = np.zeros((6, len(anchors)), dtype=np.float32)
+    for idx, (cx, cy, w, h, class_id, confidence) in enumerate(anchors):
+        output[:4, idx] = cx, cy, w, h
+        output[4 + class_id, idx] = confidence
+    return output
+
+def test_boxes_map_back_through_the_letterbox():
+    backend = onnx_backend()
+    # 1280x720 => scale 0.5, 140 px of padding above and below
+    _, placement = backend._letterbox(np.zeros((720, 1280, 3), dtype=np.uint8))
+    [(label, confidence, box)] = backend._decode(prediction((100, 300, 20, 20, 0, 0.9)), placement)
+    assert (label, round(confidence, 2), box) == ("login_button", 0.9, (180.0, 300.0, 220.0, 340.0))
+
+def test_boxes_are_clipped_to_the_frame_and_off_frame_boxes_dropped():
+    backend = onnx_backend()
+    _, placement = backend._letterbox(np.zeros((720, 1280, 3), dtype=np.uint8))
+    output = prediction((100, 100, 20, 20, 0, 0.9), (630, 495, 40, 20, 1, 0.8), (300, 300, 20, 20, 1, 0.1))
+    boxes = {label: box for label, _, box in backend._decode(output, placement)}
+    # The login_button box lies entirely in the top padding
+    assert boxes == {"password_field": (1220.0, 690.0, 1280.0, 720.0)}
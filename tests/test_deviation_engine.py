@@ -0,0 +1,80 @@
+from src.deviation_engine import DeviationEngine, IncrementalAligner
+from src.detection_timeline import DetectionTimeline
+
+def _steps(*labels):
+    return [{"description": f"Step {idx} ({label})", "label": label} for idx, label in enumerate(labels, 1)]
+
+def _timeline(*events):
+    timeline = DetectionTimeline()
+    for timestamp, label in sorted(events):
+        timeline.add_frame(timestamp, [(label, 0.9)])
+    return timeline
+
+def _kinds(results):
+    return [(result["result"] == "✅ Observed", result["deviation_type"]) for result in results]
+
+def test_in_order_plan_is_observed():
+    results = DeviationEngine().align_steps(_steps("a", "b", "c"), _timeline((1, "a"), (5, "b"), (9, "c")))
+    assert _kinds(results) == [(True, None)] * 3
+    assert [result["timestamp"] for result in results] == [1, 5, 9]
+
+def test_missing_label_is_skipped():
+    results = DeviationEngine().align_steps(_steps("a", "b", "c"), _timeline((1, "a"), (9, "c")))
+    assert _kinds(results) == [(True, None), (False, "skipped"), (True, None)]
+
+def test_out_of_order_step_is_reordered():
+    # Either step could be matched; the earlier planned one is
+    results = DeviationEngine().align_steps(_steps("b", "a"), _timeline((1, "a"), (5, "b")))
+    assert _kinds(results) == [(True, None), (False, "reordered")]
+    assert results[1]["notes"] == "Out of planned order: observed at 1s"
+
+def test_ties_keep_the_in_order_assignment():
+    # Matching a@1, a@3 would also match two steps, but leave b in between unmatched
+    results = DeviationEngine().align_steps(_steps("a", "b", "a"), _timeline((1, "a"), (3, "a"), (5, "b")))
+    assert _kinds(results) == [(True, "repeated"), (True, None), (False, "reordered")]
+    assert [result["timestamp"] for result in results] == [1, 5, None]
+
+def test_duplicate_step_with_every_occurrence_assigned_is_skipped():
+    # The second "a" has no occurrence left once the first one is claimed
+    results = DeviationEngine().align_steps(_steps("a", "b", "a", "c"), _timeline((1, "a"), (5, "b"), (9, "c")))
+    assert _kinds(results) == [(True, None), (True, None), (False, "skipped"), (True, None)]
+
+def test_duplicate_step_matches_second_occurrence():
+    results = DeviationEngine().align_steps(_steps("a", "b", "a"), _timeline((1, "a"), (5, "b"), (9, "a")))
+    assert _kinds(results) == [(True, None)] * 3
+    assert results[2]["timestamp"] == 9
+
+def test_extra_occurrence_marks_step_repeated():
+    results = DeviationEngine().align_steps(_steps("a", "b"), _timeline((1, "a"), (5, "b"), (9, "a")))
+    assert _kinds(results) == [(True, "repeated"), (True, None)]
+    assert results[0]["notes"] == "At 1s; repeated at 9s"
+
+def test_unmapped_step_is_skipped_with_candidate():
+    steps = _steps("a", None)
+    steps[1].update(label_candidate="b", label_score=0.1)
+    results = DeviationEngine().align_steps(steps, _timeline((1, "a")))
+    assert _kinds(results) == [(True, None), (False, "skipped")]
+    assert "closest: b" in results[1]["notes"]
+
+def test_incremental_aligner_flags_skips_when_next_step_appears():
+    aligner = IncrementalAligner(_steps("a", "b", "c"))
+    assert [v["deviation_type"] for v in aligner.observe("a", 1)] == [None]
+    verdicts = aligner.observe("c", 9)
+    assert [(v["step_index"], v["deviation_type"]) for v in verdicts] == [(1, "skipped"), (2, None)]
+    assert aligner.finish() == []
+
+def test_incremental_aligner_reorders_only_unclaimed_occurrences():
+    aligner = IncrementalAligner(_steps("a", "b", "a", "c"))
+    aligner.observe("a", 1)
+    aligner.observe("b", 5)
+    verdicts = aligner.observe("c", 9)
+    assert [(v["step_index"], v["deviation_type"]) for v in verdicts] == [(2, "skipped"), (3, None)]
+
+def test_incremental_aligner_settles_steps_passed_over():
+    aligner = IncrementalAligner(_steps("b", "a"))
+    verdicts = aligner.observe("a", 1)
+    assert [(v["step_index"], v["deviation_type"]) for v in verdicts] == [(0, "skipped"), (1, None)]
+    assert verdicts[0]["notes"] == 'Not observed before "Step 2 (a)" at 1s'
+    # An occurrence no remaining step is waiting for settles nothing
+    assert aligner.observe("b", 5) == []
+    assert aligner.finish() == []
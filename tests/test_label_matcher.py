@@ -0,0 +1,49 @@
+import pytest
+from src.label_matcher import LabelMatcher, distinctive_terms
+from config.settings import DETECTOR_LABELS, LABEL_MATCH_THRESHOLD
+
+@pytest.fixture(scope="module")
+def matcher():
+    return LabelMatcher(DETECTOR_LABELS, threshold=LABEL_MATCH_THRESHOLD, descriptions=DETECTOR_LABELS)
+
+@pytest.mark.parametrize("text, label", [
+    ("Click Login", "login_button"),
+    ("click_login", "login_button"),
+    ("Tap the Login button", "login_button"),
+    ("Log in", "login_button"),
+    ("Sign in", "login_button"),
+    ("Enter Password", "password_field"),
+    ("Type the password", "password_field"),
+    ("Enter passwords", "password_field"),
+    ("Submit Form", "submit_button"),
+    ("Press submit", "submit_button"),
+    ("Send the form", "submit_button"),
+])
+def test_phrasings_resolve_to_their_label(matcher, text, label):
+    assert matcher.match([text])[0][0] == label
+
+@pytest.mark.parametrize("text", [
+    "Click the Cancel button",
+    "Click logout button",
+    "Click the button",
+    "Log out",
+    "Sign up",
+    "Enter username",
+    "Enter the username field",
+    "Open settings",
+])
+def test_near_misses_stay_unmapped(matcher, text):
+    label, score, candidate = matcher.match([text])[0]
+    assert label is None
+    assert candidate in DETECTOR_LABELS
+
+def test_shared_and_generic_words_are_not_distinctive():
+    terms = distinctive_terms({"login_button": "login_button click", "submit_button": "submit_button click"})
+    assert terms == {"login_button": {"login"}, "submit_button": {"submit"}}
+
+def test_overrides_take_precedence(matcher):
+    steps = [{"description": "Do the thing", "action_id": "click_login"}]
+    overriding = LabelMatcher(DETECTOR_LABELS, descriptions=DETECTOR_LABELS, overrides={"click_login": "login_button"})
+    assert overriding.resolve_steps(steps) == []
+    assert steps[0]["label"] == "login_button"
+    assert matcher.resolve_steps([{"description": "Do the thing", "action_id": "x"}])[0]["label"] is None
@@ -0,0 +1,49 @@
+from types import SimpleNamespace
+import pytest
+from src.llm_cache import LLMResponseCache
+from src.llm_step_extractor import LLMStepExtractor
+
+class EchoGenerator:
+    """
+    text2text-generation stand-in answering each prompt with its own text as the steps.
+    """
+    def __init__(self, nested=False):
+        self.nested = nested
+        self.batches = []
+
+    def __call__(self, prompts, batch_size=1, **params):
+        self.batches.append(list(prompts))
+        responses = [{"generated_text": f"Thought: plan {len(prompt)}\nSteps: {prompt}"} for prompt in prompts]
+        return [[response] for response in responses] if self.nested else responses
+
+def word_tokenizer(text, return_tensors=None):
+    return SimpleNamespace(input_ids=SimpleNamespace(shape=(1, len(text.split()))))
+
+def extractor(cache=None, nested=False):
+    llm = LLMStepExtractor("test-model", {"max_new_tokens": 10}, cache=cache)
+    llm.generator = EchoGenerator(nested)
+    llm.tokenizer = word_tokenizer
+    return llm
+
+@pytest.mark.parametrize("nested", [False, True])
+def test_batched_responses_map_back_to_their_prompts(nested):
+    llm = extractor(nested=nested)
+    prompts = ["open login", "type password now", "open login", "submit", "check the result page"]
+    results = llm.extract_batch(prompts, batch_size=2)
+
+    assert [result["steps_text"] for result in results] == prompts
+    assert [result["prompt_tokens"] for result in results] == [2, 3, 2, 1, 4]
+    assert [result["thought"] for result in results] == [f"plan {len(prompt)}" for prompt in prompts]
+    # Duplicates are generated once, in batches of at most batch_size
+    assert llm.generator.batches == [["open login", "type password now"], ["submit", "check the result page"]]
+
+def test_cached_prompts_skip_generation(tmp_path):
+    cache = LLMResponseCache(str(tmp_path / "llm.sqlite"))
+    first = extractor(cache).extract_batch(["open login", "submit"], batch_size=4)
+
+    llm = extractor(cache)
+    results = llm.extract_batch(["submit", "type password", "open login"], batch_size=4)
+    assert llm.generator.batches == [["type password"]]
+    assert [result["steps_text"] for result in results] == ["submit", "type password", "open login"]
+    assert [result["cached"] for result in results] == [True, False, True]
+    assert results[0]["response_text"] == first[1]["response_text"]
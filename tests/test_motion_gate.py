@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+from benchmarks.stub_detector import StubDetector
+from src.motion_gate import MotionGate
+from src.video_analyzer import VideoAnalyzer
+
+def frame(value=40, patch=None):
+    image = np.full((90, 160, 3), value, dtype=np.uint8)
+    if patch is not None:
+        image[30:60, 60:100] = patch
+    return image
+
+def test_static_frames_are_unchanged_until_the_threshold_is_exceeded():
+    gate = MotionGate(threshold=8)
+    assert gate.is_changed(frame())
+    assert not gate.is_changed(frame())
+    assert not gate.is_changed(frame(value=46))
+    assert gate.is_changed(frame(patch=(0, 0, 255)))
+    assert gate.stats() == {"threshold": 8, "frames_seen": 4, "frames_skipped": 2, "frames_inferred": 2}
+
+def test_slow_drift_is_measured_against_the_last_inferred_frame():
+    gate = MotionGate(threshold=8)
+    changed = [gate.is_changed(frame(value=40 + 3 * idx)) for idx in range(6)]
+    assert changed == [True, False, False, True, False, False]
+
+@pytest.mark.parametrize("batch_size", [1, 4])
+def test_gated_frames_reuse_the_previous_detections(synthetic_video, batch_size):
+    path, frame_count = synthetic_video
+    ungated = list(VideoAnalyzer(path, model=StubDetector(), batch_size=batch_size)._infer_frames())
+
+    detector = StubDetector()
+    analyzer = VideoAnalyzer(path, model=detector, batch_size=batch_size, motion_threshold=8)
+    gated = list(analyzer._infer_frames())
+    stats = analyzer.motion_gate.stats()
+
+    # Only frames where an element appeared or disappeared reach the detector
+    assert 0 < stats["frames_inferred"] < frame_count // 2
+    assert detector.frames == stats["frames_inferred"] and stats["frames_seen"] == frame_count
+    assert gated == ungated
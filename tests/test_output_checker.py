@@ -0,0 +1,110 @@
+import io
+import json
+import tracemalloc
+import pytest
+from src.json_stream import JsonStream
+from src.output_checker import FinalOutputChecker, MarkerMatcher, DEFAULT_PASS_MARKERS, DEFAULT_FAIL_MARKERS
+
+@pytest.fixture(scope="module")
+def matcher():
+    return MarkerMatcher(DEFAULT_PASS_MARKERS, DEFAULT_FAIL_MARKERS)
+
+def test_json_stream_decodes_across_tiny_chunks():
+    document = {"count": 1234567, "steps": [{"a": "x, y]"}, [1, 2.5e3], "}"], "done": True}
+    reader = JsonStream(io.StringIO(json.dumps(document)), chunk_chars=3)
+    seen = {}
+    for key in reader.iter_object_keys():
+        seen[key] = list(reader.iter_array()) if reader.peek() == "[" else reader.read_value()
+    assert seen == document
+
+def test_json_stream_skips_values_and_rejects_garbage():
+    reader = JsonStream(io.StringIO('{"skip": {"deep": [1, 2]}, "keep": 7}'), chunk_chars=4)
+    values = {}
+    for key in reader.iter_object_keys():
+        if key == "skip":
+            reader.skip_value()
+        else:
+            values[key] = reader.read_value()
+    assert values == {"keep": 7}
+    with pytest.raises(ValueError):
+        list(JsonStream(io.StringIO("[1 2]")).iter_array())
+
+def test_json_stream_reads_strings_in_pieces():
+    text = 'quote " backslash \\ snowman \u2603 ' * 50
+    reader = JsonStream(io.StringIO(json.dumps({"log": text})), chunk_chars=5)
+    for _ in reader.iter_object_keys():
+        pieces = list(reader.iter_string())
+    assert len(pieces) > 1 and "".join(pieces) == text
+
+@pytest.mark.parametrize("text", ["run unsuccessful", "test failed then passed", "passwords only", "tests passed"])
+def test_classify_pieces_matches_whole_text(matcher, text):
+    for size in (1, 2, 5):
+        pieces = [text[idx:idx + size] for idx in range(0, len(text), size)]
+        assert matcher.classify_pieces(pieces) == matcher.classify(text)
+
+def test_large_single_field_json_is_checked_in_bounded_memory(tmp_path):
+    document = tmp_path / "out.json"
+    with open(document, "w") as f:
+        json.dump({"log": "x" * (16 * 1024 * 1024), "results": [{"log": "y" * 1024 * 1024, "ok": True}],
+                   "status": "x" * (4 * 1024 * 1024) + " all tests passed"}, f)
+    tracemalloc.start()
+    try:
+        verdict = FinalOutputChecker(str(document)).validate_output()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert verdict is True
+    assert peak < 2 * 1024 * 1024
+
+def test_last_marker_decides(matcher):
+    found = matcher.last_match(b"step failed, retrying ... Test Successful\n")
+    assert found[1].lower() == "test successful"
+    assert matcher.kind(found[1]) is True
+
+def test_markers_are_whole_words(matcher):
+    assert matcher.kind(matcher.last_match(b"run was UNSUCCESSFUL")[1]) is False
+    assert matcher.last_match(b"passwords bypassed failsafe") is None
+
+@pytest.mark.parametrize("window", [4, 7, 8, 9, 16, 1024])
+def test_last_marker_wins_at_window_boundaries(matcher, window):
+    text = b"test failed ... then test passed" + b" " * 5
+    offset, marker = matcher.last_match(text, window)
+    assert marker == "passed" and offset == text.index(b"passed")
+
+@pytest.mark.parametrize("window", [3, 5, 6, 11])
+def test_marker_across_boundary_keeps_its_kind(matcher, window):
+    # A multi-word marker split by a window may be reported by its last word, never by the wrong kind
+    offset, marker = matcher.last_match(b"all good\ntest\nfailed", window)
+    assert matcher.kind(marker) is False
+
+@pytest.mark.parametrize("text, verdict", [
+    ("Ran 10 tests: 10 passed, 0 failed", True),
+    ("Ran 10 tests: 0 passed, 10 failed", False),
+    ("3 passed, no failure", True),
+    ("Test run unsuccessful", False),
+    ("unsuccessful", False),
+    ("10 failed", False)
+])
+def test_summaries(tmp_path, matcher, text, verdict):
+    output = tmp_path / "out.txt"
+    output.write_text(text + "\n")
+    assert FinalOutputChecker(str(output)).validate_output() is verdict
+    assert matcher.classify(text) is verdict
+    assert matcher.classify_pieces(text[idx:idx + 3] for idx in range(0, len(text), 3)) is verdict
+
+def test_checker_text_json_and_jsonl(tmp_path):
+    text = tmp_path / "out.txt"
+    text.write_text("FAILED once\nAll tests passed\n")
+    assert FinalOutputChecker(str(text)).validate_output() is True
+
+    document = tmp_path / "out.json"
+    document.write_text("﻿" + json.dumps({"tests": [{"status": "passed"}], "status": "failure"}), encoding="utf-8")
+    checker = FinalOutputChecker(str(document))
+    assert checker.validate_output() is False
+    assert checker.evidence == {"mode": "json", "top_level": False}
+
+    lines = tmp_path / "out.jsonl"
+    lines.write_text("\n".join(json.dumps({"name": name, "ok": ok}) for name, ok in (("a", True), ("b", True))) + "\n")
+    checker = FinalOutputChecker(str(lines))
+    assert checker.validate_output() is True
+    assert checker.evidence["records_passed"] == 2
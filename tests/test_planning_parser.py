@@ -0,0 +1,87 @@
+import os
+import json
+import tracemalloc
+from src.planning_parser import PlanningLogParser, parse_timestamp, split_action, steps_to_text, prompt_log_text
+from src.plan_cache import PlanCache
+
+def _parse(tmp_path, name, content, newline=None):
+    path = tmp_path / name
+    with open(path, "w", encoding="utf-8", newline=newline) as f:
+        f.write(content)
+    return PlanningLogParser(str(path)).parse_steps()
+
+def test_text_log_with_bom(tmp_path):
+    steps = _parse(tmp_path, "run.txt", '﻿Click "Login"\nEnter Password\n')
+    assert steps[0]["description"] == 'Click "Login"'
+    assert steps[0]["action"] == "click"
+    assert steps[0]["action_id"] == "click_login"
+    assert [step["step_number"] for step in steps] == [1, 2]
+
+def test_text_log_with_crlf(tmp_path):
+    steps = _parse(tmp_path, "run.txt", "Step 1: Click Login\nStep 2: Enter Password\n\n", newline="\r\n")
+    assert [step["description"] for step in steps] == ["Click Login", "Enter Password"]
+    assert steps[1]["action_id"] == "enter_password"
+
+def test_shipped_sample_log_maps_first_step():
+    steps = PlanningLogParser(os.path.join(os.path.dirname(__file__), "..", "data", "planning_logs", "run1.txt")).parse_steps()
+    assert steps[0]["action_id"] == "click_login"
+
+def test_text_log_skips_narration_and_reads_prefixes(tmp_path):
+    steps = _parse(tmp_path, "run.txt", "Thought: I should log in\n[00:05] 3. Submit Form\n- click(login_button)\n")
+    assert [(step["step_number"], step["description"]) for step in steps] == [(3, "Submit Form"), (4, "click(login_button)")]
+    assert steps[0]["timestamp"] == 5.0
+    assert (steps[1]["action"], steps[1]["target"]) == ("click", "login_button")
+
+def test_json_log_with_bom(tmp_path):
+    document = {"meta": {"agent": "x"}, "steps": [{"action": "click", "target": "Login"}, {"type": "thought", "text": "hm"},
+                                                   {"description": "Enter Password", "timestamp": "1.5s"}]}
+    steps = _parse(tmp_path, "run.json", "﻿" + json.dumps(document))
+    assert [step["description"] for step in steps] == ["click Login", "Enter Password"]
+    assert steps[1]["timestamp"] == 1.5
+
+def test_json_log_skips_large_sibling_fields_in_bounded_memory(tmp_path):
+    path = tmp_path / "run.json"
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"messages": [{"role": "assistant", "text": "x" * 1024}] * 8192,
+                   "steps": [{"description": "Click Login"}], "trace": "y" * (8 * 1024 * 1024)}, f)
+    tracemalloc.start()
+    try:
+        steps = PlanningLogParser(str(path)).parse_steps()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert [step["description"] for step in steps] == ["Click Login"]
+    assert peak < 2 * 1024 * 1024
+
+def test_jsonl_log_with_bom_and_crlf(tmp_path):
+    lines = [json.dumps({"step": 1, "description": "Click Login"}), "not json", json.dumps({"type": "observation", "text": "ok"}),
+             json.dumps({"step": 2, "action": {"name": "submit", "target": "form"}})]
+    steps = _parse(tmp_path, "run.jsonl", "﻿" + "\n".join(lines) + "\n", newline="\r\n")
+    assert [(step["step_number"], step["description"]) for step in steps] == [(1, "Click Login"), (2, "submit form")]
+
+def test_plan_cache_serves_unchanged_log(tmp_path):
+    path = tmp_path / "run.txt"
+    path.write_text("Click Login\n", encoding="utf-8")
+    cache = PlanCache(str(tmp_path / "plans.sqlite"))
+    first = PlanningLogParser(str(path), cache).parse_steps()
+    assert PlanningLogParser(str(path), cache).parse_steps() == first
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_helpers():
+    assert parse_timestamp("1:02:03.5") == 3723.5
+    assert parse_timestamp("12s") == 12.0
+    assert parse_timestamp("soon") is None
+    assert split_action("Click the login button") == ("click", "login button")
+    assert steps_to_text([{"description": "a" * 10}] * 3, max_chars=15) == "aaaaaaaaaa\n... (2 more steps)\n"
+
+def test_prompt_holds_the_raw_log_unless_a_limit_is_set(tmp_path, capsys):
+    content = "Thought: log in first\nClick \"Login\"\nEnter Password\nSubmit Form\n"
+    path = tmp_path / "run1.txt"
+    path.write_text(content)
+    steps = PlanningLogParser(str(path)).parse_steps()
+
+    assert prompt_log_text(str(path), steps) == content
+    assert prompt_log_text(str(path), steps, max_chars=100) == 'Click "Login"\nEnter Password\nSubmit Form\n'
+    assert "[WARN]" not in capsys.readouterr().out
+    assert prompt_log_text(str(path), steps, max_chars=20) == 'Click "Login"\n... (2 more steps)\n'
+    assert "only the steps that fit in 20 characters" in capsys.readouterr().out
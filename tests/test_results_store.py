@@ -0,0 +1,41 @@
+import json
+from src.results_store import ResultsStore, OBSERVED
+
+def result(description, observed, deviation_type=None):
+    return {"description": description, "result": OBSERVED if observed else "❌ Not Observed",
+            "notes": "", "deviation_type": deviation_type}
+
+def test_recorded_runs_round_trip_through_the_dashboard(tmp_path):
+    store = ResultsStore(str(tmp_path / "results.sqlite"))
+    store.record_run("login", [result("Click login", True), result("Enter password", True)], 2.0,
+                     {"total_tokens": 100, "total_cost": 0.01}, "run1.mp4", "run1_output.txt", True, "report1.txt")
+    store.record_run("login", [result("Click login", True), result("Enter password", False, "skipped")], 3.0,
+                     {"total_tokens": 50}, output_valid=True)
+    run_id = store.record_run("checkout", [result("Pay", True)], 1.0, output_valid=False)
+
+    # A fresh instance reads what the first one wrote
+    data = ResultsStore(store.db_path).dashboard()
+    assert data["totals"] == {"suites": 2, "runs": 3, "passed_runs": 1, "pass_rate": 0.3333,
+                              "duration_sec": 6.0, "total_tokens": 150}
+
+    suites = {suite["run_name"]: suite for suite in data["suites"]}
+    assert (suites["login"]["runs"], suites["login"]["pass_rate"], suites["login"]["step_pass_rate"]) == (2, 0.5, 0.75)
+    assert (suites["checkout"]["last_passed"], suites["checkout"]["last_run_id"]) == (0, run_id)
+
+    assert [(step["description"], step["flips"]) for step in data["flaky_steps"]] == [("Enter password", 1)]
+    assert [(step["description"], step["deviation_rate"]) for step in data["deviating_steps"]] == [("Enter password", 0.5)]
+
+    latest, second, first = data["recent_runs"]
+    assert latest["id"] == run_id and latest["output_valid"] == 0 and latest["passed"] == 0
+    assert (second["steps_passed"], second["skipped"], second["passed"]) == (1, 1, 0)
+    assert (first["report_path"], first["total_tokens"], first["passed"]) == ("report1.txt", 100, 1)
+
+def test_dashboard_files_are_written(tmp_path):
+    store = ResultsStore(str(tmp_path / "results.sqlite"))
+    store.record_run("login", [result("Click login", True)], 1.0)
+    paths = store.write_dashboard(str(tmp_path / "reports"))
+
+    with open(paths["json"], encoding="utf-8") as f:
+        assert json.load(f)["totals"]["runs"] == 1
+    with open(paths["html"], encoding="utf-8") as f:
+        assert "1 runs of 1 suites, 1 passed (100.0%)" in f.read()
@@ -0,0 +1,57 @@
+import numpy as np
+from src.roi import RoiDetector, merge_regions, roi_params, roi_cache_settings
+from src.detectors import DetectorBackend
+
+class FixedDetector(DetectorBackend):
+    """
+    Reports one box per tile for every label, at the tile's top-left corner.
+    """
+    name = "fixed"
+
+    def __init__(self, labels):
+        self.labels = labels
+        self.tiles = []
+
+    def detect_boxes(self, frames):
+        self.tiles.extend(frame.shape[:2] for frame in frames)
+        return [[(label, 0.9, (0, 0, 10, 10)) for label in self.labels] for _ in frames]
+
+def test_merge_regions_joins_overlaps_only():
+    assert merge_regions([(0, 0, 2, 2), (1, 1, 3, 3), (5, 5, 6, 6)]) == [[0, 0, 3, 3], [5, 5, 6, 6]]
+
+def test_cache_settings_follow_labels_and_learned_regions():
+    params = roi_params("auto", store_path="unused.json")
+    base = roi_cache_settings(params, {"login_button"}, {})
+    assert roi_cache_settings(params, {"login_button"}, {}) == base
+    assert roi_cache_settings(params, {"login_button", "otp_field"}, {}) != base
+    assert roi_cache_settings(params, {"login_button"}, {"login_button": [0.1, 0.1, 0.2, 0.2]}) != base
+    assert "learned" not in roi_cache_settings(roi_params("static"), {"login_button"}, {})
+
+def test_only_labels_of_interest_are_learned():
+    base = FixedDetector(["otp_field", "banner"])
+    roi = RoiDetector(base, ["otp_field"], roi_params("auto", grid=1, rescan_interval=0))
+    roi.detect_boxes([np.zeros((100, 200, 3), dtype=np.uint8)])
+    assert set(roi.learned) == {"otp_field"}
+    # Every label of interest now has a region, so the next frame is cropped
+    roi.detect_boxes([np.zeros((100, 200, 3), dtype=np.uint8)])
+    assert roi.full_scans == 1 and base.tiles[-1] != (100, 200)
+
+def test_change_outside_known_regions_triggers_full_scan():
+    base = FixedDetector(["otp_field"])
+    roi = RoiDetector(base, ["otp_field"], roi_params("auto", grid=1, rescan_interval=0, change_threshold=16))
+    blank = np.zeros((100, 200, 3), dtype=np.uint8)
+    # Frames of one batch are planned together, so learning shows from the next call on
+    roi.detect_boxes([blank])
+    roi.detect_boxes([blank])
+    assert (roi.full_scans, roi.change_scans) == (1, 0)
+
+    inside = blank.copy()
+    inside[0:5, 0:5] = 255
+    roi.detect_boxes([inside])
+    assert (roi.full_scans, roi.change_scans) == (1, 0)
+
+    outside = inside.copy()
+    outside[60:90, 120:180] = 255
+    roi.detect_boxes([outside])
+    assert (roi.full_scans, roi.change_scans) == (2, 1)
+    assert base.tiles[-1] == (100, 200)
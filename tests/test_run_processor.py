@@ -0,0 +1,26 @@
+import src.video_analyzer as video_analyzer
+from benchmarks.stub_detector import StubDetector
+from src.run_processor import RunProcessor
+from src.detection_cache import DetectionCache
+from src.detectors import detector_spec, as_backend
+from src.roi import roi_params
+
+def test_warmed_entry_is_hit_by_the_next_run(synthetic_video, tmp_path, monkeypatch):
+    video_path, _ = synthetic_video
+    log_path = tmp_path / "run1.txt"
+    log_path.write_text('Click "Login"\nEnter Password\n')
+    weights_path = tmp_path / "weights.pt"
+    weights_path.write_bytes(b"weights")
+
+    loads = []
+    monkeypatch.setattr(video_analyzer, "create_detector", lambda spec, tracer=None: loads.append(spec) or as_backend(StubDetector()))
+    cache = DetectionCache(str(tmp_path / "detections.sqlite"))
+    # ROI tiling puts the labels of interest in the cache key
+    options = {"cache": cache, "detector": detector_spec("ultralytics", str(weights_path), roi=roi_params("auto"))}
+
+    RunProcessor(str(weights_path), options).warm_cache(video_path, str(log_path))
+    assert (len(loads), cache.stats()["entries"]) == (1, 1)
+
+    results = RunProcessor(str(weights_path), options).analyze_steps(str(log_path), video_path)
+    assert cache.hits == 1 and len(loads) == 1
+    assert [result["result"] for result in results] == ["✅ Observed"] * 2
@@ -0,0 +1,22 @@
+from src.llm_cache import LLMResponseCache
+from src.detection_cache import DetectionCache
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = LLMResponseCache(str(tmp_path / "llm.sqlite"), max_bytes=250)
+    for key in ("a", "b", "c"):
+        cache.put(key, "model", {}, {"text": key * 80})
+    cache.get("b")
+    cache.put("d", "model", {}, {"text": "d" * 80})
+
+    assert [key for key in "abcd" if cache.get(key)] == ["b", "d"]
+    assert cache.stats()["entries"] == 2
+
+def test_newest_entry_is_kept_even_beyond_the_limit(tmp_path):
+    cache = DetectionCache(str(tmp_path / "detections.sqlite"), max_bytes=10)
+    frames = [(idx, idx / 10, [("login_button", 0.9)]) for idx in range(20)]
+    cache.put("old", "v", str(tmp_path / "model.pt"), "m", {}, frames)
+    cache.put("new", "v", str(tmp_path / "model.pt"), "m", {}, frames)
+
+    assert cache.get("old") is None
+    assert len(cache.get("new")) == 20
+    assert cache.stats()["entries"] == 1
@@ -0,0 +1,111 @@
+import threading
+import pytest
+import src.video_analyzer as video_analyzer
+from benchmarks.stub_detector import StubDetector
+from benchmarks.synthetic_video import generate_screen_recording
+from src.video_analyzer import VideoAnalyzer, shutdown_shard_pool
+from src.detectors import as_backend
+
+def events(analyzer):
+    timeline = analyzer.build_timeline()
+    return {label: timeline.all(label) for label in sorted(analyzer.labels)}
+
+@pytest.fixture
+def stub_workers(monkeypatch):
+    # Shard workers are forked after the patch, so they build the stub from the spec too
+    shutdown_shard_pool()
+    monkeypatch.setattr(video_analyzer, "create_detector", lambda spec, tracer=None: as_backend(StubDetector()))
+    yield
+    shutdown_shard_pool()
+
+@pytest.mark.parametrize("motion_threshold", [None, 8])
+def test_sharded_timeline_equals_sequential(synthetic_video, stub_workers, motion_threshold):
+    path, _ = synthetic_video
+    sequential = events(VideoAnalyzer(path, model=StubDetector(), motion_threshold=motion_threshold))
+    assert any(sequential.values())
+    for shards in (2, 3):
+        assert events(VideoAnalyzer(path, shards=shards, motion_threshold=motion_threshold)) == sequential
+
+def test_shard_workers_are_reused_across_videos(synthetic_video, stub_workers):
+    path, _ = synthetic_video
+    VideoAnalyzer(path, shards=2).build_timeline()
+    pool = video_analyzer._SHARD_POOL
+    VideoAnalyzer(path, shards=2).build_timeline()
+    assert video_analyzer._SHARD_POOL is pool
+
+def test_injected_model_is_not_sharded(synthetic_video):
+    path, _ = synthetic_video
+    shutdown_shard_pool()
+    # The default spec's weights do not exist here; the injected stub must be used in process
+    sharded = events(VideoAnalyzer(path, model=StubDetector(), shards=2))
+    assert sharded == events(VideoAnalyzer(path, model=StubDetector()))
+    assert video_analyzer._SHARD_POOL is None
+
+def first_seen(analyzer, labels):
+    timeline = analyzer.build_timeline()
+    return {label: timeline.first_between(label, None, None) for label in labels}
+
+def test_coarse_search_matches_the_timeline(synthetic_video):
+    path, _ = synthetic_video
+    labels = ("login_button", "password_field", "submit_button")
+    expected = {label: (True, event[0]) for label, event in first_seen(VideoAnalyzer(path, model=StubDetector()), labels).items()}
+    analyzer = VideoAnalyzer(path, model=StubDetector())
+    assert {label: analyzer.locate_label(label, coarse_stride_sec=1.0) for label in labels} == expected
+
+def test_coarse_search_finds_elements_shorter_than_the_stride(tmp_path):
+    # One frame each at 10 fps (0.6, 2.1 and 3.9 s), all between the 1 s samples
+    path = str(tmp_path / "blips.mp4")
+    generate_screen_recording(path, duration_sec=4.0, fps=10, resolution=(320, 180), elements=[
+        {"label": "login_button", "start": 0.15, "end": 0.175, "box": (0.40, 0.45, 0.20, 0.08)},
+        {"label": "password_field", "start": 0.525, "end": 0.55, "box": (0.35, 0.55, 0.30, 0.06)},
+        {"label": "submit_button", "start": 0.975, "end": 1.0, "box": (0.42, 0.70, 0.16, 0.08)}
+    ])
+    analyzer = VideoAnalyzer(path, model=StubDetector())
+    found = [analyzer.locate_label(label, coarse_stride_sec=1.0) for label in ("login_button", "password_field", "submit_button")]
+    assert found == [(True, 0.6), (True, 2.1), (True, 3.9)]
+    assert analyzer.locate_label("login_button", start_sec=1.0, coarse_stride_sec=1.0) == (False, None)
+
+def decoder_threads():
+    return [thread for thread in threading.enumerate() if thread.name == "frame-decoder"]
+
+@pytest.mark.parametrize("batch_size", [1, 4])
+def test_pipelined_decode_equals_sequential(synthetic_video, batch_size):
+    path, frame_count = synthetic_video
+    sequential = list(VideoAnalyzer(path, model=StubDetector(), batch_size=batch_size)._infer_frames())
+    # A queue much shorter than the video keeps the decoder blocked on a full queue
+    pipelined = list(VideoAnalyzer(path, model=StubDetector(), batch_size=batch_size, pipelined=True, queue_size=2)._infer_frames())
+    assert len(sequential) == frame_count and pipelined == sequential
+    assert not decoder_threads()
+
+class FailingDetector(StubDetector):
+    def __call__(self, frames, **kwargs):
+        if self.calls == 2:
+            raise RuntimeError("inference failed")
+        return super().__call__(frames, **kwargs)
+
+def test_decoder_thread_stops_when_inference_fails(synthetic_video):
+    path, _ = synthetic_video
+    analyzer = VideoAnalyzer(path, model=FailingDetector(), pipelined=True, queue_size=2)
+    with pytest.raises(RuntimeError, match="inference failed"):
+        analyzer.build_timeline()
+    assert not decoder_threads()
+
+def test_decode_errors_reach_the_consumer(synthetic_video, monkeypatch):
+    path, _ = synthetic_video
+    analyzer = VideoAnalyzer(path, model=StubDetector(), pipelined=True, queue_size=2)
+
+    def broken_frames(start_frame=0, end_frame=None):
+        yield from VideoAnalyzer(path)._iter_frames(0, 3)
+        raise IOError("corrupt frame")
+    monkeypatch.setattr(analyzer, "_iter_frames", broken_frames)
+
+    with pytest.raises(IOError, match="corrupt frame"):
+        list(analyzer._infer_frames())
+    assert not decoder_threads()
+
+def test_decoder_thread_stops_when_the_consumer_stops_early(synthetic_video):
+    path, _ = synthetic_video
+    frames = VideoAnalyzer(path, model=StubDetector(), pipelined=True, queue_size=2)._infer_frames()
+    next(frames)
+    frames.close()
+    assert not decoder_threads()
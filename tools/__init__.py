@@ -5,11 +5,8 @@ def main():
     
     log_path = "data/planning_logs/run1.txt"
 
-    with open(log_path, "r") as file:
-        raw_log = file.read()
-
-    parser = LogParser()
-    steps = parser.parse(raw_log)
+    parser = LogParser(log_path)
+    steps = parser.iter_steps()
 
     print("Parsed Planning Steps:")
     for step in steps:
@@ -1,49 +1,180 @@
-from langchain.tools import tool
-from src.planning_parser import PlanningLogParser
-from src.video_analyzer import VideoAnalyzer
+import os
+import re
+import json
+import time
+from src.video_analyzer import ACTION_LABEL_MAP
 from src.output_checker import FinalOutputChecker
+from src.tracing import NULL_TRACER
 
-@tool
-def parse_planning_log(input_text: str):
-    """
-    Parses planning log at runtime.
-    Expects: 'log_path=<path>'
-    """
-    try:
-        path = input_text.strip().split("=")[-1]
-        parser = PlanningLogParser(path)
-        steps = parser.parse_steps()
-        return steps
-    except Exception as e:
-        return {"error": str(e)}
-
-@tool
-def analyze_video_for_action(input_text: str):
-    """
-    Analyzes video to detect presence of an action.
-    Expects: 'video_path=<path>; action_id=<id>'
-    """
-    try:
-        parts = dict(item.strip().split("=") for item in input_text.split(";"))
-        video_path = parts.get("video_path")
-        action_id = parts.get("action_id")
-        
-        analyzer = VideoAnalyzer(video_path)
-        found, timestamp = analyzer.analyze_for_action(action_id)
-        return {"found": found, "timestamp": timestamp}
-    except Exception as e:
-        return {"error": str(e)}
-
-@tool
-def validate_final_output(input_text: str):
-    """
-    Validate final output at runtime.
-    Expects: 'output_path=<path>'
-    """
-    try:
-        path = input_text.strip().split("=")[-1]
-        checker = FinalOutputChecker(path)
-        success = checker.validate_output()
-        return success
-    except Exception as e:
-        return {"error": str(e)}
+# Argument names the tools accept, in the order a bare positional value fills them
+TOOL_ARGUMENTS = {
+    "parse_planning_log": ("log_path",),
+    "analyze_video_for_action": ("video_path", "action_id"),
+    "validate_final_output": ("output_path",)
+}
+
+_PAIR = re.compile(r"\s*([A-Za-z_]\w*)\s*[=:]\s*(\"[^\"]*\"|'[^']*'|[^;,\n]*)")
+
+def parse_tool_input(input_text, names):
+    """
+    {name: value} from a tool input: a JSON object ('{"video_path": ..., "action_id": ...}'),
+    key=value or key: value pairs separated by ";", "," or newlines, or bare
+    values in the order of names. Quotes and surrounding whitespace are dropped.
+    """
+    if isinstance(input_text, dict):
+        parsed = input_text
+    else:
+        text = str(input_text).strip().strip("`").strip()
+        parsed = None
+        if text.startswith("{"):
+            try:
+                parsed = json.loads(text)
+            except ValueError:
+                parsed = None
+        if not isinstance(parsed, dict):
+            pairs = {key.lower(): value for key, value in _PAIR.findall(text)}
+            if any(name in pairs for name in names):
+                parsed = pairs
+            else:
+                parsed = dict(zip(names, re.split(r"\s*[;,\n]\s*", text)))
+
+    arguments = {name: str(parsed[name]).strip().strip("\"'").strip() for name in names if parsed.get(name) is not None}
+    missing = [name for name in names if not arguments.get(name)]
+    if missing:
+        raise ValueError(f"missing argument(s) {', '.join(missing)}; expected a JSON object with keys {', '.join(names)}")
+    return arguments
+
+def _file_key(path):
+    """
+    Normalized path plus size and mtime, so memoized results expire when the file changes.
+    """
+    stat = os.stat(path)
+    return os.path.normcase(os.path.abspath(path)), stat.st_size, stat.st_mtime_ns
+
+class ToolContext:
+    """
+    State shared by the agent tools for one agent session. Tools reuse the
+    RunProcessor's detector, label matcher, plan cache and output options, and
+    its video timeline (RunProcessor.video_timeline): requested for the run's
+    planned labels, it is the same one step analysis aligns against, so a video
+    is decoded once per run whichever side asks first. Results are
+    memoized by normalized arguments (absolute path, file size and mtime,
+    lower-cased action_id), so a call the ReAct loop repeats is answered from
+    memory. Call and cache-hit counts are kept per run (see begin_run).
+    """
+    def __init__(self, processor, tracer=NULL_TRACER):
+        self.processor = processor
+        self.tracer = tracer
+        self.run_name = None
+        self.labels = set()
+        self.memo = {}
+        self.calls = {}
+        self.hits = {}
+
+    def begin_run(self, run_name, tracer=NULL_TRACER, steps=None):
+        """
+        Starts a new run: resets the counters and takes the detector labels of
+        the run's planned steps. Memoized results are kept for the whole session.
+        """
+        self.run_name = run_name
+        self.tracer = tracer
+        self.calls = {}
+        self.hits = {}
+        self.labels = {step["label"] for step in steps or () if step["label"]}
+
+    def call(self, tool_name, input_text):
+        """
+        Runs tool_name on its raw input; errors are returned to the agent as {"error": ...}.
+        """
+        self.calls[tool_name] = self.calls.get(tool_name, 0) + 1
+        start = time.perf_counter()
+        try:
+            arguments = parse_tool_input(input_text, TOOL_ARGUMENTS[tool_name])
+            return getattr(self, tool_name)(**arguments)
+        except Exception as e:
+            return {"error": str(e)}
+        finally:
+            self.tracer.add(f"tool_{tool_name}", time.perf_counter() - start)
+
+    def _memoized(self, tool_name, key, compute):
+        key = (tool_name,) + key
+        if key in self.memo:
+            self.hits[tool_name] = self.hits.get(tool_name, 0) + 1
+            return self.memo[key]
+        result = self.memo[key] = compute()
+        return result
+
+    def parse_planning_log(self, log_path):
+        def compute():
+            steps = self.processor.plan_steps(log_path, self.tracer)
+            return [{"step_number": step["step_number"], "description": step["description"],
+                     "action_id": step["action_id"], "label": step["label"]} for step in steps]
+
+        return self._memoized("parse_planning_log", _file_key(log_path), compute)
+
+    def analyze_video_for_action(self, video_path, action_id):
+        action_id = action_id.lower()
+
+        def compute():
+            matcher = self.processor.get_label_matcher(self.tracer)
+            label, score, candidate = matcher.match([action_id])[0]
+            label = matcher.overrides.get(action_id, label)
+            if label is None:
+                return {"found": False, "timestamp": None, "label": None,
+                        "note": f"no detector label matches '{action_id}' (closest {candidate} {score})"}
+
+            event = self._timeline(video_path, label).first_between(label, None, None)
+            return {"found": event is not None, "timestamp": event[0] if event else None, "label": label}
+
+        return self._memoized("analyze_video_for_action", _file_key(video_path) + (action_id,), compute)
+
+    def _timeline(self, video_path, label):
+        """
+        The processor's timeline for video_path, covering the planned labels and label.
+        """
+        labels = (self.labels or set(ACTION_LABEL_MAP.values())) | {label}
+        # The detector is shared with the run's own step analysis
+        with self.processor.video_lock, self.tracer.span("video_analysis"):
+            return self.processor.video_timeline(video_path, labels, self.tracer)
+
+    def validate_final_output(self, output_path):
+        def compute():
+            checker = FinalOutputChecker(output_path, **self.processor.output_options)
+            return {"success": checker.validate_output(), "evidence": checker.evidence}
+
+        return self._memoized("validate_final_output", _file_key(output_path), compute)
+
+    def stats(self):
+        """
+        Per-tool call and cache-hit counts of the current run.
+        """
+        return {
+            name: {"calls": self.calls.get(name, 0), "cache_hits": self.hits.get(name, 0)}
+            for name in TOOL_ARGUMENTS if self.calls.get(name)
+        }
+
+    def cache_stats(self):
+        """
+        The run's tool memo usage in the report's cache_stats format.
+        """
+        calls = sum(self.calls.values())
+        hits = sum(self.hits.values())
+        return {"hits": hits, "misses": calls - hits, "entries": len(self.memo)}
+
+def build_tools(context):
+    """
+    The LangChain tools, bound to context. Each takes one string, preferably a
+    JSON object of its arguments, which suits single-input ReAct agents.
+    """
+    from langchain.tools import Tool
+
+    descriptions = {
+        "parse_planning_log": 'Parses a planning log into its planned steps. Input: {"log_path": "<path>"}',
+        "analyze_video_for_action": ('Checks whether an action is visible in a video and when. '
+                                     'Input: {"video_path": "<path>", "action_id": "<action id or step text>"}'),
+        "validate_final_output": 'Checks whether a test run\'s final output reports success. Input: {"output_path": "<path>"}'
+    }
+    return [
+        Tool(name=name, description=description, func=lambda input_text, name=name: context.call(name, input_text))
+        for name, description in descriptions.items()
+    ]
@@ -0,0 +1,189 @@
+"""
+Exports the YOLO weights to ONNX (FP32 and int8), validates the exports and
+compares their accuracy and latency against the PyTorch backend on frames of a
+real recording, so the fastest backend with equivalent detections can be picked.
+
+    python -m tools.export_detector --video data/videos/run1.mp4
+    python -m tools.export_detector --skip-export --video data/videos/run1.mp4 --threads 4
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import cv2
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from src.detectors import detector_spec, create_detector
+from config.settings import MODEL_PATH, ONNX_MODEL_PATH, ONNX_INT8_MODEL_PATH
+
+def export_onnx(weights_path, onnx_path, imgsz):
+    """
+    Exports with a dynamic batch axis so VideoAnalyzer's batched inference works.
+    """
+    from ultralytics import YOLO
+    exported = YOLO(weights_path).export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True)
+    if os.path.abspath(exported) != os.path.abspath(onnx_path):
+        shutil.move(exported, onnx_path)
+    print(f"[INFO] Exported {weights_path} to {onnx_path}")
+
+def quantize_int8(onnx_path, int8_path):
+    """
+    Dynamic (weight-only) int8 quantization; needs no calibration data.
+    """
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+    quantize_dynamic(onnx_path, int8_path, weight_type=QuantType.QUInt8)
+    print(f"[INFO] Quantized {onnx_path} to {int8_path}")
+
+def validate_onnx(path):
+    import onnx
+    onnx.checker.check_model(path)
+    print(f"[INFO] {path} passed the ONNX checker ({os.path.getsize(path) / 1024 / 1024:.1f} MB)")
+
+def sample_frames(video_path, count):
+    """
+    `count` frames spread evenly over the video.
+    """
+    cap = cv2.VideoCapture(video_path)
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    step = max(1, total // count)
+    frames = []
+    for frame_idx in range(0, total, step):
+        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+        if len(frames) >= count:
+            break
+    cap.release()
+    return frames
+
+def run_backend(spec, frames, batch_size, repeat):
+    """
+    Returns (per-frame best confidence per label, best-of-repeat ms per frame).
+    """
+    detector = create_detector(spec)
+    detector.detect_batch(frames[:batch_size])  # warm-up
+
+    best = None
+    for _ in range(repeat):
+        detections = []
+        start = time.perf_counter()
+        for idx in range(0, len(frames), batch_size):
+            detections.extend(detector.detect_batch(frames[idx:idx + batch_size]))
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    per_frame = []
+    for frame_detections in detections:
+        labels = {}
+        for label, confidence in frame_detections:
+            labels[label] = max(confidence, labels.get(label, 0.0))
+        per_frame.append(labels)
+    return per_frame, 1000 * best / len(frames)
+
+def compare(reference, candidate):
+    """
+    Agreement of a candidate's detections with the reference backend's.
+    """
+    same_labels = sum(1 for ref, cand in zip(reference, candidate) if set(ref) == set(cand))
+    conf_diffs = [abs(ref[label] - cand[label]) for ref, cand in zip(reference, candidate) for label in set(ref) & set(cand)]
+
+    def first_seen(per_frame):
+        seen = {}
+        for idx, labels in enumerate(per_frame):
+            for label in labels:
+                seen.setdefault(label, idx)
+        return seen
+
+    ref_first, cand_first = first_seen(reference), first_seen(candidate)
+    first_seen_shift = max(
+        (abs(ref_first[label] - cand_first[label]) if label in cand_first else len(reference)
+         for label in ref_first),
+        default=0
+    )
+    return {
+        "label_agreement": round(same_labels / len(reference), 4) if reference else 1.0,
+        "mean_conf_diff": round(sum(conf_diffs) / len(conf_diffs), 4) if conf_diffs else 0.0,
+        "max_first_seen_shift_frames": first_seen_shift,
+        "missing_labels": sorted(set(ref_first) - set(cand_first)),
+        "extra_labels": sorted(set(cand_first) - set(ref_first))
+    }
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Export, validate and compare detector backends")
+    arg_parser.add_argument("--weights", default=MODEL_PATH)
+    arg_parser.add_argument("--onnx", default=ONNX_MODEL_PATH)
+    arg_parser.add_argument("--onnx-int8", default=ONNX_INT8_MODEL_PATH)
+    arg_parser.add_argument("--imgsz", type=int, default=640)
+    arg_parser.add_argument("--threads", type=int, default=0, help="ONNX Runtime intra-op threads (0 = default)")
+    arg_parser.add_argument("--skip-export", action="store_true", help="Compare existing exports only")
+    arg_parser.add_argument("--no-int8", action="store_true", help="Skip the int8 export and comparison")
+    arg_parser.add_argument("--video", help="Recording whose frames are used for the comparison")
+    arg_parser.add_argument("--frames", type=int, default=100, help="Frames sampled from --video")
+    arg_parser.add_argument("--batch-size", type=int, default=8)
+    arg_parser.add_argument("--repeat", type=int, default=3, help="Timed passes; the fastest one is reported")
+    arg_parser.add_argument("--min-agreement", type=float, default=0.98,
+                            help="Minimum per-frame label agreement for a backend to count as equivalent")
+    arg_parser.add_argument("--output", help="Write the comparison JSON here")
+    args = arg_parser.parse_args()
+
+    if not args.skip_export:
+        export_onnx(args.weights, args.onnx, args.imgsz)
+        if not args.no_int8:
+            quantize_int8(args.onnx, args.onnx_int8)
+
+    validate_onnx(args.onnx)
+    if not args.no_int8:
+        validate_onnx(args.onnx_int8)
+
+    if not args.video:
+        print("[INFO] No --video given; skipping the accuracy/latency comparison")
+        return
+
+    frames = sample_frames(args.video, args.frames)
+    print(f"[INFO] Comparing backends on {len(frames)} frames of {args.video}")
+
+    specs = {
+        "ultralytics": detector_spec("ultralytics", args.weights, args.imgsz),
+        "onnx": detector_spec("onnx", args.onnx, args.imgsz, args.threads or None)
+    }
+    if not args.no_int8:
+        specs["onnx-int8"] = detector_spec("onnx", args.onnx_int8, args.imgsz, args.threads or None)
+
+    reference = None
+    backends = {}
+    for name, spec in specs.items():
+        detections, ms_per_frame = run_backend(spec, frames, args.batch_size, args.repeat)
+        if reference is None:
+            reference = detections
+        backends[name] = {"ms_per_frame": round(ms_per_frame, 3), **compare(reference, detections)}
+        print(f"  {name:12s} {ms_per_frame:8.2f} ms/frame  agreement {backends[name]['label_agreement']:.3f}  "
+              f"first-seen shift {backends[name]['max_first_seen_shift_frames']} frames")
+
+    # Fastest backend whose detections are equivalent to PyTorch for timeline purposes
+    equivalent = [
+        name for name, result in backends.items()
+        if result["label_agreement"] >= args.min_agreement and result["max_first_seen_shift_frames"] == 0
+    ]
+    recommended = min(equivalent, key=lambda name: backends[name]["ms_per_frame"])
+    print(f"[INFO] Recommended backend: --backend {recommended}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "video": args.video,
+                "frames": len(frames),
+                "imgsz": args.imgsz,
+                "threads": args.threads,
+                "backends": backends,
+                "recommended": recommended
+            }, f, indent=2)
+        print(f"[INFO] Comparison written to {args.output}")
+
+if __name__ == "__main__":
+    main()